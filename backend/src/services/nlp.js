@@ -4,6 +4,14 @@ const Anthropic = require('@anthropic-ai/sdk');
 const logger = require('../utils/logger');
 const { cacheGet, cacheSet } = require('../config/redis');
 
+// Optional compact wire format for NLP engine calls (NLP_WIRE_FORMAT=msgpack)
+let msgpack = null;
+try {
+  msgpack = require('@msgpack/msgpack');
+} catch (error) {
+  msgpack = null;
+}
+
 class NLPService {
   constructor() {
     this.openai = new OpenAI({
@@ -15,6 +23,31 @@ class NLPService {
     });
 
     this.nlpEngineUrl = process.env.NLP_ENGINE_URL || 'http://localhost:8001';
+    this.useMsgpack = process.env.NLP_WIRE_FORMAT === 'msgpack' && msgpack !== null;
+    if (process.env.NLP_WIRE_FORMAT === 'msgpack' && msgpack === null) {
+      logger.warn('NLP_WIRE_FORMAT=msgpack but @msgpack/msgpack is not installed (run npm install); using JSON');
+    }
+  }
+
+  /**
+   * POST to the NLP engine as MessagePack when enabled, JSON otherwise
+   */
+  async postEngine(path, body, options = {}) {
+    if (!this.useMsgpack) {
+      const response = await axios.post(`${this.nlpEngineUrl}${path}`, body, options);
+      return response.data;
+    }
+
+    const response = await axios.post(`${this.nlpEngineUrl}${path}`, Buffer.from(msgpack.encode(body)), {
+      ...options,
+      headers: {
+        ...(options.headers || {}),
+        'Content-Type': 'application/msgpack',
+        Accept: 'application/msgpack'
+      },
+      responseType: 'arraybuffer'
+    });
+    return msgpack.decode(new Uint8Array(response.data));
   }
 
   /**
@@ -79,7 +112,7 @@ class NLPService {
       // Try NLP engine first if available
       if (this.nlpEngineUrl && this.nlpEngineUrl !== 'http://localhost:8001') {
         try {
-          const response = await axios.post(`${this.nlpEngineUrl}/process`, {
+          const data = await this.postEngine('/process', {
             text,
             language,
             agent_id: agentId,
@@ -88,13 +121,13 @@ class NLPService {
           }, { timeout: 3000 });
 
           return {
-            response: response.data.response,
-            intent: response.data.intent,
-            entities: response.data.entities,
-            sentiment: response.data.sentiment,
-            confidence: response.data.confidence,
-            context: response.data.context,
-            shouldEndCall: response.data.should_end_call || false
+            response: data.response,
+            intent: data.intent,
+            entities: data.entities,
+            sentiment: data.sentiment,
+            confidence: data.confidence,
+            context: data.context,
+            shouldEndCall: data.should_end_call || false
           };
         } catch (nlpError) {
           logger.warn('NLP engine unavailable, falling back to OpenAI');
@@ -453,11 +486,12 @@ Context: ${JSON.stringify(context)}`;
   /**
    * Summarize conversation
    */
-  async summarizeConversation(transcript, language = 'en') {
+  async summarizeConversation(transcript, language = 'en', callId = null) {
     try {
       const response = await axios.post(`${this.nlpEngineUrl}/summarize`, {
         transcript,
-        language
+        language,
+        call_id: callId
       });
 
       return {
@@ -472,6 +506,63 @@ Context: ${JSON.stringify(context)}`;
     }
   }
 
+  /**
+   * Queue a post-call summary; poll getSummaryJob or pass a callbackUrl
+   */
+  async submitSummaryJob(transcript, language = 'en', { callId = null, priority = 'normal', callbackUrl = null } = {}) {
+    try {
+      const response = await axios.post(`${this.nlpEngineUrl}/summarize/jobs`, {
+        transcript,
+        language,
+        call_id: callId,
+        priority,
+        callback_url: callbackUrl
+      });
+
+      return response.data;
+    } catch (error) {
+      logger.error('Summary job submission error:', error);
+      throw error;
+    }
+  }
+
+  /**
+   * Get a summary job, optionally waiting up to waitSeconds for it to finish
+   */
+  async getSummaryJob(jobId, waitSeconds = 0) {
+    try {
+      const response = await axios.get(`${this.nlpEngineUrl}/summarize/jobs/${jobId}`, {
+        params: { wait: waitSeconds }
+      });
+
+      return response.data;
+    } catch (error) {
+      logger.error('Summary job lookup error:', error);
+      throw error;
+    }
+  }
+
+  /**
+   * Post-call analytics in one request: summary, CSAT, sentiment trajectory,
+   * intents and entities (replaces separate summarize/csat/sentiment calls)
+   */
+  async analyzePostCall(transcript, language = 'en', { callId = null, includeSummary = true, tier = null } = {}) {
+    try {
+      const response = await axios.post(`${this.nlpEngineUrl}/post-call`, {
+        transcript,
+        language,
+        call_id: callId,
+        include_summary: includeSummary,
+        tier
+      });
+
+      return response.data;
+    } catch (error) {
+      logger.error('Post-call analysis error:', error);
+      throw error;
+    }
+  }
+
   /**
    * Calculate CSAT score from conversation
    */
@@ -493,6 +584,20 @@ Context: ${JSON.stringify(context)}`;
     }
   }
 
+  /**
+   * Release NLP engine conversation state when a call ends
+   */
+  async endConversation(agentId, callId) {
+    try {
+      await axios.post(`${this.nlpEngineUrl}/conversation/end`, {
+        agent_id: agentId,
+        call_id: callId
+      }, { timeout: 3000 });
+    } catch (error) {
+      logger.warn('End conversation error (non-fatal):', error.message);
+    }
+  }
+
   /**
    * Check for interruption intent
    */
@@ -458,6 +458,15 @@ class TelephonyService {
         });
 
       logger.info(`Call ${CallSid} status updated: ${CallStatus}`);
+
+      // Free the NLP engine's conversation state once the call is over
+      if (['completed', 'failed', 'busy', 'no-answer', 'canceled'].includes(CallStatus)) {
+        const call = await db('calls').where({ twilio_sid: CallSid }).first();
+        if (call && call.agent_id) {
+          this.nlpService.endConversation(call.agent_id, call.id);
+        }
+      }
+
       res.sendStatus(200);
     } catch (error) {
       logger.error('Error handling call status:', error);
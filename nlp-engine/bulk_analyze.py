@@ -0,0 +1,261 @@
+"""
+Offline bulk analysis of historical call transcripts
+
+Run with:
+    python bulk_analyze.py calls.jsonl results.jsonl --analyses language,sentiment,intent,entities --workers 8
+
+Input is JSONL, one call per line: {"id": ..., "transcript": "...",
+"language": "en"} (language optional). Output is JSONL in input order, one
+result per line with the requested analyses or an "error". Input is
+streamed with a bounded number of calls in flight, so memory stays flat
+regardless of file size.
+
+Calls are spread across a process pool; each worker loads the models once.
+A checkpoint next to the output records how far the output is complete,
+and --resume continues from it after an interrupted run.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+ANALYSES = ("language", "sentiment", "intent", "entities", "summary")
+
+# Per-worker state, set up once by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(analyses: List[str], threads: int, summary_tier: Optional[str]):
+    # Several workers each using every core for inference only thrash
+    os.environ.setdefault('OMP_NUM_THREADS', str(threads))
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+    from services.entity_extractor import EntityExtractor
+    from services.intent_classifier import IntentClassifier
+
+    _worker["analyses"] = set(analyses)
+    _worker["summary_tier"] = summary_tier
+    _worker["loop"] = asyncio.new_event_loop()
+    _worker["intents"] = IntentClassifier()
+    _worker["entities"] = EntityExtractor()
+    if "language" in analyses:
+        from services.language_detector import LanguageDetector
+        _worker["language_detector"] = LanguageDetector()
+    if "summary" in analyses:
+        from services.summarizer import SummarizationService
+        _worker["summarizer"] = SummarizationService()
+    if "sentiment" in analyses:
+        from services.post_call import PostCallAnalyzer
+        from services.sentiment_analyzer import SentimentAnalyzer
+        _worker["post_call"] = PostCallAnalyzer(
+            SentimentAnalyzer(),
+            _worker["intents"],
+            _worker["entities"],
+            _worker.get("summarizer")
+        )
+
+
+def _analyze_batch(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [_worker["loop"].run_until_complete(_analyze(record)) for record in batch]
+
+
+async def _analyze(record: Dict[str, Any]) -> Dict[str, Any]:
+    from services.extractive_summarizer import split_turns
+
+    result: Dict[str, Any] = {"id": record.get("id"), "line": record["line"]}
+    if "error" in record:
+        result["error"] = record["error"]
+        return result
+
+    analyses = _worker["analyses"]
+    try:
+        transcript = record["transcript"]
+        language = record.get("language") or "en"
+        if "language" in analyses:
+            language = await _worker["language_detector"].detect(transcript)
+            result["language"] = language
+
+        if "sentiment" in analyses:
+            # Post-call analysis shares one pass for sentiment, CSAT, intents and entities
+            analysis = await _worker["post_call"].analyze(
+                transcript,
+                language,
+                include_summary="summary" in analyses,
+                tier=_worker["summary_tier"]
+            )
+            result["sentiment"] = analysis["sentiment"]
+            result["csat"] = analysis["csat"]
+            result["trajectory"] = analysis["trajectory"]
+            if "intent" in analyses:
+                result["intents"] = analysis["intents"]
+            if "entities" in analyses:
+                result["entities"] = [
+                    dict(entity, turn=turn["index"]) for turn in analysis["turns"] for entity in turn["entities"]
+                ]
+            if "summary" in analyses:
+                result["summary"] = analysis["summary"]
+            return result
+
+        turns = split_turns(transcript)
+        if "intent" in analyses:
+            counts: Dict[str, int] = {}
+            for speaker, text in turns:
+                intent = (await _worker["intents"].classify(text, language))["intent"]
+                if intent != "unknown":
+                    counts[intent] = counts.get(intent, 0) + 1
+            result["intents"] = dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+        if "entities" in analyses:
+            result["entities"] = [
+                dict(entity, turn=index)
+                for index, (_, text) in enumerate(turns)
+                for entity in await _worker["entities"].extract(text, language)
+            ]
+        if "summary" in analyses:
+            result["summary"] = await _worker["summarizer"].summarize_structured(
+                transcript, language, tier=_worker["summary_tier"]
+            )
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+class Checkpoint:
+    """
+    Input lines consumed and output bytes written, replaced atomically
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[str, int]:
+        if not os.path.exists(self.path):
+            return {"lines": 0, "output_bytes": 0, "errors": 0}
+        with open(self.path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, lines: int, output_bytes: int, errors: int):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"lines": lines, "output_bytes": output_bytes, "errors": errors}, f)
+        os.replace(tmp_path, self.path)
+
+
+def _read_batches(path: str, skip: int, batch_size: int):
+    batch = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f):
+            if line_number < skip or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict) or not isinstance(record.get("transcript"), str):
+                    raise ValueError("expected an object with a string 'transcript'")
+            except ValueError as e:
+                record = {"error": f"Invalid input: {e}"}
+            record["line"] = line_number
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def run(args) -> Dict[str, Any]:
+    analyses = [a.strip() for a in args.analyses.split(',') if a.strip()]
+    unknown = set(analyses) - set(ANALYSES)
+    if unknown:
+        raise SystemExit(f"Unknown analyses: {', '.join(sorted(unknown))} (choose from {', '.join(ANALYSES)})")
+
+    checkpoint = Checkpoint(args.output + '.checkpoint')
+    state = checkpoint.load() if args.resume else {"lines": 0, "output_bytes": 0, "errors": 0}
+    if args.resume and state["lines"]:
+        print(f"Resuming after input line {state['lines']}", file=sys.stderr)
+
+    output = open(args.output, 'a+b' if args.resume else 'wb')
+    # Drop anything written after the last checkpoint (a crash mid-batch)
+    output.truncate(state["output_bytes"])
+    output.seek(0, os.SEEK_END)
+    checkpoint.save(state["lines"], output.tell(), state["errors"])
+
+    lines, errors = state["lines"], state["errors"]
+    written = 0
+    started = last_report = time.perf_counter()
+    in_flight: deque = deque()
+    window = args.workers * args.prefetch
+
+    def drain_one():
+        nonlocal lines, errors, written
+        results = in_flight.popleft().result()
+        for result in results:
+            errors += "error" in result
+            output.write((json.dumps(result, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+        written += len(results)
+        # Results are written in input order, so the last line here marks
+        # everything before it as done
+        lines = results[-1]["line"] + 1
+        output.flush()
+        checkpoint.save(lines, output.tell(), errors)
+
+    def report(final: bool = False):
+        elapsed = time.perf_counter() - started
+        rate = written / elapsed if elapsed else 0.0
+        print(f"{'done' if final else 'progress'}: {written} calls in {elapsed:.1f}s "
+              f"({rate:.1f} calls/s), {errors} errors, next input line {lines}", file=sys.stderr)
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(analyses, args.threads_per_worker, args.summary_tier)
+    ) as pool:
+        for batch in _read_batches(args.input, state["lines"], args.batch_size):
+            in_flight.append(pool.submit(_analyze_batch, batch))
+            while len(in_flight) >= window:
+                drain_one()
+            if time.perf_counter() - last_report >= args.report_every:
+                report()
+                last_report = time.perf_counter()
+        while in_flight:
+            drain_one()
+
+    output.close()
+    report(final=True)
+    elapsed = time.perf_counter() - started
+    return {
+        "calls": written,
+        "errors": errors,
+        "seconds": round(elapsed, 2),
+        "calls_per_second": round(written / elapsed, 2) if elapsed else None,
+        "workers": args.workers,
+        "analyses": analyses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="JSONL transcripts")
+    parser.add_argument('output', help="JSONL results (a .checkpoint file is kept next to it)")
+    parser.add_argument('--analyses', default="language,sentiment,intent,entities",
+                        help=f"comma-separated: {', '.join(ANALYSES)}")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--threads-per-worker', type=int, default=1, help="inference threads per worker")
+    parser.add_argument('--batch-size', type=int, default=8, help="calls per task sent to a worker")
+    parser.add_argument('--prefetch', type=int, default=4, help="batches in flight per worker")
+    parser.add_argument('--summary-tier', default=None, help="llm | extractive (default SUMMARY_TIER)")
+    parser.add_argument('--resume', action='store_true', help="continue from the output's checkpoint")
+    parser.add_argument('--report-every', type=float, default=10.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args)))
+
+
+if __name__ == '__main__':
+    main()
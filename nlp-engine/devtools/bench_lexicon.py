@@ -0,0 +1,88 @@
+"""
+Benchmark the shared lexicon against the per-keyword substring scans it replaced
+
+Run with:
+    python -m devtools.bench_lexicon --turns 600,3000,12000
+
+The old CSAT-factor and summary-sentiment code lowercased the transcript
+and ran one `keyword in text` scan per keyword, yielding presence flags
+only. The lexicon does one regex pass with word boundaries and returns
+every occurrence with its position, so the comparison is per-call work for
+strictly more output. Also reports how many old "matches" were false
+positives inside longer words ("unhappy", "dissatisfied", "thankless").
+"""
+import time
+import argparse
+import random
+
+from services.lexicon import Lexicon
+
+OLD_CSAT_POSITIVE = ['thank', 'great', 'excellent', 'helpful', 'appreciate', 'perfect']
+OLD_CSAT_NEGATIVE = ['frustrated', 'angry', 'disappointed', 'terrible', 'awful', 'useless']
+OLD_SUMMARY_POSITIVE = ['thank', 'great', 'excellent', 'happy', 'satisfied']
+OLD_SUMMARY_NEGATIVE = ['problem', 'issue', 'frustrated', 'angry', 'disappointed']
+
+LINES = [
+    "Caller: I'm really frustrated, the internet keeps dropping every evening.",
+    "Agent: I understand, let me look into that issue for you right away.",
+    "Caller: I was charged twice and honestly I'm quite dissatisfied and unhappy.",
+    "Agent: Thanks for your patience, I can see the duplicate charge on the account.",
+    "Caller: Great, that would be helpful. The last agent was useless.",
+    "Agent: The refund will appear within three business days, reference 48213.",
+    "Caller: Perfect, thank you so much, I really appreciate it.",
+    "Agent: Is there anything else I can help you with today?",
+]
+
+
+def old_scan(transcript: str):
+    lowered = transcript.lower()
+    csat = [k for k in OLD_CSAT_POSITIVE + OLD_CSAT_NEGATIVE if k in lowered]
+    positive = sum(1 for w in OLD_SUMMARY_POSITIVE if w in lowered)
+    negative = sum(1 for w in OLD_SUMMARY_NEGATIVE if w in lowered)
+    return csat, positive, negative
+
+
+def synthetic_transcript(turns: int, seed: int = 11) -> str:
+    rng = random.Random(seed)
+    return '\n'.join(rng.choice(LINES) for _ in range(turns))
+
+
+def timed(fn, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', default="600,3000,12000")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    lexicon = Lexicon()
+    lexicon.matches("warm up", "en")
+
+    for turns in (int(t) for t in args.turns.split(',')):
+        transcript = synthetic_transcript(turns)
+        old_seconds, _ = timed(lambda: old_scan(transcript), args.repeat)
+        new_seconds, matches = timed(lambda: lexicon.matches(transcript, "en"), args.repeat)
+        per_turn_seconds, _ = timed(lambda: lexicon.scan_turns(transcript.splitlines(), "en"), args.repeat)
+
+        mb = len(transcript.encode('utf-8')) / 1e6
+        print(f"{turns:>6} turns {mb * 1000:8.0f} KB  "
+              f"substring scans {old_seconds * 1000:7.2f}ms ({mb / old_seconds:6.1f} MB/s, presence only)  "
+              f"lexicon {new_seconds * 1000:7.2f}ms ({mb / new_seconds:6.1f} MB/s, {len(matches)} occurrences)  "
+              f"per-turn {per_turn_seconds * 1000:7.2f}ms")
+
+    # Substring hits that are not whole words
+    sample = '\n'.join(LINES)
+    old_hits = {k for k in OLD_SUMMARY_POSITIVE + OLD_SUMMARY_NEGATIVE + OLD_CSAT_POSITIVE + OLD_CSAT_NEGATIVE
+                if k in sample.lower()}
+    matched = {sample[m.start:m.end].lower() for m in lexicon.matches(sample, "en")}
+    false_hits = sorted(k for k in old_hits if not any(word.startswith(k) for word in matched))
+    print(f"old substring hits that are not words in the sample: {false_hits}")
+
+
+if __name__ == '__main__':
+    main()
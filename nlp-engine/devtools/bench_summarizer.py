@@ -0,0 +1,96 @@
+"""
+Benchmark long-transcript summarization with the local stand-in LLM
+
+Run with:
+    python -m devtools.bench_summarizer --turns 600 --latency-ms 400
+
+Compares the post-call latency of map-reduce summarization at several
+concurrency limits with the incremental mode, where chunks are summarized
+while the (simulated) call is still running, and with the local
+extractive tier (no LLM calls at all).
+"""
+import os
+import time
+import asyncio
+import argparse
+import random
+
+TOPICS = [
+    "my internet keeps dropping in the evening",
+    "I was charged twice for last month",
+    "can you move my appointment to Thursday",
+    "the router lights are blinking orange",
+    "I want to upgrade my plan",
+]
+
+
+def synthetic_turns(turns: int, seed: int = 7):
+    rng = random.Random(seed)
+    for i in range(turns):
+        caller = f"{rng.choice(TOPICS)}, and also {rng.choice(TOPICS)} (minute {i // 10})"
+        if i == int(turns * 0.6):
+            caller = "Okay, I promise to pay the outstanding 240 dollars by Friday."
+        agent = f"I understand. Let me check that for you, reference {rng.randint(10000, 99999)}."
+        yield caller, agent
+
+
+async def run(turns: int, concurrency_levels, chunk_chars: int, turn_interval_ms: float):
+    from services.summarizer import SummarizationService
+
+    pairs = list(synthetic_turns(turns))
+    transcript = '\n'.join(f"Caller: {c}\nAgent: {a}" for c, a in pairs)
+    print(f"transcript: {turns} turns, {len(transcript)} chars, chunk={chunk_chars} chars")
+
+    for concurrency in concurrency_levels:
+        os.environ['SUMMARY_MAP_CONCURRENCY'] = str(concurrency)
+        service = SummarizationService()
+        started = time.perf_counter()
+        result = await service.summarize(transcript)
+        elapsed = time.perf_counter() - started
+        print(f"map-reduce  concurrency={concurrency:<3} {elapsed * 1000:8.1f}ms  "
+              f"llm_calls={service.local_llm.requests} rounds={service.reduce_rounds} "
+              f"summary_ok={bool(result['summary'])}")
+
+    service = SummarizationService()
+    for size in (turns // 10, turns, turns * 5):
+        text = '\n'.join(f"Caller: {c}\nAgent: {a}" for c, a in synthetic_turns(size))
+        started = time.perf_counter()
+        result = await service.summarize(text, tier='extractive')
+        promise_found = any('promise to pay' in a['action'] for a in result['action_items'])
+        print(f"extractive  {size:>5} turns {(time.perf_counter() - started) * 1000:8.1f}ms  "
+              f"{len(text)} chars, payment promise in action items={promise_found}")
+
+    os.environ['SUMMARY_INCREMENTAL'] = 'true'
+    service = SummarizationService()
+    call_started = time.perf_counter()
+    for caller, agent in pairs:
+        service.observe_turn("bench-call", "en", caller, agent)
+        # Turns arrive over time; background chunk summaries run meanwhile
+        await asyncio.sleep(turn_interval_ms / 1000)
+    service.finish_call("bench-call")
+    ended = time.perf_counter()
+    result = await service.summarize(transcript, call_id="bench-call")
+    print(f"incremental {((time.perf_counter() - ended) * 1000):8.1f}ms after call end  "
+          f"llm_calls={service.local_llm.requests} (call simulated in {(ended - call_started) * 1000:.0f}ms) "
+          f"summary_ok={bool(result['summary'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=600)
+    parser.add_argument('--latency-ms', type=float, default=400, help="stand-in LLM latency per request")
+    parser.add_argument('--chunk-chars', type=int, default=2000)
+    parser.add_argument('--concurrency', default="1,4,8")
+    parser.add_argument('--turn-interval-ms', type=float, default=20, help="simulated time between turns (incremental mode)")
+    args = parser.parse_args()
+
+    os.environ['LLM_BACKEND'] = 'stub'
+    os.environ['LLM_STUB_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['SUMMARY_CHUNK_CHARS'] = str(args.chunk_chars)
+    os.environ.setdefault('OPENAI_API_KEY', 'unused')
+    levels = [int(c) for c in args.concurrency.split(',')]
+    asyncio.run(run(args.turns, levels, args.chunk_chars, args.turn_interval_ms))
+
+
+if __name__ == '__main__':
+    main()
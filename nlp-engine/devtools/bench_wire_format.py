@@ -0,0 +1,82 @@
+"""
+Benchmark /process payload encoding: FastAPI default vs orjson vs MessagePack
+
+Run with:
+    python -m devtools.bench_wire_format --history 20
+
+Builds a representative /process response (context with conversation
+history, entity list, sentiment, intent scores) and reports encoded size
+and encode/decode time per format. The FastAPI default path is
+jsonable_encoder followed by json.dumps, as JSONResponse does.
+"""
+import json
+import time
+import argparse
+
+from fastapi.encoders import jsonable_encoder
+
+from services.wire_format import decode_json, decode_msgpack, encode_json, encode_msgpack, msgpack
+
+
+def sample_payload(history: int):
+    entities = [
+        {"type": kind, "value": value, "normalized_value": normalized, "start": i * 10, "end": i * 10 + 5, "confidence": 0.9}
+        for i, (kind, value, normalized) in enumerate([
+            ("date", "tomorrow", "2026-10-20"), ("time", "10am", "10:00"),
+            ("money", "$240", 240.0), ("number", "48213", 48213), ("phone", "555-123-4567", "5551234567"),
+        ])
+    ]
+    context = {
+        "agent": {"name": "Will", "personality": "calm, concise, collections specialist"},
+        "customer": {"name": "Jordan Smith", "account": "AC-99812", "sentiment_trend": "improving"},
+        "history": [
+            {"role": "user" if i % 2 == 0 else "assistant",
+             "content": f"Turn {i}: I was charged twice for last month and need the duplicate refunded please."}
+            for i in range(history)
+        ],
+        "turn_count": history,
+    }
+    return {
+        "response": "I can see the duplicate charge; the refund will appear within three business days.",
+        "intent": "cancellation",
+        "entities": entities,
+        "sentiment": {"sentiment": "negative", "score": -0.62, "confidence": 0.81,
+                      "emotions": [{"emotion": "anger", "confidence": 0.55}, {"emotion": "sadness", "confidence": 0.2}],
+                      "language": "en"},
+        "confidence": 0.67,
+        "context": context,
+        "should_end_call": False,
+        "all_scores": {"complaint": 0.5, "cancellation": 0.67, "question": 0.5, "help": 1.0},
+    }
+
+
+def timed(fn, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1e6, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--history', type=int, default=20, help="context history turns")
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = sample_payload(args.history)
+    formats = [
+        ("fastapi default", lambda: json.dumps(jsonable_encoder(payload), ensure_ascii=False).encode('utf-8'), json.loads),
+        ("orjson", lambda: encode_json(payload), decode_json),
+    ]
+    if msgpack is not None:
+        formats.append(("msgpack", lambda: encode_msgpack(payload), decode_msgpack))
+
+    print(f"/process response with {args.history} history turns")
+    for name, encode, decode in formats:
+        encode_us, body = timed(encode, args.repeat)
+        decode_us, _ = timed(lambda: decode(body), args.repeat)
+        print(f"{name:16s} {len(body):7d} bytes  encode {encode_us:7.1f}us  decode {decode_us:7.1f}us")
+
+
+if __name__ == '__main__':
+    main()
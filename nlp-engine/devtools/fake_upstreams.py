@@ -0,0 +1,208 @@
+"""
+Local stand-in servers for the NLP engine's upstream providers
+
+Run with:
+    uvicorn devtools.fake_upstreams:app --port 9100
+
+and point the engine at it, e.g. TRANSLATION_UPSTREAM_URL=http://localhost:9100.
+Latency and error behaviour are configured through FAKE_UPSTREAM_* variables
+or per request with the x-fake-latency-ms / x-fake-error-rate headers.
+FAKE_UPSTREAM_LATENCY_DIST shapes every delay around its mean (normal,
+lognormal for a long tail, exponential, or constant), and
+FAKE_UPSTREAM_ERROR_STATUSES ("503,429,500") picks injected error codes.
+
+Streaming OpenAI and Anthropic chat fakes are served too
+(OPENAI_BASE_URL=http://localhost:9100/v1, ANTHROPIC_BASE_URL=http://localhost:9100);
+their time to first token is set per provider with FAKE_OPENAI_TTFT_MS /
+FAKE_ANTHROPIC_TTFT_MS, and FAKE_SLOW_RATE makes that fraction of requests
+stall for FAKE_SLOW_TTFT_MS to exercise hedging.
+"""
+import os
+import json
+import math
+import random
+import asyncio
+import hashlib
+from typing import AsyncIterator, Optional
+
+from fastapi import FastAPI, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="GlobalVoice Nexus fake upstreams")
+
+LATENCY_MS = float(os.getenv('FAKE_UPSTREAM_LATENCY_MS', 20))
+LATENCY_JITTER_MS = float(os.getenv('FAKE_UPSTREAM_JITTER_MS', 10))
+LATENCY_DIST = os.getenv('FAKE_UPSTREAM_LATENCY_DIST', 'normal').lower()
+ERROR_RATE = float(os.getenv('FAKE_UPSTREAM_ERROR_RATE', 0))
+ERROR_STATUSES = [int(code) for code in os.getenv('FAKE_UPSTREAM_ERROR_STATUSES', '').split(',') if code.strip()]
+
+TTFT_MS = {
+    "openai": float(os.getenv('FAKE_OPENAI_TTFT_MS', 300)),
+    "anthropic": float(os.getenv('FAKE_ANTHROPIC_TTFT_MS', 400)),
+}
+SLOW_RATE = float(os.getenv('FAKE_SLOW_RATE', 0))
+SLOW_TTFT_MS = float(os.getenv('FAKE_SLOW_TTFT_MS', 3000))
+TOKEN_INTERVAL_MS = float(os.getenv('FAKE_TOKEN_INTERVAL_MS', 15))
+
+stats = {"requests": 0, "errors_injected": 0, "chat_requests": {"openai": 0, "anthropic": 0}, "slow_injected": 0}
+
+
+def sample_delay_ms(mean_ms: float) -> float:
+    """
+    One delay drawn from FAKE_UPSTREAM_LATENCY_DIST around mean_ms
+    """
+    if mean_ms <= 0 or LATENCY_DIST == 'constant':
+        return max(0.0, mean_ms)
+    if LATENCY_DIST == 'exponential':
+        return random.expovariate(1 / mean_ms)
+    if LATENCY_DIST == 'lognormal':
+        # Jitter sets the spread; the median sits below the mean, as real p99s do
+        sigma = max(0.1, min(2.0, LATENCY_JITTER_MS / mean_ms))
+        return random.lognormvariate(math.log(mean_ms) - sigma ** 2 / 2, sigma)
+    return max(0.0, random.gauss(mean_ms, LATENCY_JITTER_MS))
+
+
+def error_status(default: int) -> int:
+    return random.choice(ERROR_STATUSES) if ERROR_STATUSES else default
+
+
+async def simulate(request: Request) -> Optional[JSONResponse]:
+    """
+    Sleep for the configured latency and maybe inject a 503
+    """
+    stats["requests"] += 1
+    latency = float(request.headers.get('x-fake-latency-ms', LATENCY_MS))
+    error_rate = float(request.headers.get('x-fake-error-rate', ERROR_RATE))
+
+    await asyncio.sleep(sample_delay_ms(latency) / 1000)
+    if random.random() < error_rate:
+        stats["errors_injected"] += 1
+        return JSONResponse({"error": "injected failure"}, status_code=error_status(503))
+    return None
+
+
+@app.post("/translate_a/single")
+async def google_translate(request: Request, sl: str, tl: str, q: str = Form(...)):
+    """
+    Mimics Google's gtx endpoint: each line comes back as "[tl] line"
+    """
+    failure = await simulate(request)
+    if failure is not None:
+        return failure
+
+    lines = q.split("\n")
+    segments = [[f"[{tl}] {line}" + ("\n" if i < len(lines) - 1 else ""), line] for i, line in enumerate(lines)]
+    return [segments, None, sl]
+
+
+def _chat_reply(messages) -> list:
+    """
+    Deterministic short reply, split into streamable words
+    """
+    digest = hashlib.sha1(json.dumps(messages, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:8]
+    return f"Fake reply {digest}: happy to help with that.".split(" ")
+
+
+async def _first_token_delay(provider: str, request: Request):
+    ttft = float(request.headers.get('x-fake-ttft-ms', TTFT_MS[provider]))
+    if random.random() < SLOW_RATE:
+        stats["slow_injected"] += 1
+        ttft = SLOW_TTFT_MS
+    await asyncio.sleep(sample_delay_ms(ttft) / 1000)
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def openai_chat(request: Request):
+    """
+    OpenAI-compatible chat completions (streaming and non-streaming)
+    """
+    stats["chat_requests"]["openai"] += 1
+    body = await request.json()
+    words = _chat_reply(body.get("messages", []))
+    usage = {"prompt_tokens": 100, "completion_tokens": len(words), "total_tokens": 100 + len(words),
+             "prompt_tokens_details": {"cached_tokens": 0}}
+    base = {"id": "chatcmpl-fake", "created": 0, "model": body.get("model", "fake")}
+
+    if random.random() < ERROR_RATE:
+        stats["errors_injected"] += 1
+        return JSONResponse({"error": {"message": "injected failure"}}, status_code=error_status(503))
+
+    if not body.get("stream"):
+        await _first_token_delay("openai", request)
+        content = " ".join(words)
+        if (body.get("response_format") or {}).get("type") in ("json_object", "json_schema"):
+            content = json.dumps({
+                "summary": content,
+                "key_points": ["Caller asked for help", "Agent offered assistance"],
+                "action_items": [{"responsible": "Agent", "action": "Follow up"}],
+            })
+        return dict(base, object="chat.completion", usage=usage, choices=[{
+            "index": 0, "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }])
+
+    async def events() -> AsyncIterator[str]:
+        await _first_token_delay("openai", request)
+        for i, word in enumerate(words):
+            delta = {"role": "assistant", "content": word} if i == 0 else {"content": " " + word}
+            yield _sse(dict(base, object="chat.completion.chunk",
+                            choices=[{"index": 0, "delta": delta, "finish_reason": None}]))
+            await asyncio.sleep(TOKEN_INTERVAL_MS / 1000)
+        yield _sse(dict(base, object="chat.completion.chunk",
+                        choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        yield _sse(dict(base, object="chat.completion.chunk", choices=[], usage=usage))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/messages")
+async def anthropic_messages(request: Request):
+    """
+    Anthropic-compatible messages API (streaming and non-streaming)
+    """
+    stats["chat_requests"]["anthropic"] += 1
+    body = await request.json()
+    words = _chat_reply(body.get("messages", []))
+    usage = {"input_tokens": 100, "output_tokens": len(words),
+             "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+    message = {"id": "msg_fake", "type": "message", "role": "assistant",
+               "model": body.get("model", "fake"), "stop_reason": None, "stop_sequence": None}
+
+    if random.random() < ERROR_RATE:
+        stats["errors_injected"] += 1
+        return JSONResponse({"type": "error", "error": {"type": "overloaded_error", "message": "injected failure"}},
+                            status_code=error_status(529))
+
+    if not body.get("stream"):
+        await _first_token_delay("anthropic", request)
+        return dict(message, stop_reason="end_turn", usage=usage,
+                    content=[{"type": "text", "text": " ".join(words)}])
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse({"type": "message_start", "message": dict(message, content=[], usage=dict(usage, output_tokens=1))},
+                   "message_start")
+        await _first_token_delay("anthropic", request)
+        yield _sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+                   "content_block_start")
+        for i, word in enumerate(words):
+            text = word if i == 0 else " " + word
+            yield _sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}},
+                       "content_block_delta")
+            await asyncio.sleep(TOKEN_INTERVAL_MS / 1000)
+        yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+        yield _sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": len(words)}}, "message_delta")
+        yield _sse({"type": "message_stop"}, "message_stop")
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
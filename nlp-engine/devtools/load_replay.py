@@ -0,0 +1,475 @@
+"""
+Replay recorded call sessions against the engine under load
+
+Run with:
+    python -m devtools.load_replay sessions.jsonl --url http://localhost:8001 --rate 5 --concurrency 40 --output runs/base.json
+    python -m devtools.load_replay --synthetic 200 --spawn --fake-llm-ms 400 --fake-error-rate 0.02 --output runs/new.json
+    python -m devtools.load_replay --compare runs/base.json runs/new.json
+
+Each session follows the backend's call flow: /detect-language and a
+/translate of the greeting when the call starts, one /process per caller
+turn (carrying the returned context forward, after the recorded gap), then
+/conversation/end and, for a --post-call fraction of calls, /post-call over
+the transcript. Sessions arrive as a Poisson process at --rate per second
+(0 = all at once) with at most --concurrency calls in progress.
+
+Input is JSONL, one session per line: {"agent_id", "language", "caller",
+"turns": ["text", {"text": "...", "delay_ms": 1200}, ...]}, or
+{"transcript": "Caller: ...\\nAgent: ..."} whose caller turns are replayed.
+
+--spawn starts devtools.fake_upstreams and the engine with OpenAI,
+Anthropic and Google Translate pointed at the fakes, so no real provider
+is called; the --fake-* flags set their latency distribution and error
+rate. Add --stub to use the in-process LocalStubLLM and stub translator
+instead of fake servers.
+
+Reports throughput, status codes and p50/p95/p99 per endpoint and per
+stage (the timings_ms of /process and /post-call), and saves everything as
+JSON for --compare.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import subprocess
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+GREETING = "Hello! How can I help you today?"
+
+SYNTHETIC_TURNS = {
+    "en": [
+        "Hi, I'm calling about my last bill.",
+        "I was charged twice for last month and I need the duplicate refunded.",
+        "My account number is 48213.",
+        "Can you move my payment to Friday the 14th?",
+        "I can pay 240 dollars today and the rest next week.",
+        "My internet keeps dropping every evening, it's really frustrating.",
+        "Okay, that works, thank you so much.",
+        "No, that's everything. Goodbye.",
+    ],
+    "es": [
+        "Hola, llamo por mi última factura.",
+        "Me cobraron dos veces el mes pasado.",
+        "Puedo pagar 240 dólares el viernes.",
+        "Gracias, eso es todo.",
+    ],
+    "fr": [
+        "Bonjour, j'appelle au sujet de ma facture.",
+        "On m'a facturé deux fois le mois dernier.",
+        "Je peux payer 240 euros vendredi.",
+        "Merci, c'est tout.",
+    ],
+}
+
+
+def synthetic_sessions(count: int, seed: int = 17) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    sessions = []
+    for i in range(count):
+        language = rng.choices(["en", "es", "fr"], weights=[7, 2, 1])[0]
+        lines = SYNTHETIC_TURNS[language]
+        turns = [{"text": rng.choice(lines), "delay_ms": rng.uniform(800, 4000)} for _ in range(rng.randint(3, 10))]
+        sessions.append({
+            "agent_id": f"agent-{rng.randint(1, 20)}",
+            "language": language,
+            "caller": f"+1555{rng.randint(1000000, 9999999)}",
+            "turns": turns,
+        })
+    return sessions
+
+
+def load_sessions(path: str) -> List[Dict[str, Any]]:
+    from services.extractive_summarizer import split_turns
+    from services.post_call import AGENT_SPEAKERS
+
+    sessions = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "turns" not in record and record.get("transcript"):
+                record["turns"] = [
+                    text for speaker, text in split_turns(record["transcript"])
+                    if speaker.lower() not in AGENT_SPEAKERS
+                ]
+            if record.get("turns"):
+                sessions.append(record)
+    return sessions
+
+
+def session_turns(session: Dict[str, Any], default_delay_ms: float) -> List[Tuple[str, float]]:
+    turns = []
+    for turn in session["turns"]:
+        if isinstance(turn, str):
+            turns.append((turn, default_delay_ms))
+        else:
+            turns.append((turn["text"], float(turn.get("delay_ms", default_delay_ms))))
+    return turns
+
+
+def percentiles(samples: List[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p50_ms": rank(0.50),
+        "p95_ms": rank(0.95),
+        "p99_ms": rank(0.99),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+class Recorder:
+    """
+    Latency samples per endpoint and per engine-reported stage
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, endpoint: str, seconds: float, status: Any, body: Optional[Dict[str, Any]]):
+        self.latencies[endpoint].append(seconds * 1000)
+        self.statuses[endpoint][str(status)] += 1
+        if isinstance(body, dict) and isinstance(body.get("timings_ms"), dict):
+            for stage, ms in body["timings_ms"].items():
+                self.stages[f"{endpoint} {stage}"].append(ms)
+
+    def summary(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            statuses = self.statuses[endpoint]
+            failed = sum(count for status, count in statuses.items() if not status.startswith('2'))
+            endpoints[endpoint] = dict(
+                percentiles(samples),
+                statuses=dict(statuses),
+                error_rate=round(failed / len(samples), 4),
+            )
+        return {
+            "endpoints": endpoints,
+            "stages": {stage: percentiles(samples) for stage, samples in sorted(self.stages.items())},
+        }
+
+
+class Replayer:
+    """
+    Plays one session at a time through the engine's endpoints
+    """
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, args, seed: int):
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self.rng = random.Random(seed)
+        self.completed = 0
+        self.turns = 0
+
+    async def post(self, path: str, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        data = None
+        try:
+            response = await self.client.post(path, json=body)
+            status: Any = response.status_code
+            if response.is_success:
+                data = response.json()
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.recorder.record(path, time.perf_counter() - started, status, data)
+        return data
+
+    async def play(self, session: Dict[str, Any]):
+        agent_id = session.get("agent_id", "agent-replay")
+        call_id = f"replay-{uuid.uuid4().hex[:12]}"
+        language = session.get("language") or "en"
+
+        if session.get("caller"):
+            await self.post("/detect-language", {"text": session["caller"]})
+        await self.post("/translate", {"text": GREETING, "from_language": "en", "to_language": language})
+
+        context: Dict[str, Any] = {}
+        transcript = [f"Agent: {GREETING}"]
+        for text, delay_ms in session_turns(session, self.args.think_ms):
+            if self.args.speed > 0:
+                await asyncio.sleep(delay_ms / 1000 / self.args.speed)
+            data = await self.post("/process", {
+                "text": text,
+                "language": language,
+                "agent_id": agent_id,
+                "call_id": call_id,
+                "context": context,
+            })
+            self.turns += 1
+            transcript.append(f"Caller: {text}")
+            if data is None:
+                continue
+            context = data.get("context") or {}
+            transcript.append(f"Agent: {data.get('response', '')}")
+            if data.get("should_end_call"):
+                break
+
+        await self.post("/conversation/end", {"agent_id": agent_id, "call_id": call_id})
+        if self.rng.random() < self.args.post_call:
+            await self.post("/post-call", {
+                "transcript": '\n'.join(transcript),
+                "language": language,
+                "call_id": call_id,
+            })
+        self.completed += 1
+
+
+async def fetch_json(client: httpx.AsyncClient, url: str) -> Optional[Dict[str, Any]]:
+    try:
+        response = await client.get(url)
+        return response.json() if response.is_success else None
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def replay(args, sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    total = args.sessions or (None if args.duration else len(sessions))
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        fake_before = await fetch_json(client, f"{args.fake_url}/stats") if args.fake_url else None
+        replayer = Replayer(client, recorder, args, args.seed)
+        slots = asyncio.Semaphore(args.concurrency)
+        arrivals = random.Random(args.seed)
+        tasks = []
+        delayed = 0
+
+        async def run_one(session):
+            try:
+                await replayer.play(session)
+            except Exception as e:
+                print(f"session failed: {type(e).__name__}: {e}", file=sys.stderr)
+            finally:
+                slots.release()
+
+        started = time.perf_counter()
+        deadline = started + args.duration if args.duration else None
+        while (total is None or len(tasks) < total) and (deadline is None or time.perf_counter() < deadline):
+            if slots.locked():
+                # Arrivals are backing up behind --concurrency: load is now closed-loop
+                delayed += 1
+            await slots.acquire()
+            tasks.append(asyncio.create_task(run_one(sessions[len(tasks) % len(sessions)])))
+            if args.rate > 0:
+                await asyncio.sleep(arrivals.expovariate(args.rate))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        engine_stats = {}
+        for path in ("/admission/stats", "/llm/stats", "/translate/stats", "/memory/stats"):
+            engine_stats[path] = await fetch_json(client, path)
+        fake_after = await fetch_json(client, f"{args.fake_url}/stats") if args.fake_url else None
+
+    requests = sum(len(samples) for samples in recorder.latencies.values())
+    return dict(
+        started_at=time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(time.time() - elapsed)),
+        config={key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        wall_seconds=round(elapsed, 2),
+        sessions={"started": len(tasks), "completed": replayer.completed, "delayed_by_concurrency": delayed},
+        turns=replayer.turns,
+        requests=requests,
+        throughput_rps=round(requests / elapsed, 2) if elapsed else None,
+        turns_per_second=round(replayer.turns / elapsed, 2) if elapsed else None,
+        upstreams={"before": fake_before, "after": fake_after} if args.fake_url else None,
+        engine_stats=engine_stats,
+        **recorder.summary()
+    )
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"{result['sessions']['completed']} sessions, {result['turns']} turns, {result['requests']} requests "
+          f"in {result['wall_seconds']}s ({result['throughput_rps']} req/s, {result['turns_per_second']} turns/s)")
+    for title, rows in (("endpoint", result["endpoints"]), ("stage", result["stages"])):
+        print(f"\n{title:32s} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'errors':>7}")
+        for name, row in rows.items():
+            if not row.get("count"):
+                continue
+            errors = f"{row['error_rate'] * 100:6.2f}%" if "error_rate" in row else ""
+            print(f"{name:32s} {row['count']:7d} {row['p50_ms']:9.1f} {row['p95_ms']:9.1f} "
+                  f"{row['p99_ms']:9.1f} {row['max_ms']:9.1f} {errors:>7}")
+
+
+def compare(base_path: str, new_path: str):
+    with open(base_path, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+
+    def delta(old: Optional[float], current: Optional[float]) -> str:
+        if not old or current is None:
+            return "      n/a"
+        return f"{(current - old) / old * 100:+8.1f}%"
+
+    print(f"base {base_path} ({base['started_at']})  vs  new {new_path} ({new['started_at']})")
+    print(f"throughput {base['throughput_rps']} -> {new['throughput_rps']} req/s "
+          f"{delta(base['throughput_rps'], new['throughput_rps'])}")
+    for section in ("endpoints", "stages"):
+        print(f"\n{section[:-1]:32s} {'p50 base':>9} {'new':>9} {'Δ':>9} {'p95 base':>9} {'new':>9} {'Δ':>9} "
+              f"{'p99 base':>9} {'new':>9} {'Δ':>9}")
+        for name in sorted(set(base[section]) | set(new[section])):
+            old_row, new_row = base[section].get(name, {}), new[section].get(name, {})
+            cells = []
+            for p in ("p50_ms", "p95_ms", "p99_ms"):
+                old, current = old_row.get(p), new_row.get(p)
+                cells.append(f"{old if old is not None else '-':>9} {current if current is not None else '-':>9} "
+                             f"{delta(old, current)}")
+            print(f"{name:32s} " + " ".join(cells))
+
+
+def wait_ready(url: str, timeout: float, process: subprocess.Popen):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{url} exited during startup (code {process.returncode})")
+        try:
+            if httpx.get(url, timeout=1).is_success:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"{url} not ready after {timeout:.0f}s")
+
+
+def spawn(args) -> List[subprocess.Popen]:
+    """
+    Start the fake upstreams (unless --stub) and the engine pointed at them
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    log = open(args.log, 'ab') if args.log else subprocess.DEVNULL
+    processes = []
+    engine_env = dict(os.environ)
+
+    if args.stub:
+        engine_env.update(
+            LLM_BACKEND="stub",
+            LLM_STUB_LATENCY_MS=str(args.fake_llm_ms),
+            TRANSLATION_BACKEND="stub",
+            TRANSLATION_STUB_LATENCY_MS=str(args.fake_latency_ms),
+        )
+    else:
+        fake_env = dict(
+            os.environ,
+            FAKE_UPSTREAM_LATENCY_MS=str(args.fake_latency_ms),
+            FAKE_UPSTREAM_JITTER_MS=str(args.fake_jitter_ms),
+            FAKE_UPSTREAM_LATENCY_DIST=args.fake_dist,
+            FAKE_UPSTREAM_ERROR_RATE=str(args.fake_error_rate),
+            FAKE_UPSTREAM_ERROR_STATUSES=args.fake_error_statuses,
+            FAKE_OPENAI_TTFT_MS=str(args.fake_llm_ms),
+            FAKE_ANTHROPIC_TTFT_MS=str(args.fake_llm_ms),
+        )
+        fakes = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "devtools.fake_upstreams:app", "--port", str(args.fake_port), "--log-level", "warning"],
+            cwd=root, env=fake_env, stdout=log, stderr=log
+        )
+        processes.append(fakes)
+        args.fake_url = f"http://127.0.0.1:{args.fake_port}"
+        wait_ready(f"{args.fake_url}/stats", 30, fakes)
+        # Never let a replay reach a real provider, whatever the shell exports
+        engine_env.update(
+            TRANSLATION_BACKEND="google",
+            TRANSLATION_UPSTREAM_URL=args.fake_url,
+            OPENAI_BASE_URL=f"{args.fake_url}/v1",
+            ANTHROPIC_BASE_URL=args.fake_url,
+            OPENAI_API_KEY="fake-key",
+            ANTHROPIC_API_KEY="fake-key",
+            LLM_BACKEND="",
+        )
+
+    engine = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", args.engine_app, "--port", str(args.port), "--log-level", "warning"],
+        cwd=root, env=engine_env, stdout=log, stderr=log
+    )
+    processes.append(engine)
+    args.url = f"http://127.0.0.1:{args.port}"
+    wait_ready(f"{args.url}/health", args.startup_timeout, engine)
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sessions_file', nargs='?', help="JSONL recorded sessions")
+    parser.add_argument('--synthetic', type=int, default=0, help="generate this many sessions instead of a file")
+    parser.add_argument('--url', default=os.getenv('NLP_ENGINE_URL', 'http://localhost:8001'))
+    parser.add_argument('--rate', type=float, default=2.0, help="session arrivals per second (0 = all at once)")
+    parser.add_argument('--concurrency', type=int, default=50, help="max calls in progress")
+    parser.add_argument('--sessions', type=int, default=None, help="sessions to start (default: one pass over the input)")
+    parser.add_argument('--duration', type=float, default=None, help="stop starting sessions after this many seconds")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay gaps between turns this much faster (0 = no gaps)")
+    parser.add_argument('--think-ms', type=float, default=1500, help="gap before a turn without a recorded delay")
+    parser.add_argument('--post-call', type=float, default=1.0, help="fraction of calls followed by /post-call")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=17)
+    parser.add_argument('--output', help="save results as JSON")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="compare two saved results and exit")
+
+    spawned = parser.add_argument_group("spawned engine and fake upstreams")
+    spawned.add_argument('--spawn', action='store_true', help="start the engine (and fakes) for this run")
+    spawned.add_argument('--stub', action='store_true', help="in-process stub LLM/translator instead of fake servers")
+    spawned.add_argument('--engine-app', default="main:app")
+    spawned.add_argument('--port', type=int, default=8101)
+    spawned.add_argument('--fake-port', type=int, default=9100)
+    spawned.add_argument('--fake-url', default=None, help="fake upstreams already running (for their /stats)")
+    spawned.add_argument('--fake-latency-ms', type=float, default=60, help="translation upstream mean latency")
+    spawned.add_argument('--fake-jitter-ms', type=float, default=20)
+    spawned.add_argument('--fake-dist', default="lognormal", choices=["normal", "lognormal", "exponential", "constant"])
+    spawned.add_argument('--fake-llm-ms', type=float, default=400, help="LLM time to first token")
+    spawned.add_argument('--fake-error-rate', type=float, default=0.0)
+    spawned.add_argument('--fake-error-statuses', default="503", help="comma-separated injected status codes")
+    spawned.add_argument('--startup-timeout', type=float, default=300, help="seconds to wait for models to load")
+    spawned.add_argument('--log', default=None, help="append spawned processes' output here")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    if args.synthetic:
+        sessions = synthetic_sessions(args.synthetic, args.seed)
+    elif args.sessions_file:
+        sessions = load_sessions(args.sessions_file)
+    else:
+        parser.error("give a sessions file or --synthetic N")
+    if not sessions:
+        raise SystemExit("No sessions with turns to replay")
+
+    processes = spawn(args) if args.spawn else []
+    try:
+        result = asyncio.run(replay(args, sessions))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    print_report(result)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, default=str)
+        print(f"\nsaved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
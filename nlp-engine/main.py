@@ -1,6 +1,10 @@
 import os
+import hmac
+import math
+import time
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
@@ -13,6 +17,12 @@ from services.entity_extractor import EntityExtractor
 from services.sentiment_analyzer import SentimentAnalyzer
 from services.conversation_manager import ConversationManager
 from services.summarizer import SummarizationService
+from services.summary_jobs import SummaryJobQueue
+from services.post_call import PostCallAnalyzer
+from services.wire_format import WireRoute, wire_stats
+from services.admission import AdmissionController, AdmissionMiddleware, AdmissionRejected
+from services.model_registry import ModelRegistry
+from services.memory_inspector import MemoryInspector
 from utils.logger import setup_logger
 
 # Setup logging
@@ -25,6 +35,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# JSON (orjson) or MessagePack bodies and responses, negotiated per request
+app.router.route_class = WireRoute
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -39,9 +52,67 @@ language_detector = LanguageDetector()
 translator = TranslationService()
 intent_classifier = IntentClassifier()
 entity_extractor = EntityExtractor()
-sentiment_analyzer = SentimentAnalyzer()
+model_registry = ModelRegistry()
+sentiment_analyzer = SentimentAnalyzer(model_registry)
 conversation_manager = ConversationManager()
 summarizer = SummarizationService()
+admission = AdmissionController()
+summary_jobs = SummaryJobQueue(summarizer, admission=admission)
+post_call_analyzer = PostCallAnalyzer(sentiment_analyzer, intent_classifier, entity_extractor, summarizer)
+
+def translation_model_memory():
+    # MarianMT pool of the local backend, or of the local side of hybrid
+    backend = translator.backend
+    pool = getattr(backend, 'pool', None) or getattr(getattr(backend, 'local', None), 'pool', None)
+    return pool.memory_usage() if pool is not None else []
+
+# Every in-process cache and store that can grow, plus loaded models
+memory_inspector = MemoryInspector()
+memory_inspector.register("conversations", lambda: conversation_manager.conversations)
+memory_inspector.register("translation_cache", lambda: translator.cache)
+memory_inspector.register("response_cache", lambda: conversation_manager.response_cache.entries)
+memory_inspector.register("response_cache_vectors", lambda: conversation_manager.response_cache.vector_index())
+memory_inspector.register("prompt_prefixes", lambda: conversation_manager.prompt_prefixes)
+memory_inspector.register("template_table", lambda: conversation_manager.template_table.table)
+memory_inspector.register("rolling_summaries", lambda: summarizer.rolling)
+memory_inspector.register("summary_cache", lambda: summary_jobs.results)
+memory_inspector.register("summary_jobs", lambda: summary_jobs.jobs)
+memory_inspector.register("admission_agents", lambda: admission.agent_buckets)
+memory_inspector.register_models("registry", model_registry.memory_usage)
+memory_inspector.register_models("translation", translation_model_memory)
+
+@app.on_event("startup")
+async def load_template_table():
+    # Precomputed multilingual templates; build in the background if none on disk
+    if conversation_manager.template_table.load():
+        return
+    if os.getenv('TEMPLATE_TABLE_BUILD_ON_STARTUP', 'false').lower() == 'true':
+        conversation_manager.template_table.start_build(translator)
+    else:
+        logger.info("No template table on disk; run `python -m services.template_table` to build one")
+
+@app.on_event("startup")
+async def warm_load_sessions():
+    # Recover live calls from the session journal (no-op without one)
+    await conversation_manager.conversations.load()
+
+# Reserve capacity for live turns; shed offline work first under pressure
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+@app.on_event("startup")
+async def start_summary_workers():
+    summary_jobs.start()
+
+@app.on_event("startup")
+async def start_admission_monitor():
+    admission.start()
+
+@app.on_event("shutdown")
+async def close_upstream_clients():
+    await admission.stop()
+    await summary_jobs.stop()
+    await translator.aclose()
+    await conversation_manager.conversations.aclose()
 
 # Pydantic models
 class LanguageDetectionRequest(BaseModel):
@@ -52,6 +123,11 @@ class TranslationRequest(BaseModel):
     from_language: str
     to_language: str
 
+class BatchTranslationRequest(BaseModel):
+    texts: List[str]
+    from_language: str
+    to_language: str
+
 class ProcessRequest(BaseModel):
     text: str
     language: str
@@ -59,6 +135,13 @@ class ProcessRequest(BaseModel):
     call_id: str
     context: Dict[str, Any] = {}
 
+class EndConversationRequest(BaseModel):
+    agent_id: str
+    call_id: str
+
+class ResponseCacheInvalidateRequest(BaseModel):
+    agent_id: str
+
 class SentimentRequest(BaseModel):
     text: str
     language: str = "en"
@@ -75,11 +158,47 @@ class EntityRequest(BaseModel):
 class SummarizeRequest(BaseModel):
     transcript: str
     language: str = "en"
+    call_id: Optional[str] = None
+    tier: Optional[str] = None
+
+class SummaryJobRequest(BaseModel):
+    transcript: str
+    language: str = "en"
+    call_id: Optional[str] = None
+    priority: str = "normal"
+    callback_url: Optional[str] = None
+    tier: Optional[str] = None
 
 class CSATRequest(BaseModel):
     transcript: str
     sentiment: Dict[str, Any]
 
+class PostCallRequest(BaseModel):
+    transcript: str
+    language: str = "en"
+    call_id: Optional[str] = None
+    include_summary: bool = True
+    tier: Optional[str] = None
+
+class ModelLoadRequest(BaseModel):
+    # Omitted fields come from the registry config (MODEL_REGISTRY_PATH)
+    model: Optional[str] = None
+    task: Optional[str] = None
+    revision: Optional[str] = None
+    options: Optional[Dict[str, Any]] = None
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Gate runtime admin endpoints (model loads, cache invalidation, tracemalloc) on ADMIN_API_TOKEN
+
+    With no token configured they are disabled outright.
+    """
+    expected = os.getenv('ADMIN_API_TOKEN')
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_API_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token")
+
 # Health check
 @app.get("/health")
 async def health_check():
@@ -124,29 +243,74 @@ async def translate(request: TranslationRequest):
         logger.error(f"Translation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Batch translation endpoint
+@app.post("/translate/batch")
+async def translate_batch(request: BatchTranslationRequest):
+    try:
+        translations = await translator.batch_translate(
+            request.texts,
+            request.from_language,
+            request.to_language
+        )
+        
+        return {
+            "translations": translations,
+            "from_language": request.from_language,
+            "to_language": request.to_language,
+            "count": len(translations)
+        }
+    except Exception as e:
+        logger.error(f"Batch translation error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Translation cache and coalescing metrics endpoint
+@app.get("/translate/stats")
+async def translation_stats():
+    return translator.get_stats()
+
+# Template table coverage endpoint
+@app.get("/templates/stats")
+async def template_stats():
+    return conversation_manager.template_table.get_stats()
+
 # Main processing endpoint
 @app.post("/process")
 async def process_input(request: ProcessRequest):
     try:
+        admission.check_agent(request.agent_id)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+    try:
+        # Per-stage latency, reported like /post-call's timings_ms
+        timings = {}
+        started = stage_started = time.perf_counter()
+        
         # Detect intent
         intent_result = await intent_classifier.classify(
             request.text,
             request.language
         )
+        timings["intent"] = time.perf_counter() - stage_started
         
         # Extract entities
+        stage_started = time.perf_counter()
         entities = await entity_extractor.extract(
             request.text,
             request.language
         )
+        timings["entities"] = time.perf_counter() - stage_started
         
         # Analyze sentiment
+        stage_started = time.perf_counter()
         sentiment = await sentiment_analyzer.analyze(
             request.text,
             request.language
         )
+        timings["sentiment"] = time.perf_counter() - stage_started
         
         # Generate response using conversation manager
+        stage_started = time.perf_counter()
         response_data = await conversation_manager.generate_response(
             text=request.text,
             language=request.language,
@@ -157,6 +321,11 @@ async def process_input(request: ProcessRequest):
             entities=entities,
             sentiment=sentiment
         )
+        timings["response"] = time.perf_counter() - stage_started
+        
+        # Keep the call's rolling summary current (SUMMARY_INCREMENTAL=true)
+        summarizer.observe_turn(request.call_id, request.language, request.text, response_data["response"])
+        timings["total"] = time.perf_counter() - started
         
         return {
             "response": response_data["response"],
@@ -165,12 +334,55 @@ async def process_input(request: ProcessRequest):
             "sentiment": sentiment,
             "confidence": intent_result["confidence"],
             "context": response_data["context"],
-            "should_end_call": response_data.get("should_end_call", False)
+            "should_end_call": response_data.get("should_end_call", False),
+            "timings_ms": {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
         }
     except Exception as e:
         logger.error(f"Processing error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# End-of-call endpoint: release conversation state
+@app.post("/conversation/end")
+async def end_conversation(request: EndConversationRequest):
+    try:
+        ended = await conversation_manager.clear_conversation(
+            request.agent_id,
+            request.call_id
+        )
+        
+        # Finish the rolling summary now so /summarize is ready right away
+        summarizer.finish_call(request.call_id)
+        
+        return {"ended": ended, "call_id": request.call_id}
+    except Exception as e:
+        logger.error(f"End conversation error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Conversation session store metrics endpoint
+@app.get("/conversation/stats")
+async def conversation_stats():
+    return await conversation_manager.get_session_stats()
+
+# Per-agent LLM response cache endpoints
+@app.post("/response-cache/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_response_cache(request: ResponseCacheInvalidateRequest):
+    conversation_manager.response_cache.invalidate(request.agent_id)
+    return {"invalidated": True, "agent_id": request.agent_id}
+
+@app.get("/response-cache/stats")
+async def response_cache_stats():
+    return conversation_manager.response_cache.get_stats()
+
+# LLM token, prompt-cache and latency metrics endpoint
+@app.get("/llm/stats")
+async def llm_stats():
+    return {
+        "usage": conversation_manager.llm_usage.get_stats(),
+        "dispatch": conversation_manager.llm_dispatcher.get_stats(),
+        "routing": conversation_manager.llm_router.get_stats(),
+        "prompt_prefixes": len(conversation_manager.prompt_prefixes)
+    }
+
 # Sentiment analysis endpoint
 @app.post("/sentiment")
 async def analyze_sentiment(request: SentimentRequest):
@@ -220,7 +432,9 @@ async def summarize_conversation(request: SummarizeRequest):
     try:
         result = await summarizer.summarize(
             request.transcript,
-            request.language
+            request.language,
+            call_id=request.call_id,
+            tier=request.tier
         )
         
         return result
@@ -228,6 +442,38 @@ async def summarize_conversation(request: SummarizeRequest):
         logger.error(f"Summarization error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/summarize/stats")
+async def summarize_stats():
+    stats = summarizer.get_stats()
+    stats["jobs"] = summary_jobs.get_stats()
+    return stats
+
+# Asynchronous summary jobs: submit, then poll (optionally long-poll) or get a callback
+@app.post("/summarize/jobs", status_code=202)
+async def submit_summary_job(request: SummaryJobRequest):
+    try:
+        job = summary_jobs.submit(
+            request.transcript,
+            request.language,
+            priority=request.priority,
+            call_id=request.call_id,
+            callback_url=request.callback_url,
+            tier=request.tier
+        )
+    except OverflowError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"job_id": job.id, "status": job.status, "cached": job.cached}
+
+@app.get("/summarize/jobs/{job_id}")
+async def get_summary_job(job_id: str, wait: float = 0):
+    job = await summary_jobs.wait(job_id, min(wait, 30)) if wait > 0 else summary_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown summary job")
+    return job.to_dict()
+
 # CSAT calculation endpoint
 @app.post("/csat")
 async def calculate_csat(request: CSATRequest):
@@ -242,6 +488,87 @@ async def calculate_csat(request: CSATRequest):
         logger.error(f"CSAT calculation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/admission/stats")
+async def admission_stats():
+    return admission.get_stats()
+
+@app.get("/wire/stats")
+async def wire_format_stats():
+    return wire_stats.get_stats()
+
+# Post-call analytics: summary, CSAT, sentiment trajectory, intents and
+# entities from one pass over the transcript
+@app.post("/post-call")
+async def analyze_post_call(request: PostCallRequest):
+    try:
+        result = await post_call_analyzer.analyze(
+            request.transcript,
+            request.language,
+            call_id=request.call_id,
+            include_summary=request.include_summary,
+            tier=request.tier
+        )
+        
+        return result
+    except Exception as e:
+        logger.error(f"Post-call analysis error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/post-call/stats")
+async def post_call_stats():
+    return post_call_analyzer.get_stats()
+
+# Model registry: hot-swap models without a restart
+@app.post("/models/{name}/load", dependencies=[Depends(require_admin)])
+async def load_model(name: str, request: Optional[ModelLoadRequest] = None):
+    overrides = request.model_dump(exclude_none=True) if request else None
+    try:
+        version = await model_registry.load(name, overrides or None)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Model load error ({name}): {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return {"name": name, **version.to_dict()}
+
+@app.post("/models/{name}/unload", dependencies=[Depends(require_admin)])
+async def unload_model(name: str):
+    if not model_registry.unload(name):
+        raise HTTPException(status_code=404, detail=f"Model '{name}' is not loaded")
+    return {"name": name, "unloaded": True}
+
+@app.get("/models/stats")
+async def model_stats():
+    return model_registry.get_stats()
+
+# Memory introspection: sizes per cache/store/model, and opt-in tracemalloc diffs
+@app.get("/memory/stats")
+async def memory_stats():
+    return await memory_inspector.collect()
+
+@app.post("/memory/snapshot", dependencies=[Depends(require_admin)])
+async def memory_snapshot():
+    try:
+        return await memory_inspector.snapshot()
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+@app.get("/memory/diff", dependencies=[Depends(require_admin)])
+async def memory_diff(top: int = 25, group_by: str = "lineno"):
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    try:
+        return await memory_inspector.diff(min(top, 500), group_by)
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/memory/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def memory_tracemalloc_stop():
+    return memory_inspector.stop_tracing()
+
 # Supported languages endpoint
 @app.get("/languages")
 async def get_supported_languages():
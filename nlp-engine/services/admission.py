@@ -0,0 +1,326 @@
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Highest priority first
+CLASSES = ("live", "standard", "batch")
+
+# Path prefix -> priority class; unlisted paths (health, stats) bypass admission
+ENDPOINT_CLASSES = {
+    "/process": "live",
+    "/translate/batch": "batch",
+    "/translate": "live",
+    "/detect-language": "live",
+    "/intent": "standard",
+    "/entities": "standard",
+    "/sentiment": "standard",
+    "/conversation/end": "standard",
+    "/summarize/jobs": "standard",
+    "/summarize": "batch",
+    "/csat": "batch",
+    "/post-call": "batch",
+}
+
+
+def classify(path: str) -> Optional[str]:
+    if path.endswith("/stats"):
+        return None
+    for prefix, priority in ENDPOINT_CLASSES.items():
+        if path == prefix or path.startswith(prefix + "/"):
+            return priority
+    return None
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, priority: str, reason: str, status_code: int = 503, retry_after: float = 1.0):
+        super().__init__(f"{priority} request rejected: {reason}")
+        self.priority = priority
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Refills at `rate` tokens per second up to `burst`
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.clock = clock
+        self.updated = clock()
+
+    def try_acquire(self) -> bool:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate > 0 else 1.0
+
+
+class AdmissionController:
+    """
+    Priority-aware admission for live turns vs offline work
+
+    At most max_concurrent requests run at once. live_reserved of those
+    slots are only ever given to live traffic (/process, /translate), and
+    batch work (/summarize, /csat, /post-call, summary jobs) may hold at
+    most batch_max. When slots are busy, requests wait in per-class queues
+    and freed slots go to the highest-priority waiter. Under pressure (live
+    requests waiting, or event-loop lag over max_loop_lag_ms) batch
+    requests are shed immediately, then standard ones; live requests are
+    only rejected after waiting their full queue timeout. Live turns are
+    also limited per agent by a token bucket.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        live_reserved: Optional[int] = None,
+        batch_max: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.enabled = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+        self.max_concurrent = max_concurrent or int(os.getenv('ADMISSION_MAX_CONCURRENT', 64))
+        self.live_reserved = live_reserved if live_reserved is not None else int(os.getenv('ADMISSION_LIVE_RESERVED', 16))
+        self.batch_max = batch_max or int(os.getenv('ADMISSION_BATCH_MAX', max(1, self.max_concurrent // 4)))
+        self.queue_timeouts = {
+            "live": float(os.getenv('ADMISSION_QUEUE_TIMEOUT_MS_LIVE', 1000)) / 1000,
+            "standard": float(os.getenv('ADMISSION_QUEUE_TIMEOUT_MS_STANDARD', 2000)) / 1000,
+            "batch": float(os.getenv('ADMISSION_QUEUE_TIMEOUT_MS_BATCH', 5000)) / 1000,
+        }
+        self.max_queue = int(os.getenv('ADMISSION_MAX_QUEUE', 1000))
+        self.max_loop_lag = float(os.getenv('ADMISSION_MAX_LOOP_LAG_MS', 200)) / 1000
+
+        self.agent_rate = float(os.getenv('ADMISSION_AGENT_RATE', 20))
+        self.agent_burst = float(os.getenv('ADMISSION_AGENT_BURST', 40))
+        self.max_agents = int(os.getenv('ADMISSION_MAX_AGENTS', 10000))
+        self.agent_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.clock = clock
+
+        self.running = {priority: 0 for priority in CLASSES}
+        self.waiters: Dict[str, Deque[asyncio.Future]] = {priority: deque() for priority in CLASSES}
+        self.loop_lag = 0.0
+        self._lag_monitor: Optional[asyncio.Task] = None
+
+        self.admitted = {priority: 0 for priority in CLASSES}
+        self.queued = {priority: 0 for priority in CLASSES}
+        self.rejected: Dict[str, Dict[str, int]] = {priority: {} for priority in CLASSES}
+        self.wait_times: Dict[str, Deque[float]] = {priority: deque(maxlen=1000) for priority in CLASSES}
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self.running.values())
+
+    def _fits(self, priority: str) -> bool:
+        if self.in_flight >= self.max_concurrent:
+            return False
+        if priority == "live":
+            return True
+        # Standard and batch share what is left after the live reservation
+        if self.running["standard"] + self.running["batch"] >= self.max_concurrent - self.live_reserved:
+            return False
+        return priority != "batch" or self.running["batch"] < self.batch_max
+
+    def _under_pressure(self) -> bool:
+        return bool(self.waiters["live"]) or self.loop_lag > self.max_loop_lag
+
+    def _reject(self, priority: str, reason: str, status_code: int = 503, retry_after: float = 1.0):
+        self.rejected[priority][reason] = self.rejected[priority].get(reason, 0) + 1
+        raise AdmissionRejected(priority, reason, status_code, retry_after)
+
+    def check_agent(self, agent_id: Optional[str]):
+        """
+        Per-agent token bucket for live turns; raises AdmissionRejected (429)
+        """
+        if not self.enabled or not agent_id or self.agent_rate <= 0:
+            return
+        bucket = self.agent_buckets.get(agent_id)
+        if bucket is None:
+            bucket = self.agent_buckets[agent_id] = TokenBucket(self.agent_rate, self.agent_burst, self.clock)
+            while len(self.agent_buckets) > self.max_agents:
+                self.agent_buckets.popitem(last=False)
+        else:
+            self.agent_buckets.move_to_end(agent_id)
+        if not bucket.try_acquire():
+            self._reject("live", "agent_rate_limited", status_code=429, retry_after=bucket.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, priority: str, timeout: Optional[float] = None, shed: bool = True):
+        """
+        Hold a concurrency slot of the given class for the duration
+        """
+        if not self.enabled:
+            yield
+            return
+
+        await self.acquire(priority, timeout, shed)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    async def acquire(self, priority: str, timeout: Optional[float] = None, shed: bool = True):
+        """
+        Wait for a slot; raises AdmissionRejected when shed or timed out
+
+        Background callers pass shed=False and timeout=math.inf to wait
+        for capacity instead of being rejected.
+        """
+        if shed and priority != "live" and self._under_pressure():
+            # Lower classes go first: standard only sheds when live is queued
+            if priority == "batch" or self.waiters["live"]:
+                self._reject(priority, "shed")
+
+        # Queued requests of the same or a higher class get freed slots first
+        ahead = any(self.waiters[p] for p in CLASSES[:CLASSES.index(priority) + 1])
+        if not ahead and self._fits(priority):
+            self.running[priority] += 1
+            self.admitted[priority] += 1
+            self.wait_times[priority].append(0.0)
+            return
+
+        if shed and sum(len(w) for w in self.waiters.values()) >= self.max_queue:
+            self._reject(priority, "queue_full")
+
+        timeout = self.queue_timeouts[priority] if timeout is None else timeout
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters[priority].append(waiter)
+        self.queued[priority] += 1
+        started = self.clock()
+        try:
+            await asyncio.wait_for(waiter, None if math.isinf(timeout) else timeout)
+        except asyncio.TimeoutError:
+            self._reject(priority, "queue_timeout")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as we were cancelled; hand it on
+                self.release(priority)
+            raise
+        finally:
+            if waiter in self.waiters[priority]:
+                self.waiters[priority].remove(waiter)
+        self.wait_times[priority].append(self.clock() - started)
+
+    def release(self, priority: str):
+        self.running[priority] -= 1
+        self._wake()
+
+    def _wake(self):
+        for priority in CLASSES:
+            queue = self.waiters[priority]
+            while queue and self._fits(priority):
+                waiter = queue.popleft()
+                if waiter.done():
+                    continue
+                self.running[priority] += 1
+                self.admitted[priority] += 1
+                waiter.set_result(None)
+            if queue:
+                # Lower classes never jump a waiting higher class
+                return
+
+    def start(self):
+        if self.enabled and self._lag_monitor is None:
+            self._lag_monitor = asyncio.create_task(self._monitor_loop_lag())
+
+    async def stop(self):
+        if self._lag_monitor is not None:
+            self._lag_monitor.cancel()
+            self._lag_monitor = None
+
+    async def _monitor_loop_lag(self, interval: float = 0.1):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            lag = loop.time() - started - interval
+            # Fast attack, slow decay so one stall keeps batch shed for a moment
+            self.loop_lag = max(lag, self.loop_lag * 0.8)
+
+    def get_stats(self) -> Dict[str, Any]:
+        def latency(samples: Deque[float]) -> Dict[str, Optional[float]]:
+            if not samples:
+                return {"avg_ms": None, "p95_ms": None}
+            ordered = sorted(samples)
+            return {
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+            }
+
+        return {
+            "enabled": self.enabled,
+            "max_concurrent": self.max_concurrent,
+            "live_reserved": self.live_reserved,
+            "batch_max": self.batch_max,
+            "in_flight": self.in_flight,
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+            "under_pressure": self._under_pressure(),
+            "agents_tracked": len(self.agent_buckets),
+            "classes": {
+                priority: {
+                    "running": self.running[priority],
+                    "waiting": len(self.waiters[priority]),
+                    "admitted": self.admitted[priority],
+                    "queued": self.queued[priority],
+                    "rejected": dict(self.rejected[priority]),
+                    "wait": latency(self.wait_times[priority]),
+                }
+                for priority in CLASSES
+            },
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying admission control by endpoint class
+    """
+
+    def __init__(self, app: Any, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        priority = classify(scope["path"]) if scope["type"] == "http" else None
+        if priority is None or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(priority)
+        except AdmissionRejected as e:
+            await self._send_rejection(send, e)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(priority)
+
+    @staticmethod
+    async def _send_rejection(send, rejection: AdmissionRejected):
+        body = json.dumps({"detail": str(rejection), "reason": rejection.reason}).encode('utf-8')
+        await send({
+            "type": "http.response.start",
+            "status": rejection.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(rejection.retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
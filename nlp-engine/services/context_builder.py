@@ -0,0 +1,224 @@
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional; fall back to a character estimate
+    _ENCODING = None
+
+# Per-message framing overhead in chat-completion token accounting
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count for text (tiktoken when installed, ~4 chars/token otherwise)
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(text) // 4 + 1
+
+
+def compact_json(data: Any, max_value_chars: int = 200) -> str:
+    """
+    Minified JSON with empty values dropped and long strings clipped
+    """
+    def clip(value):
+        if isinstance(value, str) and len(value) > max_value_chars:
+            return value[:max_value_chars] + '…'
+        if isinstance(value, dict):
+            return {k: clip(v) for k, v in value.items() if v not in (None, '', [], {})}
+        if isinstance(value, list):
+            return [clip(v) for v in value]
+        return value
+
+    return json.dumps(clip(data), separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+class ContextBuilder:
+    """
+    Bounded conversation history with a rolling summary and token-budgeted prompts
+
+    History lives in the session as a ring buffer of at most history_limit
+    messages; messages pushed out of it are folded into a rolling summary of
+    structured facts (opening request, intents, entities) and the most
+    recent short lines, capped at summary_max_tokens. Prompts are assembled newest-first until
+    the token budget is spent.
+    """
+
+    def __init__(
+        self,
+        history_limit: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        summary_max_tokens: Optional[int] = None,
+        context_max_tokens: Optional[int] = None
+    ):
+        self.history_limit = history_limit or int(os.getenv('CONTEXT_HISTORY_LIMIT', 20))
+        self.token_budget = token_budget or int(os.getenv('CONTEXT_TOKEN_BUDGET', 1500))
+        self.summary_max_tokens = summary_max_tokens or int(os.getenv('CONTEXT_SUMMARY_MAX_TOKENS', 200))
+        self.context_max_tokens = context_max_tokens or int(os.getenv('CONTEXT_MAX_TOKENS', 300))
+
+        self.turns = 0
+        self.total_prompt_tokens = 0
+        self.max_prompt_tokens = 0
+        self.last_report: Dict[str, Any] = {}
+
+    def append(self, conversation: Dict[str, Any], message: Dict[str, Any]):
+        """
+        Add a message, folding overflow into the rolling summary
+        """
+        history = conversation.setdefault('history', [])
+        history.append(message)
+
+        overflow = len(history) - self.history_limit
+        if overflow > 0:
+            folded = history[:overflow]
+            del history[:overflow]
+            self._fold(conversation, folded)
+
+    def _fold(self, conversation: Dict[str, Any], messages: List[Dict[str, Any]]):
+        """
+        Condense folded messages into structured facts plus recent short lines
+
+        The caller's opening request, every intent raised and the latest
+        value of each extracted entity (account number, amount, promised
+        date, ...) are kept for the whole call; only the narrative lines are
+        dropped, oldest first, when the summary exceeds its budget.
+        """
+        facts = conversation.setdefault('summary_facts', {'intents': {}, 'entities': {}})
+        lines = conversation.setdefault('summary_lines', [])
+        for msg in messages:
+            content = ' '.join(str(msg.get('content', '')).split())
+            if msg.get('role') == 'user':
+                conversation.setdefault('summary_opening', content[:160])
+                if msg.get('intent'):
+                    self._remember(facts['intents'], msg['intent'], facts['intents'].get(msg['intent'], 0) + 1)
+                for entity in msg.get('entities') or []:
+                    self._remember(facts['entities'], entity['type'], str(entity['value'])[:60])
+                label = f"Caller ({msg['intent']})" if msg.get('intent') else "Caller"
+                lines.append(f"{label}: {content[:120]}")
+            else:
+                lines.append(f"Agent: {content[:80]}")
+
+        # Keep the summary under its budget by dropping the oldest lines
+        while lines and estimate_tokens(self.summary(conversation)) > self.summary_max_tokens:
+            lines.pop(0)
+            conversation['summary_omitted'] = conversation.get('summary_omitted', 0) + 1
+
+    @staticmethod
+    def _remember(facts: Dict[str, Any], key: str, value: Any, limit: int = 20):
+        # Re-inserting moves the key to the end, so the oldest fact goes first
+        facts.pop(key, None)
+        facts[key] = value
+        while len(facts) > limit:
+            del facts[next(iter(facts))]
+
+    def summary(self, conversation: Dict[str, Any]) -> str:
+        """
+        Rolling summary of messages that have left the history window
+        """
+        parts = []
+        if conversation.get('summary_opening'):
+            parts.append(f"Caller opened with: {conversation['summary_opening']}")
+        facts = conversation.get('summary_facts', {})
+        if facts.get('intents'):
+            topics = [f"{intent} (x{count})" if count > 1 else intent for intent, count in facts['intents'].items()]
+            parts.append(f"Caller topics: {', '.join(topics)}")
+        if facts.get('entities'):
+            details = [f"{name}={value}" for name, value in facts['entities'].items()]
+            parts.append(f"Caller details: {'; '.join(details)}")
+        omitted = conversation.get('summary_omitted', 0)
+        if omitted:
+            parts.append(f"[{omitted} earlier messages condensed]")
+        return '\n'.join(parts + conversation.get('summary_lines', []))
+
+    def context_json(self, context: Dict[str, Any]) -> str:
+        """
+        Compact context JSON trimmed to the context token budget
+        """
+        encoded = compact_json(context)
+        if estimate_tokens(encoded) <= self.context_max_tokens:
+            return encoded
+
+        # Drop the largest values first until it fits
+        trimmed = dict(context)
+        for key in sorted(trimmed, key=lambda k: len(str(trimmed[k])), reverse=True):
+            del trimmed[key]
+            encoded = compact_json(trimmed)
+            if estimate_tokens(encoded) <= self.context_max_tokens:
+                break
+        return encoded
+
+    def build_messages(
+        self,
+        system_prompt: str,
+        history: List[Dict[str, Any]],
+        turn_context: str = ""
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """
+        Assemble chat messages under the token budget and report their size
+
+        The static system prompt leads and per-turn data (turn_context) is
+        appended as a trailing system message, so the prefix stays identical
+        across turns for provider-side prompt caching.
+        """
+        system_tokens = estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        turn_tokens = estimate_tokens(turn_context) + MESSAGE_OVERHEAD_TOKENS if turn_context else 0
+        remaining = self.token_budget - system_tokens - turn_tokens
+
+        selected = []
+        history_tokens = 0
+        for msg in reversed(history):
+            cost = estimate_tokens(msg['content']) + MESSAGE_OVERHEAD_TOKENS
+            # Always keep the latest message, even if it alone exceeds the budget
+            if selected and cost > remaining:
+                break
+            selected.append({'role': msg['role'], 'content': msg['content']})
+            remaining -= cost
+            history_tokens += cost
+        selected.reverse()
+
+        # Chat turns must open with the caller (Anthropic rejects a leading assistant turn)
+        while len(selected) > 1 and selected[0]['role'] != 'user':
+            history_tokens -= estimate_tokens(selected[0]['content']) + MESSAGE_OVERHEAD_TOKENS
+            selected.pop(0)
+
+        messages = [{'role': 'system', 'content': system_prompt}] + selected
+        if turn_context:
+            messages.append({'role': 'system', 'content': turn_context})
+        report = {
+            'prompt_tokens': system_tokens + history_tokens + turn_tokens,
+            'system_tokens': system_tokens,
+            'turn_context_tokens': turn_tokens,
+            'history_tokens': history_tokens,
+            'messages_included': len(selected),
+            'messages_dropped': len(history) - len(selected),
+            'token_budget': self.token_budget,
+        }
+        self._record(report)
+        return messages, report
+
+    def _record(self, report: Dict[str, Any]):
+        self.turns += 1
+        self.total_prompt_tokens += report['prompt_tokens']
+        self.max_prompt_tokens = max(self.max_prompt_tokens, report['prompt_tokens'])
+        self.last_report = report
+        logger.debug(f"Prompt size: {report}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'history_limit': self.history_limit,
+            'token_budget': self.token_budget,
+            'tokenizer': 'tiktoken' if _ENCODING is not None else 'estimate',
+            'prompts_built': self.turns,
+            'avg_prompt_tokens': round(self.total_prompt_tokens / self.turns, 1) if self.turns else 0.0,
+            'max_prompt_tokens': self.max_prompt_tokens,
+            'last_prompt': self.last_report,
+        }
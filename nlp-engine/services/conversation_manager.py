@@ -3,10 +3,22 @@ import logging
 from typing import Dict, Any, List
 from openai import AsyncOpenAI
 from anthropic import AsyncAnthropic
-import json
+
+from services.context_builder import ContextBuilder
+from services.llm_dispatch import HedgedDispatcher
+from services.llm_providers import AnthropicChatProvider, OpenAIChatProvider
+from services.llm_router import ProviderRouter
+from services.llm_usage import LLMUsageTracker
+from services.local_llm import LocalStubLLM
+from services.response_cache import ResponseCache
+from services.session_store import create_session_store
+from services.template_table import TemplateTable
 
 logger = logging.getLogger(__name__)
 
+# Returned when every LLM provider fails (never cached)
+LLM_FALLBACK_RESPONSE = "I understand. How can I assist you further?"
+
 class ConversationManager:
     """
     Manages conversation flow and generates contextual responses
@@ -17,8 +29,33 @@ class ConversationManager:
         self.openai_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         self.anthropic_client = AsyncAnthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
         
-        # Conversation memory (in production, use Redis or database)
-        self.conversations = {}
+        # LLM_BACKEND=stub swaps the providers for a deterministic local stand-in
+        self.local_llm = LocalStubLLM() if os.getenv('LLM_BACKEND', '').lower() == 'stub' else None
+        
+        # Static system prompt prefixes per language, built once (cache-friendly)
+        self.prompt_prefixes: Dict[str, str] = {}
+        self.max_prompt_prefixes = 64
+        
+        # Token, cached-token and latency accounting per provider
+        self.llm_usage = LLMUsageTracker()
+        
+        # Streaming providers behind a latency-hedged dispatcher, routed by
+        # sentiment preference and live provider health
+        self.llm_providers = {
+            'openai': OpenAIChatProvider(self.openai_client, usage=self.llm_usage),
+            'anthropic': AnthropicChatProvider(self.anthropic_client, usage=self.llm_usage),
+        }
+        self.llm_router = ProviderRouter(list(self.llm_providers))
+        self.llm_dispatcher = HedgedDispatcher(self.llm_providers, router=self.llm_router)
+        
+        # Opt-in per-agent cache for recurring questions
+        self.response_cache = ResponseCache()
+        
+        # Conversation memory: in-memory (idle TTL + LRU under a byte cap) or Redis
+        self.conversations = create_session_store()
+        
+        # Bounded history, rolling summary and token-budgeted prompt assembly
+        self.context_builder = ContextBuilder()
         
         # Intent-based response templates
         self.response_templates = {
@@ -53,6 +90,9 @@ class ConversationManager:
                 'hi': "मैं समझता हूं। मुझे इसमें आपकी मदद करने दें।",
             }
         }
+        
+        # Immutable lookup over all supported languages (extended by the build step)
+        self.template_table = TemplateTable(self.response_templates)
     
     async def generate_response(
         self,
@@ -71,45 +111,54 @@ class ConversationManager:
         try:
             # Get or create conversation history
             conv_key = f"{agent_id}:{call_id}"
-            if conv_key not in self.conversations:
-                self.conversations[conv_key] = {
+            conversation = await self.conversations.get(conv_key)
+            if conversation is None:
+                conversation = {
                     'history': [],
                     'context': context,
                     'turn_count': 0
                 }
             
-            conversation = self.conversations[conv_key]
             conversation['turn_count'] += 1
             
             # Add user message to history
-            conversation['history'].append({
+            self.context_builder.append(conversation, {
                 'role': 'user',
                 'content': text,
                 'intent': intent,
-                'sentiment': sentiment['sentiment']
+                'sentiment': sentiment['sentiment'],
+                'entities': [{'type': e['type'], 'value': e['value']} for e in entities]
             })
             
             # Check for end-of-call intents
             should_end = intent in ['farewell', 'goodbye', 'end_call', 'thank_you_goodbye']
             
             # Generate response based on intent and sentiment
-            if intent in self.response_templates and language in self.response_templates[intent]:
+            template_response = self.template_table.get(intent, language)
+            if template_response is not None:
                 # Use template for common intents
-                response = self.response_templates[intent][language]
+                response = template_response
             else:
-                # Use LLM for complex responses
-                response = await self._generate_llm_response(
-                    text=text,
-                    language=language,
-                    intent=intent,
-                    entities=entities,
-                    sentiment=sentiment,
-                    conversation_history=conversation['history'],
-                    context=conversation['context']
-                )
+                # Recurring questions may already have a cached answer for this agent
+                response = self.response_cache.get(agent_id, text, intent, language, conversation['context'])
+                if response is None:
+                    # Use LLM for complex responses
+                    response = await self._generate_llm_response(
+                        text=text,
+                        language=language,
+                        agent_id=agent_id,
+                        intent=intent,
+                        entities=entities,
+                        sentiment=sentiment,
+                        conversation_history=conversation['history'],
+                        context=conversation['context'],
+                        summary=self.context_builder.summary(conversation)
+                    )
+                    if response != LLM_FALLBACK_RESPONSE:
+                        self.response_cache.put(agent_id, text, intent, language, conversation['context'], response)
             
             # Add assistant response to history
-            conversation['history'].append({
+            self.context_builder.append(conversation, {
                 'role': 'assistant',
                 'content': response
             })
@@ -118,6 +167,8 @@ class ConversationManager:
             for entity in entities:
                 conversation['context'][entity['type']] = entity['value']
             
+            await self.conversations.put(conv_key, conversation)
+            
             return {
                 'response': response,
                 'context': conversation['context'],
@@ -142,95 +193,62 @@ class ConversationManager:
         entities: List[Dict],
         sentiment: Dict[str, Any],
         conversation_history: List[Dict],
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        summary: str = "",
+        agent_id: str = ""
     ) -> str:
         """
         Generate response using LLM (GPT-4o or Claude)
         """
         try:
-            # Prepare system prompt
-            system_prompt = self._build_system_prompt(language, intent, context)
-            
-            # Prepare conversation history for LLM
-            messages = [{'role': 'system', 'content': system_prompt}]
+            # Static prefix first, then history, then this turn's volatile data
+            system_prompt = self._build_system_prompt(language)
+            turn_context = self._build_turn_context(intent, context, summary)
             
-            # Add recent history (last 5 turns)
-            for msg in conversation_history[-10:]:
-                messages.append({
-                    'role': msg['role'],
-                    'content': msg['content']
-                })
+            # Add as much recent history as fits the token budget
+            messages, prompt_report = self.context_builder.build_messages(
+                system_prompt,
+                conversation_history,
+                turn_context
+            )
+            logger.info(
+                f"LLM prompt: {prompt_report['prompt_tokens']} tokens "
+                f"({prompt_report['messages_included']} messages, {prompt_report['messages_dropped']} dropped)"
+            )
             
-            # Choose LLM based on sentiment complexity
-            if sentiment['sentiment'] in ['negative', 'frustrated', 'angry']:
-                # Use Claude for empathetic responses
-                response = await self._generate_claude_response(messages)
+            if self.local_llm is not None:
+                response = await self.local_llm.complete(messages)
             else:
-                # Use GPT-4o for general responses
-                response = await self._generate_openai_response(messages)
+                # Claude for empathetic responses, GPT-4o otherwise, unless the
+                # preferred provider is unhealthy or much slower right now; the
+                # backup is hedged in if the primary is slow to start or fails
+                primary, backup = self.llm_router.choose(sentiment['sentiment'])
+                response = await self.llm_dispatcher.dispatch(messages, primary=primary, backup=backup)
             
             return response
             
         except Exception as e:
             logger.error(f"LLM generation error: {e}")
-            return "I understand. How can I assist you further?"
+            return LLM_FALLBACK_RESPONSE
     
-    async def _generate_openai_response(self, messages: List[Dict]) -> str:
-        """
-        Generate response using OpenAI GPT-4o
+    def _build_system_prompt(self, language: str) -> str:
         """
-        try:
-            completion = await self.openai_client.chat.completions.create(
-                model=os.getenv('OPENAI_MODEL', 'gpt-4o'),
-                messages=messages,
-                temperature=0.7,
-                max_tokens=150,
-                presence_penalty=0.6,
-                frequency_penalty=0.3
-            )
-            
-            return completion.choices[0].message.content.strip()
-            
-        except Exception as e:
-            logger.error(f"OpenAI API error: {e}")
-            raise
-    
-    async def _generate_claude_response(self, messages: List[Dict]) -> str:
-        """
-        Generate empathetic response using Claude
-        """
-        try:
-            # Extract system message
-            system_msg = messages[0]['content']
-            conversation_msgs = messages[1:]
-            
-            response = await self.anthropic_client.messages.create(
-                model='claude-3-5-sonnet-20241022',
-                max_tokens=150,
-                system=system_msg,
-                messages=conversation_msgs
-            )
-            
-            return response.content[0].text.strip()
-            
-        except Exception as e:
-            logger.error(f"Claude API error: {e}")
-            # Fallback to OpenAI
-            return await self._generate_openai_response(messages)
-    
-    def _build_system_prompt(self, language: str, intent: str, context: Dict[str, Any]) -> str:
-        """
-        Build system prompt for LLM
+        Build the static system prompt for a language (memoized)
+
+        Nothing in it is agent-specific, so every agent shares one prefix
+        per language; the memo is bounded since language comes from input.
         """
+        prompt = self.prompt_prefixes.get(language)
+        if prompt is not None:
+            return prompt
+        
         prompt = f"""You are an AI call agent assistant speaking in {language}.
 
 Your role:
 - Provide helpful, concise, and natural responses suitable for voice conversation
 - Keep responses under 30 words when possible
 - Be empathetic and professional
-- Address the user's intent: {intent}
-
-Context: {json.dumps(context, indent=2)}
+- Address the caller's current intent, given in the turn context at the end
 
 Guidelines:
 - Speak naturally as if in a phone conversation
@@ -239,12 +257,31 @@ Guidelines:
 - Be patient and respectful
 - Use appropriate cultural context for {language}
 """
+        if len(self.prompt_prefixes) >= self.max_prompt_prefixes:
+            del self.prompt_prefixes[next(iter(self.prompt_prefixes))]
+        self.prompt_prefixes[language] = prompt
         return prompt
     
-    def clear_conversation(self, agent_id: str, call_id: str):
+    def _build_turn_context(self, intent: str, context: Dict[str, Any], summary: str = "") -> str:
+        """
+        Build the per-turn data appended after the conversation history
+        """
+        turn_context = f"Turn context:\nCaller intent: {intent}\nContext: {self.context_builder.context_json(context)}"
+        if summary:
+            turn_context += f"\nEarlier in this call:\n{summary}"
+        return turn_context
+    
+    async def clear_conversation(self, agent_id: str, call_id: str) -> bool:
         """
-        Clear conversation history
+        Clear conversation history (end of call)
         """
         conv_key = f"{agent_id}:{call_id}"
-        if conv_key in self.conversations:
-            del self.conversations[conv_key]
+        return await self.conversations.delete(conv_key)
+    
+    async def get_session_stats(self) -> Dict[str, Any]:
+        """
+        Get live session, eviction, memory and prompt size metrics
+        """
+        stats = await self.conversations.get_stats()
+        stats['prompts'] = self.context_builder.get_stats()
+        return stats
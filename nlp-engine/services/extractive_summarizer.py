@@ -0,0 +1,218 @@
+import re
+import math
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # numpy is not in requirements-minimal.txt
+    np = None
+
+_SPEAKER = re.compile(r"^\s*([A-Za-z][\w .'-]{0,30}):\s*(.*)$")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just let me more most my myself no nor
+not now of off on once only or other our ours ourselves out over own same she should so some such than that
+the their theirs them themselves then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours yourself yourselves okay ok yes
+yeah uh um hello hi thanks thank please sure right well also
+""".split())
+
+# Commitments and requests that usually become follow-up work
+_ACTION_PATTERNS = [
+    (re.compile(r"\b(i|we)(?:'ll|'m going to|'re going to|\s+(?:will|am going to|are going to|promise to|need to|have to))\b", re.I), "self"),
+    (re.compile(r"\b(let me|i can|we can)\b", re.I), "self"),
+    (re.compile(r"\b(can you|could you|would you|please|you need to|you should|make sure)\b", re.I), "other"),
+    (re.compile(r"\b(follow up|call (you )?back|send|email|schedule|refund|pay|escalate|confirm)\b", re.I), "self"),
+]
+_DEADLINE = re.compile(
+    r"\b(today|tonight|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"next week|end of (the )?(day|week|month)|within \w+ (hours?|days?)|by \d|\d{1,2}(:\d{2})?\s?(am|pm))\b",
+    re.I
+)
+
+
+def split_turns(transcript: str) -> List[Tuple[str, str]]:
+    """
+    Split a "Speaker: text" transcript into (speaker, text) turns
+    """
+    turns = []
+    for line in transcript.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = _SPEAKER.match(line)
+        turns.append((match.group(1).strip(), match.group(2).strip()) if match else ("", line))
+    return turns
+
+
+def split_sentences(transcript: str) -> List[Tuple[str, str]]:
+    """
+    Split a "Speaker: text" transcript into (speaker, sentence) pairs
+    """
+    sentences = []
+    for speaker, text in split_turns(transcript):
+        for sentence in _SENTENCE_SPLIT.split(text):
+            sentence = sentence.strip()
+            if sentence:
+                sentences.append((speaker, sentence))
+    return sentences
+
+
+def _tokens(sentence: str) -> List[str]:
+    return [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS and not w.isdigit()]
+
+
+class ExtractiveSummarizer:
+    """
+    Zero-network summarizer: TextRank over TF-IDF sentence vectors
+
+    Sentences are scored with PageRank on their cosine-similarity graph and
+    picked with maximal marginal relevance so the summary is not three
+    rewordings of the same complaint. Action items come from commitment
+    and request patterns ("I'll send...", "could you...", "by Friday").
+
+    The similarity matrix is dense, so time and memory grow with the square
+    of the sentences ranked; max_sentences caps that, and summarize() is
+    CPU-bound and meant to run off the event loop.
+    """
+
+    def __init__(self, summary_sentences: int = 3, key_points: int = 5, max_sentences: int = 600):
+        self.summary_sentences = summary_sentences
+        self.key_points = key_points
+        self.max_sentences = max_sentences
+
+    @property
+    def available(self) -> bool:
+        return np is not None
+
+    def summarize(self, transcript: str) -> Dict[str, Any]:
+        sentences = split_sentences(transcript)
+        # Action rules are cheap and scan every sentence
+        action_items = self.extract_action_items(sentences)
+        if len(sentences) > self.max_sentences:
+            # Rank only the opening and the most recent part of very long calls
+            head = self.max_sentences // 3
+            sentences = sentences[:head] + sentences[-(self.max_sentences - head):]
+
+        tokens = [_tokens(text) for _, text in sentences]
+        candidates = [i for i, toks in enumerate(tokens) if len(toks) >= 2]
+        if not candidates:
+            return {
+                "summary": ' '.join(text for _, text in sentences[:self.summary_sentences]),
+                "key_points": [],
+                "action_items": action_items,
+            }
+
+        vectors = self._tfidf([tokens[i] for i in candidates])
+        similarity = vectors @ vectors.T
+        scores = self._textrank(similarity)
+
+        picked = self._mmr(scores, similarity, max(self.summary_sentences, self.key_points))
+        summary_idx = sorted(picked[:self.summary_sentences])
+        key_idx = picked[:self.key_points]
+
+        return {
+            "summary": ' '.join(sentences[candidates[i]][1] for i in summary_idx),
+            "key_points": [self._trim(sentences[candidates[i]][1]) for i in key_idx],
+            "action_items": action_items,
+        }
+
+    def _tfidf(self, docs: List[List[str]]):
+        vocabulary: Dict[str, int] = {}
+        document_frequency: Counter = Counter()
+        for doc in docs:
+            document_frequency.update(set(doc))
+        for word in document_frequency:
+            vocabulary[word] = len(vocabulary)
+
+        n_docs = len(docs)
+        idf = np.zeros(len(vocabulary), dtype=np.float32)
+        for word, index in vocabulary.items():
+            idf[index] = math.log((1 + n_docs) / (1 + document_frequency[word])) + 1
+
+        matrix = np.zeros((n_docs, len(vocabulary)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for word, count in Counter(doc).items():
+                matrix[row, vocabulary[word]] = 1 + math.log(count)
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    @staticmethod
+    def _textrank(similarity, damping: float = 0.85, iterations: int = 50, tolerance: float = 1e-5):
+        weights = similarity.copy()
+        np.fill_diagonal(weights, 0)
+        row_sums = weights.sum(axis=1, keepdims=True)
+        n = weights.shape[0]
+        # Sentences sharing no words with any other link uniformly
+        transition = np.where(row_sums > 0, weights / np.where(row_sums == 0, 1, row_sums), 1.0 / n)
+
+        scores = np.full(n, 1.0 / n, dtype=np.float32)
+        for _ in range(iterations):
+            updated = (1 - damping) / n + damping * (transition.T @ scores)
+            if np.abs(updated - scores).sum() < tolerance:
+                return updated
+            scores = updated
+        return scores
+
+    @staticmethod
+    def _mmr(scores, similarity, k: int, diversity: float = 0.3) -> List[int]:
+        relevance = scores / scores.max() if scores.max() > 0 else scores
+        picked: List[int] = []
+        remaining = set(range(len(scores)))
+        while remaining and len(picked) < k:
+            if picked:
+                redundancy = similarity[:, picked].max(axis=1)
+                mmr = (1 - diversity) * relevance - diversity * redundancy
+            else:
+                mmr = relevance
+            best = max(remaining, key=lambda i: mmr[i])
+            picked.append(best)
+            remaining.discard(best)
+        return picked
+
+    @staticmethod
+    def _trim(sentence: str, limit: int = 160) -> str:
+        return sentence if len(sentence) <= limit else sentence[:limit - 1].rsplit(' ', 1)[0] + '…'
+
+    def extract_action_items(self, sentences: List[Tuple[str, str]], limit: int = 5) -> List[Dict[str, str]]:
+        """
+        Rule-based commitments and requests
+
+        Ranked: commitments with a deadline, requests with a deadline, then
+        the rest; repeated asks (same content words) are listed once.
+        """
+        speakers = [s for s in dict.fromkeys(speaker for speaker, _ in sentences) if s]
+        found: List[Tuple[int, int, Dict[str, str]]] = []
+        seen = set()
+
+        for position, (speaker, text) in enumerate(sentences):
+            if text.endswith('?') and not re.search(r"\b(can|could|would) you\b", text, re.I):
+                continue
+            for pattern, who in _ACTION_PATTERNS:
+                if not pattern.search(text):
+                    continue
+                responsible = speaker or "Unknown"
+                if who == "other" and speaker:
+                    others = [s for s in speakers if s != speaker]
+                    responsible = others[0] if others else speaker
+                key = (responsible, frozenset(_tokens(text)))
+                if key not in seen:
+                    seen.add(key)
+                    has_deadline = _DEADLINE.search(text) is not None
+                    priority = (0 if who == "self" else 1) if has_deadline else 2
+                    found.append((priority, position, {"responsible": responsible, "action": self._trim(text)}))
+                break
+
+        found.sort(key=lambda item: (item[0], item[1]))
+        chosen = sorted(found[:limit], key=lambda item: item[1])
+        return [item for _, _, item in chosen]
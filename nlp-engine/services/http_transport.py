@@ -0,0 +1,155 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HTTPTransport:
+    """
+    Persistent pooled HTTP client for upstream providers
+
+    Wraps one long-lived httpx.AsyncClient with keep-alive, pool limits,
+    timeouts and retries with full-jitter exponential backoff. New TCP
+    connections are counted through httpcore trace events, which gives the
+    connection reuse rate.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str = "",
+        env_prefix: str = "HTTP",
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        def setting(value, key, default, cast=float):
+            return value if value is not None else cast(os.getenv(f"{env_prefix}_{key}", default))
+
+        self.name = name
+        self.retries = setting(retries, 'RETRIES', 2, int)
+        self.backoff_base = setting(backoff_base, 'BACKOFF_BASE', 0.1)
+        self.backoff_max = setting(backoff_max, 'BACKOFF_MAX', 2.0)
+
+        self.limits = httpx.Limits(
+            max_connections=setting(max_connections, 'MAX_CONNECTIONS', 20, int),
+            max_keepalive_connections=setting(max_keepalive_connections, 'MAX_KEEPALIVE', 10, int),
+            keepalive_expiry=setting(keepalive_expiry, 'KEEPALIVE_EXPIRY', 30.0),
+        )
+        total_timeout = setting(timeout, 'TIMEOUT', 5.0)
+        self.timeout = httpx.Timeout(total_timeout, connect=setting(connect_timeout, 'CONNECT_TIMEOUT', 2.0))
+
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=self.limits,
+            timeout=self.timeout,
+            headers=headers,
+        )
+
+        self.requests = 0
+        self.attempts = 0
+        self.retried = 0
+        self.failures = 0
+        self.connections_opened = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_latency = 0.0
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying transport errors and retryable statuses
+        """
+        self.requests += 1
+        extensions = dict(kwargs.pop('extensions', {}) or {})
+        extensions['trace'] = self._trace
+
+        attempt = 0
+        while True:
+            attempt += 1
+            self.attempts += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, extensions=extensions, **kwargs)
+            except httpx.TransportError as e:
+                error, response = e, None
+            else:
+                error = None
+            finally:
+                self.in_flight -= 1
+                self.total_latency += time.perf_counter() - started
+
+            retryable = error is not None or response.status_code in RETRY_STATUS_CODES
+            if not retryable or attempt > self.retries:
+                if error is not None:
+                    self.failures += 1
+                    raise error
+                if response.status_code >= 400:
+                    self.failures += 1
+                response.raise_for_status()
+                return response
+
+            self.retried += 1
+            delay = self._backoff(attempt, response)
+            logger.debug(
+                f"{self.name} upstream {'error ' + str(error) if error else response.status_code}; "
+                f"retry {attempt}/{self.retries} in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        # Full jitter: uniform over [0, min(cap, base * 2^attempt)]
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if response is not None:
+            retry_after = response.headers.get('retry-after')
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+        return delay
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        reused = max(self.attempts - self.connections_opened, 0)
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retries": self.retried,
+            "failures": self.failures,
+            "connections_opened": self.connections_opened,
+            "connection_reuse_rate": round(reused / self.attempts, 4) if self.attempts else 0.0,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "avg_latency_ms": round(self.total_latency / self.attempts * 1000, 2) if self.attempts else 0.0,
+            "pool": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry,
+            },
+        }
@@ -0,0 +1,245 @@
+import os
+import re
+import json
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# category -> language -> terms. "*" terms apply to every language. A
+# trailing "*" on a term matches any word starting with it ("thank*" covers
+# thanks/thankful); everything else matches whole words or phrases only.
+DEFAULT_LEXICON: Dict[str, Dict[str, List[str]]] = {
+    # CSAT factors
+    "satisfaction": {
+        "en": ["thank*", "great", "excellent", "helpful", "appreciate*", "perfect"],
+        "es": ["gracias", "excelente", "genial", "perfecto", "útil", "agradezco"],
+        "fr": ["merci", "excellent", "génial", "parfait", "utile"],
+        "de": ["danke", "vielen dank", "ausgezeichnet", "super", "perfekt", "hilfreich"],
+        "pt": ["obrigad*", "excelente", "ótimo", "perfeito", "útil"],
+    },
+    "dissatisfaction": {
+        "en": ["frustrat*", "angry", "disappointed", "terrible", "awful", "useless"],
+        "es": ["frustrad*", "enojad*", "decepcionad*", "terrible", "horrible", "inútil"],
+        "fr": ["frustré*", "en colère", "déçu*", "terrible", "nul", "inutile"],
+        "de": ["frustriert", "wütend", "enttäuscht", "schrecklich", "furchtbar", "nutzlos"],
+        "pt": ["frustrad*", "irritad*", "decepcionad*", "terrível", "horrível", "inútil"],
+    },
+    # Summary overall sentiment
+    "positive": {
+        "en": ["thank*", "great", "excellent", "happy", "satisfied"],
+        "es": ["gracias", "excelente", "genial", "content*", "satisfech*"],
+        "fr": ["merci", "excellent", "génial", "content*", "satisfait*"],
+        "de": ["danke", "ausgezeichnet", "super", "zufrieden", "glücklich"],
+        "pt": ["obrigad*", "excelente", "ótimo", "feliz", "satisfeit*"],
+    },
+    "negative": {
+        "en": ["problem*", "issue*", "frustrat*", "angry", "disappointed"],
+        "es": ["problema*", "frustrad*", "enojad*", "decepcionad*"],
+        "fr": ["problème*", "frustré*", "en colère", "déçu*"],
+        "de": ["problem*", "frustriert", "wütend", "enttäuscht"],
+        "pt": ["problema*", "frustrad*", "irritad*", "decepcionad*"],
+    },
+}
+
+
+class LexiconMatch(NamedTuple):
+    term: str
+    categories: Tuple[str, ...]
+    start: int
+    end: int
+
+
+def tally(matches: Iterable[LexiconMatch]) -> Dict[str, Counter]:
+    """
+    Per-category counts of each matched term
+    """
+    counts: Dict[str, Counter] = {}
+    for match in matches:
+        for category in match.categories:
+            counts.setdefault(category, Counter())[match.term] += 1
+    return counts
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """
+    Regex for a set of terms as a character trie, so alternatives sharing a
+    prefix are tried once instead of one after another
+    """
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [
+            (r'\s+' if char == ' ' else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class Lexicon:
+    """
+    Single-pass multi-pattern keyword matcher
+
+    All terms for a language (across every category) are compiled into one
+    trie-shaped regex with word boundaries, so a transcript is scanned once
+    regardless of how many keywords or categories there are, and "thank"
+    no longer matches inside unrelated words. A term shared by several
+    categories is matched once and reported for all of them.
+    """
+
+    def __init__(self, keyword_sets: Optional[Dict[str, Dict[str, List[str]]]] = None):
+        self.keyword_sets = keyword_sets if keyword_sets is not None else DEFAULT_LEXICON
+        self._compiled: Dict[str, "_CompiledLexicon"] = {}
+
+    @classmethod
+    def from_file(cls, path: str) -> "Lexicon":
+        """
+        Default keyword sets with categories/languages overridden from a JSON file
+        """
+        with open(path, encoding='utf-8') as f:
+            overrides = json.load(f)
+        keyword_sets = {category: dict(languages) for category, languages in DEFAULT_LEXICON.items()}
+        for category, languages in overrides.items():
+            keyword_sets.setdefault(category, {}).update(languages)
+        return cls(keyword_sets)
+
+    def _compile(self, language: str) -> "_CompiledLexicon":
+        compiled = self._compiled.get(language)
+        if compiled is None:
+            terms: Dict[str, List[str]] = {}
+            for category, languages in self.keyword_sets.items():
+                # Languages without their own terms fall back to English
+                selected = languages.get(language, languages.get('en', [])) + languages.get('*', [])
+                for term in selected:
+                    term = ' '.join(term.lower().split())
+                    categories = terms.setdefault(term, [])
+                    if category not in categories:
+                        categories.append(category)
+            compiled = self._compiled[language] = _CompiledLexicon(terms)
+        return compiled
+
+    def matches(self, text: str, language: str = "en") -> List[LexiconMatch]:
+        """
+        Every keyword occurrence in text, in order
+        """
+        return self._compile(language).matches(text)
+
+    def counts(self, text: str, language: str = "en") -> Counter:
+        """
+        Keyword occurrences per category
+        """
+        counts: Counter = Counter()
+        for match in self.matches(text, language):
+            counts.update(match.categories)
+        return counts
+
+    def scan_turns(self, turns: Iterable[str], language: str = "en") -> List[Dict[str, Any]]:
+        """
+        Per-turn category counts and match positions (offsets within the turn)
+        """
+        results = []
+        for text in turns:
+            found = self.matches(text, language)
+            counts: Counter = Counter()
+            for match in found:
+                counts.update(match.categories)
+            results.append({
+                "counts": dict(counts),
+                "matches": [match._asdict() for match in found],
+            })
+        return results
+
+
+class _CompiledLexicon:
+    def __init__(self, terms: Dict[str, List[str]]):
+        self.exact = {term: tuple(categories) for term, categories in terms.items() if not term.endswith('*')}
+        self.prefixes = {term[:-1]: (term, tuple(categories)) for term, categories in terms.items() if term.endswith('*')}
+
+        alternatives = []
+        if self.exact:
+            alternatives.append(_trie_pattern(self.exact))
+        if self.prefixes:
+            alternatives.append('(?:' + _trie_pattern(self.prefixes) + r')\w*')
+        # Leading first-character class lets the regex engine skip ahead to
+        # candidate positions instead of trying the trie at every character
+        first_chars = ''.join(sorted({re.escape(term[0]) for term in list(self.exact) + list(self.prefixes)}))
+        self.pattern = re.compile(
+            r'(?=[' + first_chars + r'])\b(?:' + '|'.join(alternatives) + r')\b'
+        ) if alternatives else None
+        self.pattern_ignorecase = re.compile(self.pattern.pattern, re.IGNORECASE) if self.pattern else None
+        # matched text -> (term, categories); calls repeat the same few words
+        self._resolved: Dict[str, Optional[Tuple[str, Tuple[str, ...]]]] = {}
+
+    def matches(self, text: str) -> List[LexiconMatch]:
+        if self.pattern is None:
+            return []
+        lowered = text.lower()
+        # Matching lowercased text is faster than IGNORECASE, but only keeps
+        # offsets valid when lowercasing preserved the length
+        if len(lowered) == len(text):
+            found = self.pattern.finditer(lowered)
+        else:
+            found = self.pattern_ignorecase.finditer(text)
+
+        results = []
+        for match in found:
+            resolved = self._resolve(match.group(0))
+            if resolved is not None:
+                results.append(LexiconMatch(resolved[0], resolved[1], match.start(), match.end()))
+        return results
+
+    def _resolve(self, matched: str) -> Optional[Tuple[str, Tuple[str, ...]]]:
+        key = matched.lower()
+        if key in self._resolved:
+            return self._resolved[key]
+
+        word = ' '.join(key.split())
+        term, categories = None, []
+        if word in self.exact:
+            term = word
+            categories.extend(self.exact[word])
+        # Longest prefix term names the match; every matching prefix adds its categories
+        for prefix in sorted(self.prefixes, key=len, reverse=True):
+            if word.startswith(prefix):
+                prefix_term, prefix_categories = self.prefixes[prefix]
+                term = term or prefix_term
+                categories.extend(c for c in prefix_categories if c not in categories)
+
+        resolved = (term, tuple(categories)) if term else None
+        if len(self._resolved) < 10000:
+            self._resolved[key] = resolved
+        return resolved
+
+
+_shared: Optional[Lexicon] = None
+
+
+def get_lexicon() -> Lexicon:
+    """
+    Process-wide lexicon: DEFAULT_LEXICON, or LEXICON_PATH merged over it
+    """
+    global _shared
+    if _shared is None:
+        path = os.getenv('LEXICON_PATH')
+        if path:
+            try:
+                _shared = Lexicon.from_file(path)
+                logger.info(f"Loaded lexicon overrides from {path}")
+            except Exception as e:
+                logger.error(f"Failed to load lexicon {path}, using defaults: {e}")
+        if _shared is None:
+            _shared = Lexicon()
+    return _shared
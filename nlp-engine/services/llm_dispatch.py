@@ -0,0 +1,181 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from services.llm_providers import ChatProvider
+from services.llm_router import ProviderRouter
+
+logger = logging.getLogger(__name__)
+
+
+class HedgedDispatcher:
+    """
+    Latency-hedged dispatch across chat providers
+
+    The primary request starts immediately. If it has not produced a first
+    token within LLM_HEDGE_AFTER_MS, a backup request is fired on the other
+    provider; the first complete, non-empty answer wins and the other
+    request is cancelled. A primary failure at any point also launches the
+    backup. Each provider call is bounded by its own deadline.
+
+    With a router attached, every outcome feeds its health tracking and a
+    provider whose circuit breaker refuses the request is skipped.
+    """
+
+    def __init__(
+        self,
+        providers: Dict[str, ChatProvider],
+        hedge_after_ms: Optional[float] = None,
+        router: Optional[ProviderRouter] = None
+    ):
+        self.providers = providers
+        self.router = router
+        if hedge_after_ms is None:
+            hedge_after_ms = float(os.getenv('LLM_HEDGE_AFTER_MS', 1200))
+        # 0 disables hedging; the backup is then only used on failure
+        self.hedge_after = hedge_after_ms / 1000
+
+        self.requests = 0
+        self.hedged = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self.wins = {name: 0 for name in providers}
+        self.backup_wins = 0
+        self.latency_saved = 0.0
+        self.total_latency = 0.0
+        # EWMA of each provider's time from first token to completion, used as
+        # a lower bound on what a stalled primary would still have needed
+        self.expected_stream_time: Dict[str, float] = {}
+
+    async def _run(self, provider: ChatProvider, messages: List[Dict[str, Any]], first_token: asyncio.Event) -> str:
+        async def consume() -> str:
+            parts = []
+            first_at = None
+            async for delta in provider.stream(messages):
+                if first_at is None:
+                    first_at = time.perf_counter()
+                    first_token.set()
+                parts.append(delta)
+            text = ''.join(parts).strip()
+            if not text:
+                raise ValueError(f"{provider.name} returned an empty response")
+            self._observe_stream_time(provider.name, time.perf_counter() - first_at)
+            return text
+
+        started = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(consume(), provider.deadline)
+        except Exception:
+            if self.router is not None:
+                self.router.record_failure(provider.name)
+            raise
+        if self.router is not None:
+            self.router.record_success(provider.name, time.perf_counter() - started)
+        return text
+
+    async def dispatch(
+        self,
+        messages: List[Dict[str, Any]],
+        primary: Optional[str],
+        backup: Optional[str] = None
+    ) -> str:
+        """
+        Return the first good answer from primary (or the hedged backup)
+        """
+        self.requests += 1
+        started = time.perf_counter()
+        backup = backup if backup in self.providers and backup != primary else None
+
+        tasks: Dict[asyncio.Task, str] = {}
+        launched_at: Dict[asyncio.Task, float] = {}
+        backup_launched = False
+        hedged = False
+
+        def launch(name: str, first_token: asyncio.Event) -> Optional[asyncio.Task]:
+            if self.router is not None and not self.router.acquire(name):
+                logger.info(f"{name} circuit is open; skipping")
+                return None
+            task = asyncio.ensure_future(self._run(self.providers[name], messages, first_token))
+            tasks[task] = name
+            launched_at[task] = time.perf_counter()
+            return task
+
+        first_token = asyncio.Event()
+        primary_task = launch(primary, first_token) if primary in self.providers else None
+        if primary_task is None:
+            if backup is None:
+                self.failures += 1
+                raise RuntimeError("No LLM provider available")
+            self.fallbacks += 1
+            launch(backup, asyncio.Event())
+            backup_launched = True
+
+        try:
+            if primary_task is not None and backup and self.hedge_after > 0:
+                waiter = asyncio.ensure_future(first_token.wait())
+                await asyncio.wait({primary_task, waiter}, timeout=self.hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                if not first_token.is_set() and not primary_task.done():
+                    logger.info(f"{primary} slow to first token; hedging on {backup}")
+                    if launch(backup, asyncio.Event()) is not None:
+                        self.hedged += 1
+                        hedged = True
+                    backup_launched = True
+
+            while tasks:
+                done, _ = await asyncio.wait(tasks.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks.pop(task)
+                    if task.exception() is None:
+                        # Only a hedge that beat a still-running primary saved time;
+                        # circuit-open and after-failure fallbacks did not
+                        beat_primary = hedged and primary_task in tasks and not first_token.is_set()
+                        return self._finish(task.result(), name, primary, beat_primary, started)
+
+                    logger.warning(f"{name} request failed: {task.exception()!r}")
+                    if backup and not backup_launched:
+                        self.fallbacks += 1
+                        launch(backup, asyncio.Event())
+                        backup_launched = True
+
+            self.failures += 1
+            raise RuntimeError("All LLM providers failed")
+        finally:
+            # Cancel the loser (or everything, if our caller was cancelled)
+            for task, name in tasks.items():
+                task.cancel()
+                if self.router is not None:
+                    self.router.record_cancelled(name, time.perf_counter() - launched_at[task])
+
+    def _observe_stream_time(self, provider: str, seconds: float):
+        previous = self.expected_stream_time.get(provider)
+        self.expected_stream_time[provider] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+    def _finish(self, text: str, winner: str, primary: str, hedged: bool, started: float) -> str:
+        self.total_latency += time.perf_counter() - started
+        self.wins[winner] = self.wins.get(winner, 0) + 1
+
+        if winner != primary:
+            self.backup_wins += 1
+            # A running primary with no first token yet needed at least its usual stream time on top
+            if hedged:
+                self.latency_saved += self.expected_stream_time.get(primary, 0.0)
+        return text
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "hedge_after_ms": self.hedge_after * 1000,
+            "deadlines_ms": {name: p.deadline * 1000 for name, p in self.providers.items()},
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+            "wins": dict(self.wins),
+            "backup_wins": self.backup_wins,
+            "avg_latency_ms": round(self.total_latency / max(sum(self.wins.values()), 1) * 1000, 1),
+            "estimated_latency_saved_ms": round(self.latency_saved * 1000, 1),
+            "expected_stream_time_ms": {k: round(v * 1000, 1) for k, v in self.expected_stream_time.items()},
+        }
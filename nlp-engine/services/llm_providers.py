@@ -0,0 +1,151 @@
+import os
+import time
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from services.llm_usage import LLMUsageTracker, usage_from_anthropic, usage_from_openai
+
+logger = logging.getLogger(__name__)
+
+
+class ChatProvider:
+    """
+    Streaming chat completion provider
+
+    stream() yields text deltas; token usage and first-token latency are
+    recorded on the shared LLMUsageTracker when the stream finishes.
+    """
+
+    name = "base"
+
+    def __init__(self, usage: Optional[LLMUsageTracker] = None, deadline_ms: Optional[float] = None):
+        self.usage = usage or LLMUsageTracker()
+        if deadline_ms is None:
+            deadline_ms = float(os.getenv(f'LLM_{self.name.upper()}_DEADLINE_MS', 8000))
+        self.deadline = deadline_ms / 1000
+
+    def stream(self, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    async def complete(self, messages: List[Dict[str, Any]]) -> str:
+        return ''.join([delta async for delta in self.stream(messages)]).strip()
+
+
+class OpenAIChatProvider(ChatProvider):
+    """
+    OpenAI chat completions (OPENAI_MODEL, default gpt-4o)
+    """
+
+    name = "openai"
+
+    def __init__(self, client: Any, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.model = os.getenv('OPENAI_MODEL', 'gpt-4o')
+
+    async def stream(self, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        first_token = None
+        usage = {}
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=150,
+                presence_penalty=0.6,
+                frequency_penalty=0.3,
+                stream=True,
+                extra_body={'stream_options': {'include_usage': True}}
+            )
+            async for chunk in response:
+                if getattr(chunk, 'usage', None) is not None:
+                    usage = usage_from_openai(chunk)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    yield delta
+        except Exception as e:
+            logger.error(f"OpenAI API error: {e}")
+            self.usage.record_error(self.name)
+            raise
+
+        self.usage.record(self.name, time.perf_counter() - started, usage, first_token)
+
+
+class AnthropicChatProvider(ChatProvider):
+    """
+    Anthropic messages API with prompt-cache breakpoints
+    """
+
+    name = "anthropic"
+
+    def __init__(self, client: Any, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.model = os.getenv('ANTHROPIC_MODEL', 'claude-3-5-sonnet-20241022')
+
+    @staticmethod
+    def to_claude_messages(messages: List[Dict[str, Any]]) -> tuple:
+        """
+        Convert chat messages to Anthropic's format with cache breakpoints
+
+        The static system prompt and the history up to the previous turn are
+        marked cacheable; the trailing turn context is folded into the latest
+        caller message so it never sits inside the cached prefix.
+        """
+        system_msg = messages[0]['content']
+        turn_context = ""
+        if len(messages) > 1 and messages[-1]['role'] == 'system':
+            turn_context = messages[-1]['content']
+            messages = messages[:-1]
+
+        conversation_msgs = [
+            {'role': msg['role'], 'content': [{'type': 'text', 'text': msg['content']}]}
+            for msg in messages[1:]
+        ]
+
+        if turn_context and conversation_msgs:
+            conversation_msgs[-1]['content'].insert(0, {'type': 'text', 'text': turn_context})
+
+        # Cache the history prefix ending just before the newest caller message
+        if len(conversation_msgs) >= 2:
+            conversation_msgs[-2]['content'][-1]['cache_control'] = {'type': 'ephemeral'}
+
+        system = [{'type': 'text', 'text': system_msg, 'cache_control': {'type': 'ephemeral'}}]
+        return system, conversation_msgs
+
+    async def stream(self, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        system, conversation_msgs = self.to_claude_messages(messages)
+        started = time.perf_counter()
+        first_token = None
+        usage = {}
+        try:
+            response = await self.client.messages.create(
+                model=self.model,
+                max_tokens=150,
+                system=system,
+                messages=conversation_msgs,
+                stream=True,
+                extra_headers={'anthropic-beta': 'prompt-caching-2024-07-31'}
+            )
+            async for event in response:
+                if event.type == 'message_start':
+                    usage = usage_from_anthropic(event.message)
+                elif event.type == 'message_delta' and getattr(event, 'usage', None) is not None:
+                    usage['completion_tokens'] = event.usage.output_tokens or 0
+                elif event.type == 'content_block_delta':
+                    delta = getattr(event.delta, 'text', None)
+                    if delta:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        yield delta
+        except Exception as e:
+            logger.error(f"Claude API error: {e}")
+            self.usage.record_error(self.name)
+            raise
+
+        self.usage.record(self.name, time.perf_counter() - started, usage, first_token)
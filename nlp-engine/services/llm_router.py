@@ -0,0 +1,253 @@
+import os
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Sentiments that prefer the more empathetic provider
+EMPATHY_SENTIMENTS = ('negative', 'frustrated', 'angry')
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker
+
+    Opens after a burst of consecutive failures or when the EWMA error
+    rate crosses a threshold. After the cooldown a single probe request is
+    let through (half-open); its success closes the breaker, its failure
+    re-opens it for another cooldown.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        error_rate_threshold: float = 0.5,
+        min_samples: int = 10,
+        cooldown_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown_seconds
+        self.clock = clock
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+
+    def available(self) -> bool:
+        """
+        Whether a request could be sent now (does not take the probe slot)
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self.clock() - self.opened_at >= self.cooldown
+        return not self.probe_in_flight
+
+    def acquire(self) -> bool:
+        """
+        Take permission to send a request; half-open allows one probe
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if self.clock() - self.opened_at < self.cooldown:
+                return False
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def release(self):
+        """
+        Give back a probe slot without an outcome (request was cancelled)
+        """
+        self.probe_in_flight = False
+
+    def on_success(self):
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            logger.info("Circuit closed after successful probe")
+        self.state = CLOSED
+        self.probe_in_flight = False
+
+    def on_failure(self, error_rate: float, samples: int):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == HALF_OPEN:
+            self._open()
+        elif self.state == CLOSED and (
+            self.consecutive_failures >= self.failure_threshold
+            or (samples >= self.min_samples and error_rate >= self.error_rate_threshold)
+        ):
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.times_opened += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        retry_in = max(0.0, self.cooldown - (self.clock() - self.opened_at)) if self.state == OPEN else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "retry_in_seconds": round(retry_in, 1),
+        }
+
+
+class ProviderHealth:
+    """
+    EWMA latency and error rate for one provider
+    """
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = 0
+        self.successes = 0
+        self.failures = 0
+
+    def observe(self, ok: bool, latency: Optional[float] = None):
+        self.samples += 1
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok:
+            self.successes += 1
+            if latency is not None:
+                self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+        else:
+            self.failures += 1
+
+    def observe_lower_bound(self, latency: float):
+        """
+        Fold in a request that was cancelled after `latency` seconds
+
+        The true latency was at least this long, so it only ever pulls the
+        average up; without it a provider that always loses hedges would
+        never look slow.
+        """
+        if self.latency is None or latency > self.latency:
+            self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+
+
+class ProviderRouter:
+    """
+    Health-aware LLM provider routing
+
+    The sentiment preference (Claude for negative callers, GPT otherwise)
+    is kept while both providers are healthy. A provider whose breaker is
+    open is skipped, and the preference flips when the preferred
+    provider's EWMA latency exceeds LLM_ROUTER_LATENCY_RATIO times the
+    alternative's. Every LLM_ROUTER_EXPLORE_EVERY-th such turn still goes to
+    the preferred provider so its latency estimate can recover.
+    """
+
+    def __init__(
+        self,
+        providers: List[str],
+        alpha: Optional[float] = None,
+        latency_ratio: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if alpha is None:
+            alpha = float(os.getenv('LLM_ROUTER_EWMA_ALPHA', 0.2))
+        if latency_ratio is None:
+            latency_ratio = float(os.getenv('LLM_ROUTER_LATENCY_RATIO', 2.0))
+        self.latency_ratio = latency_ratio
+        self.explore_every = int(os.getenv('LLM_ROUTER_EXPLORE_EVERY', 20))
+        self._slow_turns = 0
+
+        self.health = {name: ProviderHealth(alpha) for name in providers}
+        self.breakers = {
+            name: CircuitBreaker(
+                failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', 5)),
+                error_rate_threshold=float(os.getenv('LLM_BREAKER_ERROR_RATE', 0.5)),
+                min_samples=int(os.getenv('LLM_BREAKER_MIN_SAMPLES', 10)),
+                cooldown_seconds=float(os.getenv('LLM_BREAKER_COOLDOWN', 30)),
+                clock=clock
+            )
+            for name in providers
+        }
+        self.decisions = {"preferred": 0, "rerouted_unhealthy": 0, "rerouted_slow": 0, "explored": 0, "no_provider": 0}
+
+    def choose(self, sentiment: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Pick (primary, backup) for a turn; either may be None
+        """
+        preferred, alternative = ('anthropic', 'openai') if sentiment in EMPATHY_SENTIMENTS else ('openai', 'anthropic')
+        preferred_ok = self.breakers[preferred].available()
+        alternative_ok = self.breakers[alternative].available()
+
+        if not preferred_ok:
+            if alternative_ok:
+                self.decisions["rerouted_unhealthy"] += 1
+                return alternative, None
+            self.decisions["no_provider"] += 1
+            return None, None
+
+        if alternative_ok and self._much_slower(preferred, alternative):
+            self._slow_turns += 1
+            if self.explore_every > 0 and self._slow_turns % self.explore_every == 0:
+                self.decisions["explored"] += 1
+                return preferred, alternative
+            self.decisions["rerouted_slow"] += 1
+            return alternative, preferred
+
+        self.decisions["preferred"] += 1
+        return preferred, alternative if alternative_ok else None
+
+    def _much_slower(self, name: str, other: str) -> bool:
+        latency, other_latency = self.health[name].latency, self.health[other].latency
+        if latency is None or other_latency is None or self.latency_ratio <= 0:
+            return False
+        return latency > self.latency_ratio * other_latency
+
+    def acquire(self, name: str) -> bool:
+        return self.breakers[name].acquire()
+
+    def record_success(self, name: str, latency: float):
+        self.health[name].observe(True, latency)
+        self.breakers[name].on_success()
+
+    def record_failure(self, name: str):
+        health = self.health[name]
+        health.observe(False)
+        breaker = self.breakers[name]
+        was_open = breaker.state == OPEN
+        breaker.on_failure(health.error_rate, health.samples)
+        if breaker.state == OPEN and not was_open:
+            logger.warning(f"Circuit opened for {name} (error rate {health.error_rate:.2f})")
+
+    def record_cancelled(self, name: str, elapsed: Optional[float] = None):
+        self.breakers[name].release()
+        if elapsed is not None:
+            self.health[name].observe_lower_bound(elapsed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "latency_ratio": self.latency_ratio,
+            "decisions": dict(self.decisions),
+            "providers": {
+                name: {
+                    "ewma_latency_ms": round(health.latency * 1000, 1) if health.latency is not None else None,
+                    "ewma_error_rate": round(health.error_rate, 4),
+                    "successes": health.successes,
+                    "failures": health.failures,
+                    "breaker": self.breakers[name].get_stats(),
+                }
+                for name, health in self.health.items()
+            },
+        }
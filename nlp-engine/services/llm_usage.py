@@ -0,0 +1,102 @@
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def usage_from_openai(completion: Any) -> Dict[str, int]:
+    """
+    Token counts from an OpenAI chat completion (cached tokens when reported)
+    """
+    usage = getattr(completion, 'usage', None)
+    if usage is None:
+        return {}
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached = getattr(details, 'cached_tokens', 0) if details is not None else 0
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+        'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+        'cached_tokens': cached or 0,
+    }
+
+
+def usage_from_anthropic(response: Any) -> Dict[str, int]:
+    """
+    Token counts from an Anthropic message, including prompt-cache reads/writes
+    """
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return {}
+    cache_read = getattr(usage, 'cache_read_input_tokens', 0) or 0
+    cache_write = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+    return {
+        'prompt_tokens': (getattr(usage, 'input_tokens', 0) or 0) + cache_read + cache_write,
+        'completion_tokens': getattr(usage, 'output_tokens', 0) or 0,
+        'cached_tokens': cache_read,
+        'cache_write_tokens': cache_write,
+    }
+
+
+class LLMUsageTracker:
+    """
+    Per-provider request, token and latency accounting
+
+    Latency is split by whether the provider served part of the prompt from
+    its prompt cache, which shows the time saved by cache-friendly prefixes.
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def record(
+        self,
+        provider: str,
+        latency: float,
+        usage: Optional[Dict[str, int]] = None,
+        first_token_latency: Optional[float] = None
+    ):
+        usage = usage or {}
+        stats = self._providers[provider]
+        stats['requests'] += 1
+        stats['prompt_tokens'] += usage.get('prompt_tokens', 0)
+        stats['completion_tokens'] += usage.get('completion_tokens', 0)
+        stats['cached_tokens'] += usage.get('cached_tokens', 0)
+        stats['cache_write_tokens'] += usage.get('cache_write_tokens', 0)
+
+        bucket = 'cached' if usage.get('cached_tokens') else 'uncached'
+        stats[f'{bucket}_requests'] += 1
+        stats[f'{bucket}_latency'] += latency
+        if first_token_latency is not None:
+            stats[f'{bucket}_ttft_requests'] += 1
+            stats[f'{bucket}_ttft'] += first_token_latency
+
+    def record_error(self, provider: str):
+        self._providers[provider]['errors'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        report = {}
+        for provider, stats in self._providers.items():
+            def avg_ms(total_key, count_key):
+                count = stats.get(count_key, 0)
+                return round(stats.get(total_key, 0) / count * 1000, 1) if count else None
+
+            prompt_tokens = stats.get('prompt_tokens', 0)
+            report[provider] = {
+                'requests': int(stats.get('requests', 0)),
+                'errors': int(stats.get('errors', 0)),
+                'prompt_tokens': int(prompt_tokens),
+                'completion_tokens': int(stats.get('completion_tokens', 0)),
+                'cached_tokens': int(stats.get('cached_tokens', 0)),
+                'cache_write_tokens': int(stats.get('cache_write_tokens', 0)),
+                'cached_token_ratio': round(stats.get('cached_tokens', 0) / prompt_tokens, 4) if prompt_tokens else 0.0,
+                'avg_latency_ms': {
+                    'cached': avg_ms('cached_latency', 'cached_requests'),
+                    'uncached': avg_ms('uncached_latency', 'uncached_requests'),
+                },
+                'avg_ttft_ms': {
+                    'cached': avg_ms('cached_ttft', 'cached_ttft_requests'),
+                    'uncached': avg_ms('uncached_ttft', 'uncached_ttft_requests'),
+                },
+            }
+        return report
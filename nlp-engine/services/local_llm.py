@@ -0,0 +1,45 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class LocalStubLLM:
+    """
+    Deterministic offline stand-in for the chat LLMs
+
+    The same messages always produce the same reply, so caching, routing
+    and summarization paths can be exercised without provider keys.
+    Requests that ask for JSON get a small valid JSON object back.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_ms: float = None):
+        if latency_ms is None:
+            latency_ms = float(os.getenv('LLM_STUB_LATENCY_MS', 0))
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+    async def complete(self, messages: List[Dict[str, Any]], json_mode: bool = False, **kwargs) -> str:
+        self.requests += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        last = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '')
+        if isinstance(last, list):
+            last = ' '.join(block.get('text', '') for block in last)
+        digest = hashlib.sha1(json.dumps(messages, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:8]
+        words = ' '.join(str(last).split()[:12])
+
+        if json_mode:
+            return json.dumps({
+                "summary": f"Stub summary of: {words}",
+                "key_points": [f"Point {digest}"],
+                "action_items": [{"responsible": "Agent", "action": "Follow up"}],
+            })
+        return f"Stub reply {digest}: {words}"
@@ -0,0 +1,329 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from services.translation_backends import TranslationBackend
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+try:
+    import torch
+    from transformers import MarianMTModel, MarianTokenizer
+except ImportError:  # transformers/torch are not in requirements-minimal.txt
+    torch = None
+    MarianMTModel = None
+    MarianTokenizer = None
+
+# Service language codes that differ from the OPUS-MT model naming
+MARIAN_CODE_MAP = {
+    'zh-cn': 'zh',
+    'zh-tw': 'zh',
+}
+
+
+def is_missing_model(error: Exception) -> bool:
+    """
+    True when the hub has no such model, as opposed to a transient failure
+    """
+    if type(error).__name__ in ("RepositoryNotFoundError", "RevisionNotFoundError", "EntryNotFoundError"):
+        return True
+    message = str(error)
+    return "is not a valid model identifier" in message or "404 Client Error" in message
+
+
+def marian_model_name(source: str, target: str) -> str:
+    src = MARIAN_CODE_MAP.get(source.lower(), source.lower())
+    tgt = MARIAN_CODE_MAP.get(target.lower(), target.lower())
+    return f"Helsinki-NLP/opus-mt-{src}-{tgt}"
+
+
+class LoadedModel:
+    """
+    A MarianMT model/tokenizer pair held by the pool
+    """
+
+    def __init__(self, pair: Tuple[str, str], name: str, model: Any, tokenizer: Any, size_bytes: int):
+        self.pair = pair
+        self.name = name
+        self.model = model
+        self.tokenizer = tokenizer
+        self.size_bytes = size_bytes
+        self.loaded_at = time.time()
+        self.uses = 0
+
+
+class MarianModelPool:
+    """
+    Lazily loaded, memory-bounded LRU pool of per-language-pair MarianMT models
+
+    Models are loaded on first use. When the summed parameter memory exceeds
+    the budget the least recently used pairs are dropped; a model still
+    generating keeps running on its own reference until it finishes.
+
+    Pairs without an OPUS-MT model are remembered as unavailable; other load
+    failures (network, hub outages) are retried after a doubling backoff.
+
+    Note that num_threads is applied with torch.set_num_threads, which is
+    process-wide: it also caps the intra-op threads of every other torch
+    model in the process (the sentiment pipelines included).
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        num_threads: Optional[int] = None,
+        cache_dir: Optional[str] = None
+    ):
+        if max_bytes is None:
+            max_bytes = int(os.getenv('TRANSLATION_LOCAL_MAX_MODEL_MB', 1200)) * 1024 * 1024
+        if num_threads is None:
+            num_threads = int(os.getenv('TRANSLATION_LOCAL_THREADS', 2))
+
+        self.max_bytes = max_bytes
+        self.num_threads = num_threads
+        self.cache_dir = cache_dir or os.getenv('TRANSLATION_LOCAL_MODEL_DIR')
+        self.current_bytes = 0
+
+        self._models: "OrderedDict[Tuple[str, str], LoadedModel]" = OrderedDict()
+        self._unavailable: Set[Tuple[str, str]] = set()
+        # pair -> (consecutive transient failures, monotonic time of next attempt)
+        self._backoff: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self.retry_backoff = float(os.getenv('TRANSLATION_LOCAL_RETRY_BACKOFF', 30))
+        self.max_retry_backoff = float(os.getenv('TRANSLATION_LOCAL_MAX_RETRY_BACKOFF', 1800))
+        self._loading = SingleFlight("marian_load")
+
+        # One worker keeps torch's intra-op threads from oversubscribing the CPU
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="marian")
+
+        self.loads = 0
+        self.evictions = 0
+        self.load_failures = 0
+
+        if torch is not None:
+            torch.set_num_threads(self.num_threads)
+
+    @property
+    def available(self) -> bool:
+        return MarianMTModel is not None
+
+    def is_unavailable(self, source: str, target: str) -> bool:
+        pair = (source, target)
+        return pair in self._unavailable or self._backing_off(pair)
+
+    def _backing_off(self, pair: Tuple[str, str]) -> bool:
+        backoff = self._backoff.get(pair)
+        return backoff is not None and time.monotonic() < backoff[1]
+
+    async def get(self, source: str, target: str) -> LoadedModel:
+        """
+        Return the model for a pair, loading (and evicting) as needed
+        """
+        pair = (source, target)
+        loaded = self._models.get(pair)
+        if loaded is not None:
+            self._models.move_to_end(pair)
+            return loaded
+
+        if not self.available:
+            raise RuntimeError("transformers/torch not installed")
+        if pair in self._unavailable:
+            raise RuntimeError(f"No local model for {source}->{target}")
+        if self._backing_off(pair):
+            raise RuntimeError(f"Local model for {source}->{target} failed to load recently; retrying later")
+
+        return await self._loading.do(pair, lambda: self._load(pair))
+
+    async def _load(self, pair: Tuple[str, str]) -> LoadedModel:
+        name = marian_model_name(*pair)
+        loop = asyncio.get_event_loop()
+        started = time.perf_counter()
+        try:
+            model, tokenizer = await loop.run_in_executor(self.executor, lambda: self._load_sync(name))
+        except Exception as e:
+            self.load_failures += 1
+            if is_missing_model(e):
+                self._unavailable.add(pair)
+                logger.warning(f"Local translation model {name} unavailable: {e}")
+            else:
+                failures = self._backoff.get(pair, (0, 0.0))[0] + 1
+                delay = min(self.max_retry_backoff, self.retry_backoff * 2 ** (failures - 1))
+                self._backoff[pair] = (failures, time.monotonic() + delay)
+                logger.warning(f"Local translation model {name} failed to load, retrying in {delay:.0f}s: {e}")
+            raise
+        self._backoff.pop(pair, None)
+
+        size = sum(p.numel() * p.element_size() for p in model.parameters())
+        loaded = LoadedModel(pair, name, model, tokenizer, size)
+        self._models[pair] = loaded
+        self.current_bytes += size
+        self.loads += 1
+        logger.info(
+            f"Loaded {name} ({size / 1024 / 1024:.0f} MB) in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+
+        self._evict(keep=pair)
+        return loaded
+
+    def _load_sync(self, name: str):
+        tokenizer = MarianTokenizer.from_pretrained(name, cache_dir=self.cache_dir)
+        model = MarianMTModel.from_pretrained(name, cache_dir=self.cache_dir)
+        model.eval()
+        return model, tokenizer
+
+    def _evict(self, keep: Tuple[str, str]):
+        while self.current_bytes > self.max_bytes and len(self._models) > 1:
+            pair = next(iter(self._models))
+            if pair == keep:
+                break
+            evicted = self._models.pop(pair)
+            self.current_bytes -= evicted.size_bytes
+            self.evictions += 1
+            logger.info(f"Evicted local translation model {evicted.name}")
+
+    def unload(self, source: str, target: str) -> bool:
+        evicted = self._models.pop((source, target), None)
+        if evicted is None:
+            return False
+        self.current_bytes -= evicted.size_bytes
+        return True
+
+    def memory_usage(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": f"{m.pair[0]}-{m.pair[1]}", "model": m.name, "param_bytes": m.size_bytes}
+            for m in self._models.values()
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "models": [
+                {
+                    "pair": f"{m.pair[0]}-{m.pair[1]}",
+                    "model": m.name,
+                    "bytes": m.size_bytes,
+                    "uses": m.uses,
+                }
+                for m in self._models.values()
+            ],
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "threads": self.num_threads,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "load_failures": self.load_failures,
+            "unavailable_pairs": sorted(f"{s}-{t}" for s, t in self._unavailable),
+            "backing_off_pairs": sorted(f"{s}-{t}" for s, t in self._backoff if self._backing_off((s, t))),
+        }
+
+
+class MarianTranslationBackend(TranslationBackend):
+    """
+    Offline translation with per-language-pair MarianMT models
+    """
+
+    name = "local"
+
+    def __init__(self, pool: Optional[MarianModelPool] = None, generate_batch_size: int = None, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = pool or MarianModelPool()
+        if generate_batch_size is None:
+            generate_batch_size = int(os.getenv('TRANSLATION_LOCAL_BATCH_SIZE', 16))
+        self.generate_batch_size = generate_batch_size
+
+    async def translate(self, text: str, source: str, target: str) -> str:
+        return (await self.translate_batch([text], source, target))[0]
+
+    async def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        loaded = await self.pool.get(source, target)
+        loaded.uses += 1
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.pool.executor,
+            lambda: self._generate(loaded, texts)
+        )
+
+    def _generate(self, loaded: LoadedModel, texts: List[str]) -> List[str]:
+        results = []
+        for i in range(0, len(texts), self.generate_batch_size):
+            batch = texts[i:i + self.generate_batch_size]
+            inputs = loaded.tokenizer(batch, return_tensors="pt", padding=True, truncation=True, max_length=512)
+            with torch.inference_mode():
+                outputs = loaded.model.generate(**inputs, num_beams=1, max_new_tokens=256)
+            results.extend(loaded.tokenizer.batch_decode(outputs, skip_special_tokens=True))
+        return results
+
+
+class TranslationRouter(TranslationBackend):
+    """
+    Routes each language pair to the local or remote backend
+
+    TRANSLATION_LOCAL_PAIRS lists the pairs to serve locally ("en-es,es-en"),
+    or "*" for every pair with an OPUS-MT model. Local failures, including
+    pairs without a model, fall back to the remote backend.
+    """
+
+    name = "hybrid"
+
+    def __init__(
+        self,
+        local: TranslationBackend,
+        remote: TranslationBackend,
+        local_pairs: Optional[str] = None
+    ):
+        super().__init__(
+            max_batch_size=remote.max_batch_size,
+            max_batch_chars=remote.max_batch_chars
+        )
+        self.local = local
+        self.remote = remote
+
+        if local_pairs is None:
+            local_pairs = os.getenv('TRANSLATION_LOCAL_PAIRS', '*')
+        pairs = [p.strip().lower() for p in local_pairs.split(',') if p.strip()]
+        self.all_pairs_local = '*' in pairs
+        self.local_pairs = {tuple(p.split('-', 1)) for p in pairs if p != '*' and '-' in p}
+
+        self.routed = {"local": 0, "remote": 0, "fallback": 0}
+
+    def use_local(self, source: str, target: str) -> bool:
+        pool = getattr(self.local, 'pool', None)
+        if pool is not None and (not pool.available or pool.is_unavailable(source, target)):
+            return False
+        return self.all_pairs_local or (source.lower(), target.lower()) in self.local_pairs
+
+    async def translate(self, text: str, source: str, target: str) -> str:
+        return (await self.translate_batch([text], source, target))[0]
+
+    async def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        if self.use_local(source, target):
+            try:
+                results = await self.local.translate_batch(texts, source, target)
+                self.routed["local"] += 1
+                return results
+            except Exception as e:
+                logger.warning(f"Local translation failed ({source} -> {target}), using remote: {e}")
+                self.routed["fallback"] += 1
+
+        self.routed["remote"] += 1
+        return await self.remote.translate_batch(texts, source, target)
+
+    async def aclose(self):
+        for backend in (self.local, self.remote):
+            if hasattr(backend, 'aclose'):
+                await backend.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        pool = getattr(self.local, 'pool', None)
+        return {
+            "remote": self.remote.get_stats() if hasattr(self.remote, 'get_stats') else None,
+            "routed": dict(self.routed),
+            "local_pairs": "*" if self.all_pairs_local else sorted(f"{s}-{t}" for s, t in self.local_pairs),
+            "model_pool": pool.get_stats() if pool is not None else None,
+        }
@@ -0,0 +1,307 @@
+import os
+import gc
+import sys
+import time
+import asyncio
+import logging
+import itertools
+import tracemalloc
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.model_registry import process_rss_bytes
+from services.session_store import InMemorySessionStore, JournaledSessionStore, SessionStore
+from services.translation_cache import LRUTTLCache, TranslationCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_CONTAINERS = (dict, list, tuple, set, frozenset, deque)
+# Plain-data types that hold no references worth following
+_ATOMIC = (str, bytes, bytearray, int, float, bool, type(None))
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Bytes held by obj and everything it contains
+
+    Follows builtin containers and instances of this package's classes
+    (sessions, jobs, rolling summaries); anything else (clients, events,
+    locks, functions) is counted shallowly so a stray reference to the
+    event loop does not pull the whole process into the total. Objects
+    reachable more than once are counted once per `seen` set.
+    """
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current, 0)
+
+        if isinstance(current, _ATOMIC):
+            continue
+        if isinstance(current, (dict, Mapping)):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, _CONTAINERS):
+            stack.extend(current)
+        elif type(current).__module__.startswith('services.'):
+            if hasattr(current, '__dict__'):
+                stack.append(current.__dict__)
+            for slot in getattr(type(current), '__slots__', ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return total
+
+
+def sampled_sizeof(container: Any, sample: int) -> Tuple[int, bool]:
+    """
+    Deep size of a container, extrapolated from its first `sample` items
+
+    Returns (bytes, sampled). sample=0 walks everything.
+    """
+    size = len(container) if hasattr(container, '__len__') else 0
+    if not sample or size <= sample or not isinstance(container, (Mapping,) + _CONTAINERS):
+        return deep_sizeof(container), False
+
+    seen = {id(container)}
+    # Take the sample in one C-level call so a concurrent insert on the
+    # event loop cannot invalidate the iterator midway
+    if isinstance(container, Mapping):
+        items = list(itertools.islice(container.items(), sample))
+        walked = sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in items)
+    else:
+        walked = sum(deep_sizeof(item, seen) for item in list(itertools.islice(container, sample)))
+    return sys.getsizeof(container, 0) + int(walked / sample * size), True
+
+
+def describe(obj: Any) -> Tuple[Any, Optional[int], Dict[str, Any]]:
+    """
+    (container to size, bytes the object accounts for itself, extra fields)
+    """
+    if isinstance(obj, TranslationCache):
+        container, accounted, extra = describe(obj.memory)
+        return container, accounted, dict(extra, redis=obj.redis is not None)
+    if isinstance(obj, LRUTTLCache):
+        return obj._entries, obj.current_bytes, {"max_bytes": obj.max_bytes}
+    if isinstance(obj, JournaledSessionStore):
+        container, accounted, extra = describe(obj.inner)
+        return container, accounted, dict(extra, backend=obj.name)
+    if isinstance(obj, InMemorySessionStore):
+        return obj._sessions, obj.current_bytes, {"backend": obj.name, "max_bytes": obj.max_bytes}
+    if isinstance(obj, SessionStore):
+        # Out-of-process store (redis): nothing held here
+        return None, None, {"backend": obj.name}
+    return obj, None, {}
+
+
+class MemoryInspector:
+    """
+    Where the process's memory goes: caches, session stores and models
+
+    Each registered source is deep-sized with sys.getsizeof over its
+    entries and reported next to the byte count it keeps for its own
+    budget (accounted_bytes), since the two drift apart (a session costs
+    about twice its JSON size as Python objects). Stores larger
+    than MEMORY_REPORT_SAMPLE entries are sized from a sample and
+    extrapolated so a report stays cheap on a full pod.
+
+    Reports and tracemalloc snapshots are taken on a worker thread, off
+    the event loop, and a report is reused for MEMORY_REPORT_MIN_INTERVAL
+    seconds so polling /memory/stats cannot keep that thread busy. A store
+    changed by a request mid-walk is measured again.
+
+    With MEMORY_TRACEMALLOC=true, snapshot() starts tracing and records a
+    baseline, and diff() reports the allocation sites that grew since.
+    Tracing slows every allocation, so it stays off unless asked for.
+    """
+
+    def __init__(self, sample: Optional[int] = None, tracemalloc_enabled: Optional[bool] = None):
+        self.sample = sample if sample is not None else int(os.getenv('MEMORY_REPORT_SAMPLE', 1000))
+        if tracemalloc_enabled is None:
+            tracemalloc_enabled = os.getenv('MEMORY_TRACEMALLOC', 'false').lower() == 'true'
+        self.tracemalloc_enabled = tracemalloc_enabled
+        self.tracemalloc_frames = int(os.getenv('MEMORY_TRACEMALLOC_FRAMES', 1))
+        self.min_interval = float(os.getenv('MEMORY_REPORT_MIN_INTERVAL', 5))
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory_report")
+        self._last_report: Optional[Dict[str, Any]] = None
+        self._last_report_at = 0.0
+
+        self.sources: Dict[str, Callable[[], Any]] = {}
+        self.model_sources: Dict[str, Callable[[], List[Dict[str, Any]]]] = {}
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_at: Optional[float] = None
+
+    def register(self, name: str, source: Callable[[], Any]):
+        """
+        Report the cache/store returned by source() (looked up on every report)
+        """
+        self.sources[name] = source
+
+    def register_models(self, name: str, source: Callable[[], List[Dict[str, Any]]]):
+        """
+        Report models from source(): [{"name", "param_bytes", ...}]
+        """
+        self.model_sources[name] = source
+
+    @staticmethod
+    def _retry(fn: Callable[[], Any], attempts: int = 3) -> Any:
+        # "changed size during iteration" when a request touched the store mid-walk
+        for attempt in range(attempts):
+            try:
+                return fn()
+            except RuntimeError:
+                if attempt == attempts - 1:
+                    raise
+
+    async def collect(self) -> Dict[str, Any]:
+        """
+        report() on the worker thread, reused for min_interval seconds
+        """
+        now = time.monotonic()
+        if self._last_report is None or now - self._last_report_at >= self.min_interval:
+            loop = asyncio.get_running_loop()
+            self._last_report = await loop.run_in_executor(self.executor, self.report)
+            self._last_report_at = time.monotonic()
+        return dict(self._last_report, age_seconds=round(time.monotonic() - self._last_report_at, 1))
+
+    def _measure(self, obj: Any) -> Dict[str, Any]:
+        container, accounted, extra = describe(obj)
+        if container is None:
+            return dict(extra, in_process=False)
+
+        started = time.perf_counter()
+        deep_bytes, sampled = sampled_sizeof(container, self.sample)
+        report = {
+            "entries": len(container) if hasattr(container, '__len__') else None,
+            "deep_bytes": deep_bytes,
+            "sampled": sampled,
+        }
+        if accounted is not None:
+            report["accounted_bytes"] = accounted
+        report.update(extra)
+        report["measure_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return report
+
+    def report(self) -> Dict[str, Any]:
+        stores = {}
+        for name, source in self.sources.items():
+            try:
+                stores[name] = self._retry(lambda: self._measure(source()))
+            except Exception as e:
+                logger.error(f"Memory report failed for {name}: {e}")
+                stores[name] = {"error": str(e)}
+
+        models = {}
+        for group, source in self.model_sources.items():
+            try:
+                for model in self._retry(source):
+                    models[f"{group}:{model['name']}"] = model
+            except Exception as e:
+                logger.error(f"Memory report failed for {group} models: {e}")
+
+        rss = process_rss_bytes()
+        store_bytes = sum(s.get("deep_bytes", 0) for s in stores.values())
+        model_bytes = sum(m.get("param_bytes") or 0 for m in models.values())
+        return {
+            "process": {
+                "rss_bytes": rss,
+                "peak_rss_bytes": self._peak_rss(),
+                "gc_counts": gc.get_count(),
+                "attributed_bytes": store_bytes + model_bytes,
+                # Interpreter, libraries, allocator slack and anything not registered
+                "unattributed_bytes": max(0, rss - store_bytes - model_bytes) if rss else None,
+            },
+            "stores": stores,
+            "store_bytes": store_bytes,
+            "models": models,
+            "model_bytes": model_bytes,
+            "tracemalloc": self.tracemalloc_status(),
+        }
+
+    @staticmethod
+    def _peak_rss() -> Optional[int]:
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    def tracemalloc_status(self) -> Dict[str, Any]:
+        status = {
+            "enabled": self.tracemalloc_enabled,
+            "tracing": tracemalloc.is_tracing(),
+            "baseline_at": self._baseline_at,
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            status.update(traced_bytes=current, traced_peak_bytes=peak, overhead_bytes=tracemalloc.get_tracemalloc_memory())
+        return status
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """
+        Start tracing if needed and record the baseline for diff()
+        """
+        if not self.tracemalloc_enabled:
+            raise PermissionError("tracemalloc mode is disabled (set MEMORY_TRACEMALLOC=true)")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+            logger.info(f"tracemalloc started ({self.tracemalloc_frames} frames)")
+        loop = asyncio.get_running_loop()
+        self._baseline = await loop.run_in_executor(self.executor, self._take_snapshot)
+        self._baseline_at = time.time()
+        return self.tracemalloc_status()
+
+    async def diff(self, top: int = 25, group_by: str = 'lineno') -> Dict[str, Any]:
+        """
+        Allocation sites that grew most since the baseline snapshot
+        """
+        if self._baseline is None or not tracemalloc.is_tracing():
+            raise LookupError("No baseline; POST /memory/snapshot first")
+        baseline = self._baseline
+
+        # Snapshotting and comparing take a while on a busy process; keep both off the event loop
+        loop = asyncio.get_running_loop()
+        stats = await loop.run_in_executor(
+            self.executor, lambda: self._take_snapshot().compare_to(baseline, group_by)
+        )
+        return {
+            "since": self._baseline_at,
+            "seconds": round(time.time() - self._baseline_at, 1),
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "top": [
+                {
+                    "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                    "size_diff_bytes": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                    "size_bytes": stat.size,
+                    "count": stat.count,
+                }
+                for stat in stats[:top]
+            ],
+            "tracemalloc": self.tracemalloc_status(),
+        }
+
+    def stop_tracing(self) -> Dict[str, Any]:
+        tracemalloc.stop()
+        self._baseline = None
+        self._baseline_at = None
+        return self.tracemalloc_status()
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
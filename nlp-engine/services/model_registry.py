@@ -0,0 +1,353 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from transformers import pipeline
+except ImportError:  # transformers/torch are not in requirements-minimal.txt
+    pipeline = None
+
+# Built-in model specs; MODEL_REGISTRY_PATH entries are merged over these
+DEFAULT_MODELS: Dict[str, Dict[str, Any]] = {
+    "sentiment": {
+        "task": "sentiment-analysis",
+        "model": "distilbert-base-uncased-finetuned-sst-2-english",
+    },
+    "emotion": {
+        "task": "text-classification",
+        "model": "j-hartmann/emotion-english-distilroberta-base",
+        "options": {"top_k": None},
+    },
+}
+
+# pipeline() keyword arguments a spec may set; anything else (notably
+# trust_remote_code, which runs code from the model repo) is rejected
+ALLOWED_OPTIONS = frozenset({
+    "top_k", "function_to_apply", "truncation", "max_length",
+    "batch_size", "device", "torch_dtype", "use_fast",
+})
+
+# Run through a new version before it takes traffic
+WARMUP_TEXTS = [
+    "Thanks, that fixed it.",
+    "I've been on hold for an hour and nobody can help me with this bill.",
+]
+
+
+def process_rss_bytes() -> int:
+    """
+    Current resident set size of this process (0 when unknown)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def parameter_bytes(model: Any) -> int:
+    """
+    Summed size of a torch model's parameters and buffers
+    """
+    if model is None or not hasattr(model, 'parameters'):
+        return 0
+    tensors = list(model.parameters()) + list(getattr(model, 'buffers', lambda: [])())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelVersion:
+    """
+    One loaded version of a named model with its usage metrics
+    """
+
+    def __init__(
+        self,
+        name: str,
+        version: int,
+        spec: Dict[str, Any],
+        model: Any,
+        load_seconds: float,
+        rss_bytes: int
+    ):
+        self.name = name
+        self.version = version
+        self.spec = spec
+        self.model = model
+        self.load_seconds = load_seconds
+        self.rss_bytes = rss_bytes
+        self.param_bytes = parameter_bytes(getattr(model, 'model', None))
+        self.loaded_at = time.time()
+        self.retired_at: Optional[float] = None
+
+        self.in_flight = 0
+        self.calls = 0
+        self.items = 0
+        self.errors = 0
+        self.latencies: Deque[float] = deque(maxlen=1000)
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        return {
+            "version": self.version,
+            "model": self.spec.get("model"),
+            "revision": self.spec.get("revision"),
+            "task": self.spec.get("task"),
+            "loaded_at": self.loaded_at,
+            "retired_at": self.retired_at,
+            "load_seconds": round(self.load_seconds, 2),
+            "rss_bytes": self.rss_bytes,
+            "param_bytes": self.param_bytes,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "items": self.items,
+            "errors": self.errors,
+            "latency_avg_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else None,
+            "latency_p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2) if ordered else None,
+        }
+
+
+class ModelRegistry:
+    """
+    Named transformers pipelines that can be loaded and swapped at runtime
+
+    Specs (task, model, revision, options) come from DEFAULT_MODELS with
+    MODEL_REGISTRY_PATH (JSON, {"sentiment": {"model": ...}}) merged over
+    them; the file is re-read on every reload, so editing it and calling
+    load() rolls out a new version without a restart. A new version is
+    built and warmed off the event loop while the old one keeps serving,
+    then swapped in atomically. Callers hold a version for the duration of
+    an inference via use(), so requests already running finish on the old
+    version, which is dropped once its last request completes.
+
+    Loads run one at a time so the RSS growth measured across a load can be
+    attributed to that model; it is approximate, since concurrent inference
+    also allocates. Only configured names can be loaded, and spec options
+    are limited to ALLOWED_OPTIONS.
+    """
+
+    def __init__(self, config_path: Optional[str] = None, warmup: Optional[bool] = None):
+        self.config_path = config_path or os.getenv('MODEL_REGISTRY_PATH')
+        if warmup is None:
+            warmup = os.getenv('MODEL_WARMUP', 'true').lower() == 'true'
+        self.warmup = warmup
+
+        self.specs: Dict[str, Dict[str, Any]] = dict(DEFAULT_MODELS)
+        try:
+            self.reload_config()
+        except Exception as e:
+            logger.error(f"Failed to read model registry {self.config_path}, using defaults: {e}")
+
+        self._active: Dict[str, ModelVersion] = {}
+        self._draining: List[ModelVersion] = []
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model_load")
+
+        self.loads = 0
+        self.load_failures = 0
+        self.swaps = 0
+        self.unloads = 0
+
+    @property
+    def available(self) -> bool:
+        return pipeline is not None
+
+    def reload_config(self):
+        """
+        Re-read MODEL_REGISTRY_PATH; raises if the file is unreadable
+        """
+        specs = {name: dict(spec) for name, spec in DEFAULT_MODELS.items()}
+        if self.config_path:
+            with open(self.config_path, encoding='utf-8') as f:
+                overrides = json.load(f)
+            for name, spec in overrides.items():
+                specs.setdefault(name, {}).update(spec)
+        self.specs = specs
+
+    def _resolve(self, name: str, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Spec for a configured model; raises LookupError for unknown names
+        and ValueError for an incomplete spec or disallowed options
+        """
+        if name not in self.specs:
+            raise LookupError(f"Unknown model '{name}'")
+        spec = {**self.specs[name], **(overrides or {})}
+        if not spec.get("task") or not spec.get("model"):
+            raise ValueError(f"Model '{name}' needs a task and a model")
+        disallowed = sorted(set(spec.get("options") or {}) - ALLOWED_OPTIONS)
+        if disallowed:
+            raise ValueError(f"Model '{name}' options not allowed: {', '.join(disallowed)}")
+        return spec
+
+    def get(self, name: str) -> Optional[ModelVersion]:
+        return self._active.get(name)
+
+    @contextmanager
+    def use(self, name: str, items: int = 1):
+        """
+        Hold the active version of a model for one inference
+
+        Yields the pipeline, or None when the model is not loaded. The
+        version yielded stays valid even if a swap happens meanwhile.
+        """
+        with self._lock:
+            version = self._active.get(name)
+            if version is not None:
+                version.in_flight += 1
+        if version is None:
+            yield None
+            return
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield version.model
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                version.in_flight -= 1
+                version.calls += 1
+                version.items += items
+                version.errors += failed
+                version.latencies.append(elapsed)
+                if version.in_flight == 0 and version in self._draining:
+                    self._draining.remove(version)
+                    logger.info(f"Model {name} v{version.version} drained")
+
+    def _build(self, name: str, spec: Dict[str, Any]) -> ModelVersion:
+        if pipeline is None:
+            raise RuntimeError("transformers not installed")
+
+        rss_before = process_rss_bytes()
+        started = time.perf_counter()
+        try:
+            kwargs = dict(spec.get("options") or {}, trust_remote_code=False)
+            if spec.get("revision"):
+                kwargs["revision"] = spec["revision"]
+            model = pipeline(spec["task"], model=spec["model"], **kwargs)
+            if self.warmup:
+                model(WARMUP_TEXTS)
+        except Exception:
+            self.load_failures += 1
+            raise
+        load_seconds = time.perf_counter() - started
+
+        self._versions[name] = self._versions.get(name, 0) + 1
+        version = ModelVersion(
+            name,
+            self._versions[name],
+            spec,
+            model,
+            load_seconds,
+            max(0, process_rss_bytes() - rss_before)
+        )
+        self.loads += 1
+        logger.info(
+            f"Loaded model {name} v{version.version} ({spec['model']}) in {load_seconds:.1f}s, "
+            f"{version.param_bytes / 1024 / 1024:.0f} MB parameters, "
+            f"+{version.rss_bytes / 1024 / 1024:.0f} MB RSS"
+        )
+        return version
+
+    def _swap(self, name: str, version: Optional[ModelVersion]) -> Optional[ModelVersion]:
+        with self._lock:
+            old = self._active.pop(name, None)
+            if version is not None:
+                self._active[name] = version
+            if old is not None:
+                old.retired_at = time.time()
+                if old.in_flight:
+                    self._draining.append(old)
+        if old is not None and version is not None:
+            self.swaps += 1
+        return old
+
+    def ensure_loaded(self, names: Iterable[str]):
+        """
+        Synchronously load models that are configured but not active
+
+        Used at construction time; failures are logged and the model left
+        unloaded so callers fall back.
+        """
+        for name in names:
+            spec = self.specs.get(name, {})
+            if name in self._active or spec.get("enabled", True) is False:
+                continue
+            try:
+                self._swap(name, self._build(name, self._resolve(name)))
+            except Exception as e:
+                logger.error(f"Failed to load model {name}: {e}")
+
+    async def load(self, name: str, overrides: Optional[Dict[str, Any]] = None) -> ModelVersion:
+        """
+        Build and warm a new version, then swap it in
+
+        Without overrides the config file is re-read first. On failure the
+        current version keeps serving and the error is raised.
+        """
+        if overrides is None:
+            self.reload_config()
+        spec = self._resolve(name, overrides)
+
+        loop = asyncio.get_event_loop()
+        version = await loop.run_in_executor(self.executor, self._build, name, spec)
+        old = self._swap(name, version)
+        if old is not None:
+            logger.info(f"Swapped model {name} v{old.version} -> v{version.version}")
+        return version
+
+    def unload(self, name: str) -> bool:
+        old = self._swap(name, None)
+        if old is None:
+            return False
+        self.unloads += 1
+        logger.info(f"Unloaded model {name} v{old.version}")
+        return True
+
+    def memory_usage(self) -> List[Dict[str, Any]]:
+        """
+        Parameter and load-time RSS bytes per loaded version, draining included
+        """
+        with self._lock:
+            versions = [(version, False) for version in self._active.values()]
+            versions += [(version, True) for version in self._draining]
+        return [
+            {
+                "name": version.name if not draining else f"{version.name}@v{version.version}",
+                "model": version.spec.get("model"),
+                "version": version.version,
+                "draining": draining,
+                "param_bytes": version.param_bytes,
+                "load_rss_bytes": version.rss_bytes,
+            }
+            for version, draining in versions
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = {name: version.to_dict() for name, version in self._active.items()}
+            draining = [dict(version.to_dict(), name=version.name) for version in self._draining]
+        return {
+            "available": self.available,
+            "config_path": self.config_path,
+            "process_rss_bytes": process_rss_bytes(),
+            "models": active,
+            "draining": draining,
+            "configured": {name: spec for name, spec in self.specs.items() if name not in active},
+            "loads": self.loads,
+            "load_failures": self.load_failures,
+            "swaps": self.swaps,
+            "unloads": self.unloads,
+        }
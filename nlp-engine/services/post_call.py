@@ -0,0 +1,194 @@
+import time
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from services.extractive_summarizer import split_turns
+from services.lexicon import get_lexicon, tally
+
+logger = logging.getLogger(__name__)
+
+# Speaker labels treated as our side of the call; everyone else is the customer
+AGENT_SPEAKERS = frozenset({'agent', 'assistant', 'ai', 'bot', 'system'})
+
+STAGES = ("segment", "inference", "rules", "summary", "total")
+
+
+class PostCallAnalyzer:
+    """
+    All post-call analytics from a single pass over the transcript
+
+    The transcript is segmented into turns once. Sentiment and emotion run
+    as one batched pass per model over every turn; entities, intents and
+    lexicon keywords are extracted per turn. CSAT, its factors, the
+    sentiment trajectory and the summary's overall sentiment are derived
+    from those shared results instead of /summarize, /csat and /sentiment
+    each re-reading the transcript. The summary itself runs concurrently
+    with the inference.
+    """
+
+    def __init__(self, sentiment_analyzer: Any, intent_classifier: Any, entity_extractor: Any, summarizer: Any):
+        self.sentiment_analyzer = sentiment_analyzer
+        self.intent_classifier = intent_classifier
+        self.entity_extractor = entity_extractor
+        self.summarizer = summarizer
+        self.lexicon = get_lexicon()
+
+        self.calls = 0
+        self.turns = 0
+        self.summary_errors = 0
+        self.stage_seconds = {stage: 0.0 for stage in STAGES}
+
+    async def analyze(
+        self,
+        transcript: str,
+        language: str = "en",
+        call_id: Optional[str] = None,
+        include_summary: bool = True,
+        tier: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Per-turn sentiment, emotion, intent and entities plus CSAT,
+        sentiment trajectory and (optionally) the summary
+        """
+        timings = {}
+        started = time.perf_counter()
+        turns = split_turns(transcript)
+        timings["segment"] = time.perf_counter() - started
+
+        summary_task = None
+        if include_summary:
+            summary_task = asyncio.create_task(self._summarize(transcript, language, call_id, tier, timings))
+
+        try:
+            stage_started = time.perf_counter()
+            sentiments = await self.sentiment_analyzer.analyze_batch([text for _, text in turns], language)
+            timings["inference"] = time.perf_counter() - stage_started
+
+            stage_started = time.perf_counter()
+            analyzed = []
+            keywords = [self.lexicon.matches(text, language) for _, text in turns]
+            for index, ((speaker, text), sentiment) in enumerate(zip(turns, sentiments)):
+                is_customer = self._is_customer(speaker)
+                turn = {
+                    "index": index,
+                    "speaker": speaker,
+                    "customer": is_customer,
+                    "sentiment": sentiment['sentiment'],
+                    "score": sentiment['score'],
+                    "emotions": sentiment['emotions'],
+                    "entities": await self.entity_extractor.extract(text, language),
+                    "keywords": [match._asdict() for match in keywords[index]],
+                }
+                # Intents only describe what the customer wants
+                if is_customer:
+                    intent = await self.intent_classifier.classify(text, language)
+                    turn["intent"] = intent['intent']
+                    turn["intent_confidence"] = intent['confidence']
+                analyzed.append(turn)
+
+            # Without speaker labels every turn counts as the customer's
+            customer_turns = [turn for turn in analyzed if turn["customer"]] or analyzed
+            csat = self.sentiment_analyzer.csat_from_turns(
+                transcript,
+                [sentiments[turn["index"]] for turn in customer_turns],
+                tally(match for turn in customer_turns for match in keywords[turn["index"]])
+            )
+            intents = Counter(turn["intent"] for turn in customer_turns if turn.get("intent", "unknown") != "unknown")
+            timings["rules"] = time.perf_counter() - stage_started
+        except BaseException:
+            if summary_task is not None:
+                summary_task.cancel()
+            raise
+
+        overall_sentiment = csat.pop("overall_sentiment")
+        summary = None
+        if summary_task is not None:
+            summary = await summary_task
+            summary["overall_sentiment"] = overall_sentiment["sentiment"]
+        timings["total"] = time.perf_counter() - started
+
+        self.calls += 1
+        self.turns += len(turns)
+        for stage, seconds in timings.items():
+            self.stage_seconds[stage] += seconds
+
+        return {
+            "language": language,
+            "turn_count": len(turns),
+            "turns": analyzed,
+            "sentiment": overall_sentiment,
+            "csat": csat,
+            "trajectory": self._trajectory(customer_turns),
+            "intents": dict(intents.most_common()),
+            "summary": summary,
+            "timings_ms": {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()},
+        }
+
+    async def _summarize(
+        self,
+        transcript: str,
+        language: str,
+        call_id: Optional[str],
+        tier: Optional[str],
+        timings: Dict[str, float]
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            structured = await self.summarizer.summarize_structured(transcript, language, call_id, tier=tier)
+        except Exception as e:
+            self.summary_errors += 1
+            logger.error(f"Post-call summary error: {e}")
+            structured = {"summary": "Unable to generate summary", "key_points": [], "action_items": [], "tier": None}
+        finally:
+            timings["summary"] = time.perf_counter() - started
+
+        return {
+            "summary": structured["summary"],
+            "key_points": structured["key_points"],
+            "action_items": structured["action_items"],
+            "word_count": len(transcript.split()),
+            "language": language,
+            "tier": structured["tier"],
+        }
+
+    @staticmethod
+    def _is_customer(speaker: str) -> bool:
+        return bool(speaker) and speaker.lower() not in AGENT_SPEAKERS
+
+    @staticmethod
+    def _trajectory(turns: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Customer sentiment over the call: first third vs last third
+        """
+        if not turns:
+            return {"points": [], "start": 0.0, "end": 0.0, "trend": "stable"}
+
+        third = max(1, len(turns) // 3)
+        start = sum(turn["score"] for turn in turns[:third]) / third
+        end = sum(turn["score"] for turn in turns[-third:]) / third
+        if end - start >= 0.2:
+            trend = "improving"
+        elif end - start <= -0.2:
+            trend = "declining"
+        else:
+            trend = "stable"
+
+        return {
+            "points": [{"turn": turn["index"], "score": round(turn["score"], 4)} for turn in turns],
+            "start": round(start, 4),
+            "end": round(end, 4),
+            "trend": trend,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "turns": self.turns,
+            "summary_errors": self.summary_errors,
+            "avg_stage_ms": {
+                stage: round(seconds / self.calls * 1000, 2) if self.calls else None
+                for stage, seconds in self.stage_seconds.items()
+            },
+        }
@@ -0,0 +1,304 @@
+import os
+import re
+import json
+import hashlib
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from services.translation_cache import LRUTTLCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # numpy is not in requirements-minimal.txt
+    np = None
+
+_PUNCTUATION = re.compile(r"[^\w\s']", re.UNICODE)
+
+# Intents whose right answer depends on the conversation so far, not the utterance
+CONTEXT_DEPENDENT_INTENTS = (
+    "unknown,confirmation,denial,hold_on,booking,cancellation,complaint,transfer_request"
+)
+
+
+def normalize_utterance(text: str) -> str:
+    """
+    Lowercase, strip punctuation and collapse whitespace
+    """
+    return ' '.join(_PUNCTUATION.sub(' ', text.lower()).split())
+
+
+def hashing_embedding(text: str, dims: int = 512):
+    """
+    Local character-trigram hashing embedding (L2-normalized)
+
+    Cheap and network-free; good enough to match rephrasings such as
+    "what's my balance" / "what is my balance?".
+    """
+    vector = np.zeros(dims, dtype=np.float32)
+    padded = f"  {text} "
+    for i in range(len(padded) - 2):
+        bucket = int.from_bytes(hashlib.blake2b(padded[i:i + 3].encode('utf-8'), digest_size=4).digest(), 'little')
+        vector[bucket % dims] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class ResponseCache:
+    """
+    Opt-in per-agent cache of LLM responses to recurring questions
+
+    Exact lookups are keyed by agent, normalized utterance, intent, language
+    and the configured context fields. With a similarity threshold set, a
+    miss falls back to the nearest cached utterance for the same agent,
+    intent and context (cosine similarity over embeddings). Invalidating an
+    agent bumps its generation so old entries become unreachable and age out.
+
+    An LLM answer can quote the caller's own account, so the cache refuses
+    to enable without RESPONSE_CACHE_CONTEXT_FIELDS (e.g. the account or
+    caller id) and skips turns whose context lacks any of them. Intents in
+    RESPONSE_CACHE_EXCLUDE_INTENTS, whose answer depends on the conversation
+    ("yes", "cancel it"), are never cached.
+
+    Per-agent state (counters, vectors, invalidation generations) is kept
+    for at most RESPONSE_CACHE_MAX_AGENTS agents, least recently seen
+    dropped first. Generations come from one increasing sequence, and
+    agents without one use the highest generation ever dropped, so
+    forgetting an agent can only make old entries unreachable, never
+    bring back invalidated ones.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        agents: Optional[str] = None,
+        context_fields: Optional[Sequence[str]] = None,
+        exclude_intents: Optional[Sequence[str]] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        similarity_threshold: Optional[float] = None,
+        max_vectors_per_agent: int = 2000,
+        max_agents: Optional[int] = None,
+        embed_fn: Optional[Callable[[str], Any]] = None
+    ):
+        if enabled is None:
+            enabled = os.getenv('RESPONSE_CACHE_ENABLED', 'false').lower() == 'true'
+        if agents is None:
+            agents = os.getenv('RESPONSE_CACHE_AGENTS', '*')
+        if context_fields is None:
+            context_fields = [f for f in os.getenv('RESPONSE_CACHE_CONTEXT_FIELDS', '').split(',') if f.strip()]
+        if exclude_intents is None:
+            exclude_intents = os.getenv('RESPONSE_CACHE_EXCLUDE_INTENTS', CONTEXT_DEPENDENT_INTENTS).split(',')
+        if similarity_threshold is None:
+            similarity_threshold = float(os.getenv('RESPONSE_CACHE_SIMILARITY', 0))
+
+        if enabled and not context_fields:
+            logger.error(
+                "RESPONSE_CACHE_ENABLED=true but RESPONSE_CACHE_CONTEXT_FIELDS is empty; "
+                "responses would be shared across callers, so the response cache stays disabled"
+            )
+            enabled = False
+
+        self.enabled = enabled
+        agent_list = [a.strip() for a in agents.split(',') if a.strip()]
+        self.all_agents = '*' in agent_list
+        self.agents = set(agent_list)
+        self.context_fields = [f.strip() for f in context_fields]
+        self.exclude_intents = {i.strip() for i in exclude_intents if i.strip()}
+
+        self.entries = LRUTTLCache(
+            max_bytes=max_bytes or int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 8 * 1024 * 1024)),
+            ttl_seconds=ttl_seconds or float(os.getenv('RESPONSE_CACHE_TTL', 3600))
+        )
+
+        self.embed_fn = embed_fn or (hashing_embedding if np is not None else None)
+        self.similarity_threshold = similarity_threshold if self.embed_fn is not None else 0
+        self.max_vectors_per_agent = max_vectors_per_agent
+        # agent -> scope -> {utterance: (entry key, vector)}
+        self._vectors: Dict[str, Dict[str, Dict[str, Tuple[str, Any]]]] = defaultdict(dict)
+        # agent -> (scope, utterance) in least recently stored order, capped per agent
+        self._vector_order: Dict[str, "OrderedDict[Tuple[str, str], None]"] = defaultdict(OrderedDict)
+        self.max_agents = max_agents or int(os.getenv('RESPONSE_CACHE_MAX_AGENTS', 10000))
+        # agent -> generation, only for invalidated agents; others use _generation_floor
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._generation_floor = 0
+        self._generation_seq = 0
+
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.skipped = 0
+        self.per_agent: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def applies_to(self, agent_id: str) -> bool:
+        return self.enabled and (self.all_agents or agent_id in self.agents)
+
+    def _scope(self, agent_id: str, intent: str, language: str, context: Dict[str, Any]) -> Optional[str]:
+        """
+        Cache scope for a turn, or None when the turn must not be cached
+        """
+        fields = {f: context.get(f) for f in self.context_fields}
+        if intent in self.exclude_intents or any(v in (None, '') for v in fields.values()):
+            return None
+        generation = self._generations.get(agent_id, self._generation_floor)
+        return json.dumps([generation, intent, language, fields], sort_keys=True, default=str)
+
+    def _count(self, agent_id: str, outcome: str):
+        counts = self.per_agent.get(agent_id)
+        if counts is None:
+            counts = self.per_agent[agent_id] = {"hits": 0, "misses": 0}
+            while len(self.per_agent) > self.max_agents:
+                dropped, _ = self.per_agent.popitem(last=False)
+                self._vectors.pop(dropped, None)
+                self._vector_order.pop(dropped, None)
+        else:
+            self.per_agent.move_to_end(agent_id)
+        counts[outcome] += 1
+
+    def _key(self, agent_id: str, scope: str, utterance: str) -> str:
+        digest = hashlib.blake2b(f"{scope}\x00{utterance}".encode('utf-8'), digest_size=16).hexdigest()
+        return f"{agent_id}:{digest}"
+
+    def get(
+        self,
+        agent_id: str,
+        text: str,
+        intent: str,
+        language: str,
+        context: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        Look up a cached response (exact, then nearest neighbour if enabled)
+        """
+        if not self.applies_to(agent_id):
+            return None
+
+        scope = self._scope(agent_id, intent, language, context)
+        if scope is None:
+            self.skipped += 1
+            return None
+        utterance = normalize_utterance(text)
+
+        response = self.entries.get(self._key(agent_id, scope, utterance))
+        if response is not None:
+            self.exact_hits += 1
+            self._count(agent_id, "hits")
+            return response
+
+        if self.similarity_threshold > 0:
+            response = self._nearest(agent_id, scope, utterance)
+            if response is not None:
+                self.similar_hits += 1
+                self._count(agent_id, "hits")
+                return response
+
+        self.misses += 1
+        self._count(agent_id, "misses")
+        return None
+
+    def put(
+        self,
+        agent_id: str,
+        text: str,
+        intent: str,
+        language: str,
+        context: Dict[str, Any],
+        response: str
+    ):
+        if not self.applies_to(agent_id) or not response:
+            return
+
+        scope = self._scope(agent_id, intent, language, context)
+        if scope is None:
+            return
+        utterance = normalize_utterance(text)
+        key = self._key(agent_id, scope, utterance)
+        self.entries.set(key, response)
+
+        if self.similarity_threshold > 0:
+            self._vectors[agent_id].setdefault(scope, {})[utterance] = (key, self.embed_fn(utterance))
+            order = self._vector_order[agent_id]
+            order[(scope, utterance)] = None
+            order.move_to_end((scope, utterance))
+            # The cap covers all of an agent's scopes, not each one
+            while len(order) > self.max_vectors_per_agent:
+                old_scope, old_utterance = order.popitem(last=False)[0]
+                self._drop_vector(agent_id, old_scope, old_utterance)
+
+    def _drop_vector(self, agent_id: str, scope: str, utterance: str):
+        scopes = self._vectors.get(agent_id, {})
+        vectors = scopes.get(scope)
+        if vectors is None:
+            return
+        vectors.pop(utterance, None)
+        self._vector_order[agent_id].pop((scope, utterance), None)
+        if not vectors:
+            del scopes[scope]
+
+    def _nearest(self, agent_id: str, scope: str, utterance: str) -> Optional[str]:
+        """
+        Response of the closest cached utterance above the threshold
+        """
+        vectors = self._vectors.get(agent_id, {}).get(scope)
+        if not vectors:
+            return None
+
+        # Vectors whose entry was evicted or has expired can never hit again
+        for candidate, (key, _) in list(vectors.items()):
+            if key not in self.entries:
+                self._drop_vector(agent_id, scope, candidate)
+        if not vectors:
+            return None
+
+        candidates = list(vectors.keys())
+        matrix = np.stack([vectors[c][1] for c in candidates])
+        scores = matrix @ self.embed_fn(utterance)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        return self.entries.get(vectors[candidates[best]][0], record=False)
+
+    def vector_index(self) -> Dict[str, Dict[str, Dict[str, Tuple[str, Any]]]]:
+        """
+        Similarity vectors by agent and scope (for memory reporting)
+        """
+        return self._vectors
+
+    def invalidate(self, agent_id: str):
+        """
+        Drop every cached response for an agent (e.g. after its prompt changes)
+        """
+        self._generation_seq = max(self._generation_seq, self._generation_floor) + 1
+        self._generations.pop(agent_id, None)
+        self._generations[agent_id] = self._generation_seq
+        while len(self._generations) > self.max_agents:
+            _, dropped = self._generations.popitem(last=False)
+            self._generation_floor = max(self._generation_floor, dropped)
+        self._vectors.pop(agent_id, None)
+        self._vector_order.pop(agent_id, None)
+        self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "agents": "*" if self.all_agents else sorted(self.agents),
+            "context_fields": self.context_fields,
+            "exclude_intents": sorted(self.exclude_intents),
+            "similarity_threshold": self.similarity_threshold,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "skipped": self.skipped,
+            "vectors": sum(len(order) for order in self._vector_order.values()),
+            "entries": self.entries.get_stats(),
+            "per_agent": {
+                agent: dict(counts, hit_rate=round(counts["hits"] / max(counts["hits"] + counts["misses"], 1), 4))
+                for agent, counts in self.per_agent.items()
+            },
+        }
@@ -1,34 +1,29 @@
+import os
 import logging
-from typing import Dict, Any, List
-from transformers import pipeline
+from typing import Dict, Any, List, Optional
+from collections import Counter
 import asyncio
 
+from services.lexicon import get_lexicon, tally
+from services.model_registry import ModelRegistry
+
 logger = logging.getLogger(__name__)
 
 class SentimentAnalyzer:
     """
     Advanced sentiment analysis with emotion detection
     Supports multilingual sentiment analysis
+
+    The "sentiment" and "emotion" models come from the model registry and
+    can be swapped at runtime; an unloaded model falls back to neutral.
     """
     
-    def __init__(self):
-        # Initialize sentiment analysis pipeline
-        try:
-            self.sentiment_pipeline = pipeline(
-                "sentiment-analysis",
-                model="distilbert-base-uncased-finetuned-sst-2-english"
-            )
-            
-            # For emotion detection
-            self.emotion_pipeline = pipeline(
-                "text-classification",
-                model="j-hartmann/emotion-english-distilroberta-base",
-                top_k=None
-            )
-        except Exception as e:
-            logger.error(f"Failed to initialize sentiment analyzer: {e}")
-            self.sentiment_pipeline = None
-            self.emotion_pipeline = None
+    def __init__(self, models: Optional[ModelRegistry] = None):
+        self.batch_size = int(os.getenv('SENTIMENT_BATCH_SIZE', 16))
+        self.lexicon = get_lexicon()
+
+        self.models = models or ModelRegistry()
+        self.models.ensure_loaded(("sentiment", "emotion"))
     
     async def analyze(self, text: str, language: str = "en") -> Dict[str, Any]:
         """
@@ -65,17 +60,11 @@ class SentimentAnalyzer:
         """
         Perform basic sentiment analysis
         """
-        if not self.sentiment_pipeline:
-            return {"label": "NEUTRAL", "score": 0.5}
-        
         try:
             # Run in thread pool to avoid blocking
             loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
-                lambda: self.sentiment_pipeline(text[:512])[0]
-            )
-            return result
+            result = await loop.run_in_executor(None, self._infer_one, "sentiment", text)
+            return result if result is not None else {"label": "NEUTRAL", "score": 0.5}
         except Exception as e:
             logger.error(f"Sentiment pipeline error: {e}")
             return {"label": "NEUTRAL", "score": 0.5}
@@ -84,30 +73,77 @@ class SentimentAnalyzer:
         """
         Detect specific emotions in text
         """
-        if not self.emotion_pipeline:
-            return []
-        
         try:
             loop = asyncio.get_event_loop()
-            results = await loop.run_in_executor(
-                None,
-                lambda: self.emotion_pipeline(text[:512])[0]
-            )
+            results = await loop.run_in_executor(None, self._infer_one, "emotion", text)
             
-            # Sort by score and return top 3
-            sorted_emotions = sorted(results, key=lambda x: x['score'], reverse=True)[:3]
-            
-            return [
-                {
-                    "emotion": emotion['label'],
-                    "confidence": float(emotion['score'])
-                }
-                for emotion in sorted_emotions
-            ]
+            return self._top_emotions(results) if results is not None else []
         except Exception as e:
             logger.error(f"Emotion detection error: {e}")
             return []
     
+    def _infer_one(self, name: str, text: str) -> Optional[Any]:
+        with self.models.use(name) as model:
+            return model(text[:512])[0] if model is not None else None
+    
+    def _top_emotions(self, results: List[Dict[str, Any]], limit: int = 3) -> List[Dict[str, Any]]:
+        """
+        Sort emotion scores and return the top few
+        """
+        # Some pipeline versions nest per-input results one level deeper
+        if results and isinstance(results[0], list):
+            results = results[0]
+        sorted_emotions = sorted(results, key=lambda x: x['score'], reverse=True)[:limit]
+        
+        return [
+            {
+                "emotion": emotion['label'],
+                "confidence": float(emotion['score'])
+            }
+            for emotion in sorted_emotions
+        ]
+    
+    async def analyze_batch(self, texts: List[str], language: str = "en") -> List[Dict[str, Any]]:
+        """
+        Analyze many texts with one batched pass per pipeline
+
+        Identical texts ("yes", "okay") are inferred once. Results have the
+        same shape as analyze().
+        """
+        unique = list(dict.fromkeys(texts))
+        try:
+            loop = asyncio.get_event_loop()
+            sentiments, emotions = await loop.run_in_executor(None, self._infer_batch, unique)
+        except Exception as e:
+            logger.error(f"Batch sentiment analysis error: {e}")
+            sentiments = [{"label": "NEUTRAL", "score": 0.5}] * len(unique)
+            emotions = [[] for _ in unique]
+        
+        by_text = {}
+        for text, sentiment_result, emotion_scores in zip(unique, sentiments, emotions):
+            by_text[text] = {
+                "sentiment": sentiment_result['label'].lower(),
+                "score": self._calculate_score(sentiment_result['label'], sentiment_result['score']),
+                "confidence": sentiment_result['score'],
+                "emotions": self._top_emotions(emotion_scores) if emotion_scores else [],
+                "language": language
+            }
+        return [by_text[text] for text in texts]
+    
+    def _infer_batch(self, texts: List[str]):
+        inputs = [text[:512] for text in texts]
+        with self.models.use("sentiment", items=len(inputs)) as model:
+            if model is not None:
+                sentiments = model(inputs, batch_size=self.batch_size)
+            else:
+                sentiments = [{"label": "NEUTRAL", "score": 0.5}] * len(texts)
+        with self.models.use("emotion", items=len(inputs)) as model:
+            if model is not None:
+                emotions = model(inputs, batch_size=self.batch_size)
+            else:
+                emotions = [[] for _ in texts]
+        return sentiments, emotions
+    
     def _calculate_score(self, label: str, confidence: float) -> float:
         """
         Convert sentiment label to score (-1 to 1)
@@ -146,6 +182,50 @@ class SentimentAnalyzer:
                 "factors": []
             }
     
+    def csat_from_turns(
+        self,
+        transcript: str,
+        turn_sentiments: List[Dict[str, Any]],
+        keyword_counts: Optional[Dict[str, Counter]] = None
+    ) -> Dict[str, Any]:
+        """
+        Calculate CSAT from already-analyzed customer turns
+
+        Later turns weigh more, since how a call ends says more about
+        satisfaction than how it started. keyword_counts (lexicon tally of
+        the same turns) saves rescanning the transcript for factors.
+        """
+        if not turn_sentiments:
+            overall = {"sentiment": "neutral", "score": 0.0, "confidence": 0.0, "emotions": []}
+        else:
+            weights = range(1, len(turn_sentiments) + 1)
+            total = sum(weights)
+            score = sum(w * t['score'] for w, t in zip(weights, turn_sentiments)) / total
+            confidence = sum(w * t['confidence'] for w, t in zip(weights, turn_sentiments)) / total
+            
+            emotion_totals: Dict[str, float] = {}
+            for turn in turn_sentiments:
+                for emotion in turn['emotions']:
+                    emotion_totals[emotion['emotion']] = emotion_totals.get(emotion['emotion'], 0.0) + emotion['confidence']
+            emotions = sorted(emotion_totals.items(), key=lambda item: item[1], reverse=True)[:3]
+            
+            overall = {
+                "sentiment": "positive" if score >= 0.2 else "negative" if score <= -0.2 else "neutral",
+                "score": round(score, 4),
+                "confidence": round(confidence, 4),
+                "emotions": [
+                    {"emotion": emotion, "confidence": round(value / len(turn_sentiments), 4)}
+                    for emotion, value in emotions
+                ]
+            }
+        
+        return {
+            "score": self._sentiment_to_csat(overall['score']),
+            "confidence": overall['confidence'],
+            "factors": self._identify_csat_factors(transcript, overall, keyword_counts),
+            "overall_sentiment": overall
+        }
+    
     def _sentiment_to_csat(self, sentiment_score: float) -> int:
         """
         Convert sentiment score to CSAT (1-5)
@@ -161,25 +241,25 @@ class SentimentAnalyzer:
         else:
             return 1
     
-    def _identify_csat_factors(self, transcript: str, sentiment: Dict[str, Any]) -> List[str]:
+    def _identify_csat_factors(
+        self,
+        transcript: str,
+        sentiment: Dict[str, Any],
+        keyword_counts: Optional[Dict[str, Counter]] = None
+    ) -> List[str]:
         """
         Identify factors affecting CSAT
         """
         factors = []
         
-        # Check for positive indicators
-        positive_keywords = ['thank', 'great', 'excellent', 'helpful', 'appreciate', 'perfect']
-        negative_keywords = ['frustrated', 'angry', 'disappointed', 'terrible', 'awful', 'useless']
-        
-        transcript_lower = transcript.lower()
-        
-        for keyword in positive_keywords:
-            if keyword in transcript_lower:
-                factors.append(f"Positive: Customer expressed {keyword}")
+        # Satisfaction / dissatisfaction keywords, most frequent first
+        if keyword_counts is None:
+            keyword_counts = tally(self.lexicon.matches(transcript, sentiment.get('language', 'en')))
         
-        for keyword in negative_keywords:
-            if keyword in transcript_lower:
-                factors.append(f"Negative: Customer expressed {keyword}")
+        for category, label in (("satisfaction", "Positive"), ("dissatisfaction", "Negative")):
+            for term, count in keyword_counts.get(category, Counter()).most_common():
+                keyword = term.rstrip('*')
+                factors.append(f"{label}: Customer expressed {keyword}" + (f" ({count}x)" if count > 1 else ""))
         
         # Check emotions
         if sentiment.get('emotions'):
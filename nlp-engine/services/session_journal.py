@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# (key, wall-clock timestamp of last activity, session)
+SnapshotEntry = Tuple[str, float, Dict[str, Any]]
+
+# Session field that only grows at the end and is trimmed at the front
+HISTORY_FIELD = 'history'
+
+
+def _encode(record: list) -> str:
+    return json.dumps(record, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+class SessionJournal:
+    """
+    Append-only journal of conversation session writes
+
+    Each line is a compact JSON record. A call's first write (and its first
+    after a compaction) is the whole session, ["p", key, ts, session]; later
+    writes record only the turn's change, ["u", key, ts, changed fields,
+    removed fields, messages dropped from the front of the history, messages
+    appended], so the journal grows with the turns of a call rather than
+    with the square of them. ["d", key, ts] ends a call. Records are encoded
+    on the caller's thread (the session may change right after) but buffered
+    and written by a background flusher on a dedicated thread, so turns
+    never wait on disk. Once the journal exceeds compact_bytes, live
+    sessions are written to a snapshot (atomic rename) and the journal is
+    truncated.
+
+    One process owns a directory: it is locked on open, and a second
+    process (e.g. another uvicorn worker) gets a RuntimeError instead of
+    interleaving its writes and compactions into the same files.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        snapshot_source: Optional[Callable[[], Iterable[SnapshotEntry]]] = None,
+        flush_interval_ms: Optional[float] = None,
+        compact_bytes: Optional[int] = None,
+        fsync: Optional[bool] = None
+    ):
+        self.directory = directory
+        self.journal_path = os.path.join(directory, 'sessions.journal')
+        self.snapshot_path = os.path.join(directory, 'sessions.snapshot')
+        self.snapshot_source = snapshot_source
+
+        if flush_interval_ms is None:
+            flush_interval_ms = float(os.getenv('SESSION_JOURNAL_FLUSH_MS', 50))
+        if compact_bytes is None:
+            compact_bytes = int(os.getenv('SESSION_JOURNAL_COMPACT_BYTES', 32 * 1024 * 1024))
+        if fsync is None:
+            fsync = os.getenv('SESSION_JOURNAL_FSYNC', 'false').lower() == 'true'
+        self.flush_interval = flush_interval_ms / 1000
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._acquire_lock(os.path.join(directory, 'sessions.lock'))
+        self.journal_bytes = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+
+        self._buffer: List[str] = []
+        self._file = None
+        self._flusher: Optional[asyncio.Task] = None
+        # One writer thread keeps appends, snapshots and truncation ordered
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='session-journal')
+        # key -> (history length, last history message, field digests) as last journaled
+        self._journaled: Dict[str, Tuple[int, Any, Dict[str, bytes]]] = {}
+
+        self.records = 0
+        self.full_records = 0
+        self.append_seconds = 0.0
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.write_errors = 0
+        self.compactions = 0
+        self.last_compaction_ms = None
+        self.replay_report: Dict[str, Any] = {}
+
+    @staticmethod
+    def _acquire_lock(path: str):
+        if fcntl is None:
+            return None
+        lock_file = open(path, 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Session journal {os.path.dirname(path)} is in use by another process; "
+                "give each worker its own SESSION_JOURNAL_DIR"
+            )
+        return lock_file
+
+    def append_put(self, key: str, session: Dict[str, Any]):
+        ts = round(time.time(), 3)
+        history = session.get(HISTORY_FIELD)
+        if not isinstance(history, list):
+            history = []
+        digests = {
+            field: hashlib.blake2b(_encode([value]).encode('utf-8'), digest_size=8).digest()
+            for field, value in session.items() if field != HISTORY_FIELD
+        }
+
+        previous = self._journaled.get(key)
+        record = None
+        if previous is not None:
+            record = self._delta(key, ts, session, history, digests, previous)
+        if record is None:
+            record = ["p", key, ts, session]
+            self.full_records += 1
+        self._journaled[key] = (len(history), history[-1] if history else None, digests)
+        self._append(record)
+
+    @staticmethod
+    def _delta(key, ts, session, history, digests, previous) -> Optional[list]:
+        """
+        ["u", ...] record from the last journaled state, or None if the
+        history cannot be lined up with it (then the full session is written)
+        """
+        previous_len, previous_last, previous_digests = previous
+        # Messages are appended, never edited, so the last one journaled
+        # marks where this turn's messages start
+        if previous_last is None:
+            kept = 0
+        else:
+            kept = next((i + 1 for i in range(len(history) - 1, -1, -1) if history[i] is previous_last), None)
+            if kept is None:
+                return None
+        dropped = previous_len - kept
+        if dropped < 0:
+            return None
+
+        changed = {field: session[field] for field, digest in digests.items() if previous_digests.get(field) != digest}
+        removed = [field for field in previous_digests if field not in digests]
+        return ["u", key, ts, changed, removed, dropped, history[kept:]]
+
+    def append_delete(self, key: str):
+        self._journaled.pop(key, None)
+        self._append(["d", key, round(time.time(), 3)])
+
+    def _append(self, record: list):
+        started = time.perf_counter()
+        self._buffer.append(_encode(record))
+        self.records += 1
+        self.append_seconds += time.perf_counter() - started
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            try:
+                self._flusher = asyncio.get_running_loop().create_task(self._run())
+            except RuntimeError:
+                pass  # no loop yet; flushed on aclose or the next append
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if self.journal_bytes > self.compact_bytes and self.snapshot_source is not None:
+                    await self.compact()
+            except Exception as e:
+                self.write_errors += 1
+                logger.error(f"Session journal write failed: {e}")
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        started = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._write, lines)
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.flush_seconds += elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    def _write(self, lines: List[str]):
+        data = '\n'.join(lines) + '\n'
+        if self._file is None:
+            self._file = open(self.journal_path, 'a', encoding='utf-8')
+            # Keep a line torn by a crash from swallowing the next record
+            if self._file.tell() > 0 and not self._ends_with_newline():
+                data = '\n' + data
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.journal_bytes += len(data.encode('utf-8'))
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.journal_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    async def compact(self):
+        """
+        Snapshot live sessions and truncate the journal
+        """
+        started = time.perf_counter()
+        # Encode on the loop so no session is mutated mid-encode; writes
+        # arriving meanwhile stay buffered and land in the fresh journal
+        await self.flush()
+        lines = [_encode([key, ts, session]) for key, ts, session in self.snapshot_source()]
+        # The snapshot may include changes not journaled yet (a turn still
+        # awaiting its reply); the next write of each call is a full one
+        self._journaled.clear()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._rewrite, lines)
+        self.compactions += 1
+        self.last_compaction_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Compacted session journal: {len(lines)} live sessions in {self.last_compaction_ms} ms")
+
+    def _rewrite(self, lines: List[str]):
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if lines:
+                f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.journal_path, 'w', encoding='utf-8')
+        self.journal_bytes = 0
+
+    def replay(self) -> Dict[str, Tuple[float, Dict[str, Any]]]:
+        """
+        Rebuild the latest state per key from the snapshot plus the journal
+
+        A torn final line (crash mid-write) is skipped.
+        """
+        started = time.perf_counter()
+        sessions: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        records, torn, orphaned = 0, 0, 0
+
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        key, ts, session = json.loads(line)
+                    except ValueError:
+                        torn += 1
+                        continue
+                    sessions[key] = (ts, session)
+                    records += 1
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        torn += 1
+                        continue
+                    records += 1
+                    if record[0] == "p":
+                        sessions[record[1]] = (record[2], record[3])
+                    elif record[0] == "u":
+                        current = sessions.get(record[1])
+                        if current is None:
+                            # Its base was lost (torn line); the call restarts empty
+                            orphaned += 1
+                            continue
+                        _, key, ts, changed, removed, dropped, appended = record
+                        session = current[1]
+                        session.update(changed)
+                        for field in removed:
+                            session.pop(field, None)
+                        history = session.setdefault(HISTORY_FIELD, [])
+                        del history[:dropped]
+                        history.extend(appended)
+                        sessions[key] = (ts, session)
+                    elif record[0] == "d":
+                        sessions.pop(record[1], None)
+
+        self.replay_report = {
+            "records": records,
+            "torn_records": torn,
+            "orphaned_records": orphaned,
+            "sessions": len(sessions),
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return sessions
+
+    async def aclose(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Session journal final flush failed: {e}")
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_file)
+        self._executor.shutdown(wait=True)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.journal_path,
+            "records": self.records,
+            "full_records": self.full_records,
+            "pending": len(self._buffer),
+            "journal_bytes": self.journal_bytes,
+            "compact_bytes": self.compact_bytes,
+            "fsync": self.fsync,
+            "avg_append_us": round(self.append_seconds / self.records * 1e6, 1) if self.records else None,
+            "flushes": self.flushes,
+            "avg_flush_ms": round(self.flush_seconds / self.flushes * 1000, 2) if self.flushes else None,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 2),
+            "write_errors": self.write_errors,
+            "compactions": self.compactions,
+            "last_compaction_ms": self.last_compaction_ms,
+            "replay": self.replay_report,
+        }
@@ -0,0 +1,387 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from services.session_journal import SessionJournal, SnapshotEntry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional (see requirements-minimal.txt)
+    aioredis = None
+
+
+def session_size(session: Dict[str, Any]) -> int:
+    """
+    Approximate bytes held by a session (its compact JSON encoding)
+    """
+    return len(json.dumps(session, separators=(',', ':'), default=str).encode('utf-8'))
+
+
+class SessionStore:
+    """
+    Storage for per-call conversation state keyed by "agent_id:call_id"
+    """
+
+    name = "base"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def put(self, key: str, session: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def get_stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def load(self) -> int:
+        """
+        Warm-load persisted sessions after a restart (returns the count)
+        """
+        return 0
+
+    async def aclose(self):
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    In-process session store with idle TTL and LRU eviction under a byte cap
+
+    on_evict, when set, is called with the key of each session evicted to
+    stay under the cap.
+    """
+
+    name = "memory"
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        idle_ttl: float = 1800,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Optional[Callable[[str], None]] = None
+    ):
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        self.on_evict = on_evict
+        self.current_bytes = 0
+
+        # key -> [session, last_access, size]
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()
+        self._last_purge = clock()
+
+        self.created = 0
+        self.ended = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sessions
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._sessions.get(key)
+        if entry is None:
+            return None
+
+        now = self.clock()
+        if now - entry[1] > self.idle_ttl:
+            self._remove(key)
+            self.expirations += 1
+            return None
+
+        entry[1] = now
+        self._sessions.move_to_end(key)
+        return entry[0]
+
+    async def put(self, key: str, session: Dict[str, Any]):
+        size = session_size(session)
+        now = self.clock()
+
+        entry = self._sessions.get(key)
+        if entry is None:
+            self._sessions[key] = [session, now, size]
+            self.created += 1
+        else:
+            self.current_bytes -= entry[2]
+            entry[0], entry[1], entry[2] = session, now, size
+            self._sessions.move_to_end(key)
+        self.current_bytes += size
+
+        if now - self._last_purge > min(self.idle_ttl, 60):
+            self.purge_expired()
+
+        self._evict_over_cap(key)
+
+    def restore(self, key: str, session: Dict[str, Any], idle_seconds: float):
+        """
+        Insert a recovered session as most recent, already idle for idle_seconds
+        """
+        size = session_size(session)
+        if key in self._sessions:
+            self._remove(key)
+        self._sessions[key] = [session, self.clock() - idle_seconds, size]
+        self.current_bytes += size
+        self._evict_over_cap(key)
+
+    def entries(self) -> Iterator[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Yield (key, idle seconds, session) for every live session
+        """
+        now = self.clock()
+        for key, (session, last_access, _) in self._sessions.items():
+            if now - last_access <= self.idle_ttl:
+                yield key, now - last_access, session
+
+    def _evict_over_cap(self, keep: str):
+        # Evict least recently active calls, never the one just written
+        while self.current_bytes > self.max_bytes and len(self._sessions) > 1:
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                break
+            self._remove(oldest)
+            self.evictions += 1
+            logger.warning(f"Evicted conversation session {oldest} (session store over memory cap)")
+            if self.on_evict is not None:
+                self.on_evict(oldest)
+
+    async def delete(self, key: str) -> bool:
+        if key not in self._sessions:
+            return False
+        self._remove(key)
+        self.ended += 1
+        return True
+
+    def purge_expired(self) -> int:
+        now = self.clock()
+        self._last_purge = now
+        expired = [k for k, entry in self._sessions.items() if now - entry[1] > self.idle_ttl]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def _remove(self, key: str):
+        entry = self._sessions.pop(key)
+        self.current_bytes -= entry[2]
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "live_sessions": len(self._sessions),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "idle_ttl": self.idle_ttl,
+            "created": self.created,
+            "ended": self.ended,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class JournaledSessionStore(SessionStore):
+    """
+    In-memory session store backed by an on-disk journal
+
+    Reads are served from memory; every write and end-of-call is journaled
+    off the hot path, and load() rebuilds live sessions after a deploy,
+    crash or dev-server reload.
+    """
+
+    name = "memory+journal"
+
+    def __init__(self, inner: InMemorySessionStore, directory: str, **journal_kwargs):
+        self.inner = inner
+        self.journal = SessionJournal(directory, snapshot_source=self._snapshot, **journal_kwargs)
+        # Journal evictions too, or load() would bring evicted calls back
+        self.inner.on_evict = self.journal.append_delete
+        self.warm_loaded = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self.inner.get(key)
+
+    async def put(self, key: str, session: Dict[str, Any]):
+        await self.inner.put(key, session)
+        self.journal.append_put(key, session)
+
+    async def delete(self, key: str) -> bool:
+        deleted = await self.inner.delete(key)
+        if deleted:
+            self.journal.append_delete(key)
+        return deleted
+
+    def _snapshot(self) -> Iterator[SnapshotEntry]:
+        wall_now = time.time()
+        for key, idle, session in self.inner.entries():
+            yield key, round(wall_now - idle, 3), session
+
+    async def load(self) -> int:
+        started = time.perf_counter()
+        recovered = await asyncio.get_running_loop().run_in_executor(None, self.journal.replay)
+
+        wall_now = time.time()
+        loaded = 0
+        # Oldest first so LRU order survives the restart
+        for key, (ts, session) in sorted(recovered.items(), key=lambda item: item[1][0]):
+            idle = max(0.0, wall_now - ts)
+            if idle <= self.inner.idle_ttl:
+                self.inner.restore(key, session, idle)
+                loaded += 1
+
+        self.warm_loaded = loaded
+        logger.info(
+            f"Warm-loaded {loaded} conversation sessions from journal in "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return loaded
+
+    async def get_stats(self) -> Dict[str, Any]:
+        stats = await self.inner.get_stats()
+        stats["backend"] = self.name
+        stats["warm_loaded"] = self.warm_loaded
+        stats["journal"] = self.journal.get_stats()
+        return stats
+
+    async def aclose(self):
+        await self.journal.aclose()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Redis-backed session store shared by all workers
+
+    Sessions are stored as compact JSON with an idle TTL that is refreshed
+    on every read and write; the memory cap and LRU eviction are delegated
+    to the Redis server (maxmemory with an LRU policy).
+
+    Stats are this worker's own counters, so /stats costs one INFO call
+    rather than a keyspace scan; evicted_keys from INFO covers every key on
+    the server, not just sessions, and is reported as such.
+    """
+
+    name = "redis"
+
+    def __init__(self, client: Any, idle_ttl: float = 1800, prefix: str = "nlp:session:"):
+        self.client = client
+        self.idle_ttl = idle_ttl
+        self.prefix = prefix
+
+        self.created = 0
+        self.ended = 0
+        self.reads = 0
+        self.misses = 0
+        self.writes = 0
+        self.bytes_written = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisSessionStore":
+        if aioredis is None:
+            raise RuntimeError("redis package not installed")
+        return cls(aioredis.from_url(url, decode_responses=True), **kwargs)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            data = await self.client.getex(self.prefix + key, ex=int(self.idle_ttl))
+        except Exception as e:
+            logger.warning(f"Session store get error (non-fatal): {e}")
+            self.errors += 1
+            return None
+        self.reads += 1
+        if not data:
+            # Expired, evicted, or never written
+            self.misses += 1
+            return None
+        return json.loads(data)
+
+    async def put(self, key: str, session: Dict[str, Any]):
+        try:
+            data = json.dumps(session, separators=(',', ':'), default=str)
+            await self.client.set(self.prefix + key, data, ex=int(self.idle_ttl))
+            self.writes += 1
+            self.bytes_written += len(data)
+            if session.get('turn_count') == 1:
+                self.created += 1
+        except Exception as e:
+            logger.warning(f"Session store put error (non-fatal): {e}")
+            self.errors += 1
+
+    async def delete(self, key: str) -> bool:
+        try:
+            deleted = await self.client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Session store delete error (non-fatal): {e}")
+            self.errors += 1
+            return False
+        if deleted:
+            self.ended += 1
+        return bool(deleted)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        try:
+            info = await self.client.info('stats')
+            server_evicted = info.get('evicted_keys')
+        except Exception as e:
+            logger.warning(f"Session store stats error (non-fatal): {e}")
+            server_evicted = None
+
+        return {
+            "backend": self.name,
+            "idle_ttl": self.idle_ttl,
+            "created": self.created,
+            "ended": self.ended,
+            "reads": self.reads,
+            "misses": self.misses,
+            "writes": self.writes,
+            "avg_session_bytes": round(self.bytes_written / self.writes) if self.writes else None,
+            "errors": self.errors,
+            # All keys evicted by the Redis server, sessions or not
+            "server_evicted_keys": server_evicted,
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def create_session_store(name: Optional[str] = None) -> SessionStore:
+    """
+    Build the store selected by SESSION_STORE (memory | redis)
+
+    The in-memory store is journaled to disk when SESSION_JOURNAL_DIR is set.
+    """
+    name = (name or os.getenv('SESSION_STORE', 'memory')).lower()
+    idle_ttl = float(os.getenv('SESSION_IDLE_TTL', 1800))
+
+    if name == 'redis':
+        url = os.getenv('SESSION_REDIS_URL') or os.getenv('REDIS_URL')
+        if url:
+            try:
+                return RedisSessionStore.from_url(url, idle_ttl=idle_ttl)
+            except Exception as e:
+                logger.error(f"Redis session store unavailable, using in-memory store: {e}")
+        else:
+            logger.error("SESSION_STORE=redis but no SESSION_REDIS_URL/REDIS_URL set; using in-memory store")
+
+    store = InMemorySessionStore(
+        max_bytes=int(os.getenv('SESSION_MAX_BYTES', 64 * 1024 * 1024)),
+        idle_ttl=idle_ttl
+    )
+    journal_dir = os.getenv('SESSION_JOURNAL_DIR')
+    if journal_dir:
+        try:
+            return JournaledSessionStore(store, journal_dir)
+        except RuntimeError as e:
+            # Another worker owns the directory; journaling it twice would corrupt it
+            logger.error(f"Session journal disabled in this process: {e}")
+    return store
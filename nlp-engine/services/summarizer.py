@@ -1,87 +1,507 @@
+import asyncio
 import logging
-from typing import Dict, Any, List
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 import os
 from openai import AsyncOpenAI
+from pydantic import BaseModel, Field, ValidationError
+
+from services.extractive_summarizer import ExtractiveSummarizer
+from services.lexicon import get_lexicon
+from services.llm_usage import LLMUsageTracker, usage_from_openai
+from services.local_llm import LocalStubLLM
 
 logger = logging.getLogger(__name__)
 
+# Placeholder returned when the summary request itself failed
+SUMMARY_UNAVAILABLE = "Summary unavailable"
+
+# JSON schema for the combined call (OpenAI structured outputs, strict mode)
+SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "key_points": {"type": "array", "items": {"type": "string"}},
+        "action_items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "responsible": {"type": "string"},
+                    "action": {"type": "string"},
+                },
+                "required": ["responsible", "action"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["summary", "key_points", "action_items"],
+    "additionalProperties": False,
+}
+
+
+class ActionItem(BaseModel):
+    responsible: str
+    action: str
+
+
+class StructuredSummary(BaseModel):
+    summary: str = Field(min_length=1)
+    key_points: List[str]
+    action_items: List[ActionItem]
+
+
+def chunk_transcript(transcript: str, max_chars: int) -> List[str]:
+    """
+    Split a transcript into chunks of at most max_chars, on line boundaries
+
+    Lines longer than max_chars are hard-split.
+    """
+    chunks, current, size = [], [], 0
+    for line in transcript.splitlines():
+        while len(line) > max_chars:
+            if current:
+                chunks.append('\n'.join(current))
+                current, size = [], 0
+            chunks.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current and any(l.strip() for l in current):
+        chunks.append('\n'.join(current))
+    return chunks or [transcript]
+
+
+def render_partial(index: int, partial: Dict[str, Any]) -> str:
+    """
+    Plain-text rendering of one chunk's summary, used as reduce input
+    """
+    lines = [f"Part {index}:", f"Summary: {partial['summary']}"]
+    if partial['key_points']:
+        lines.append("Key points: " + "; ".join(partial['key_points']))
+    if partial['action_items']:
+        lines.append("Action items: " + "; ".join(f"{a['responsible']}: {a['action']}" for a in partial['action_items']))
+    return '\n'.join(lines)
+
+
+class RollingSummary:
+    """
+    Incremental summary state for one live call
+
+    Turns are buffered until a chunk is full; each full chunk is summarized
+    in the background, so only the tail and the final merge remain when the
+    call ends.
+    """
+
+    def __init__(self, language: str):
+        self.language = language
+        self.pending: List[str] = []
+        self.pending_chars = 0
+        self.chunk_tasks: List[asyncio.Task] = []
+        self.final_task: Optional[asyncio.Task] = None
+
+
 class SummarizationService:
     """
     Conversation summarization service
+
+    SUMMARY_MODE=combined (default) asks for summary, key points and action
+    items as one schema-validated JSON response; SUMMARY_MODE=separate makes
+    the three original requests concurrently. A combined response that fails
+    validation falls back to the separate requests.
+
+    Transcripts longer than SUMMARY_CHUNK_CHARS are summarized map-reduce
+    style: chunks concurrently (at most SUMMARY_MAP_CONCURRENCY at a time),
+    then the chunk summaries are merged. With SUMMARY_INCREMENTAL=true,
+    live calls keep a rolling summary that is finished when the call ends.
+
+    The extractive tier (SUMMARY_TIER or per request) summarizes locally
+    with no network calls; it is also used automatically when no LLM is
+    configured, or when the LLM path fails or exceeds SUMMARY_LLM_TIMEOUT.
     """
-    
+
     def __init__(self):
-        self.openai_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-    
-    async def summarize(self, transcript: str, language: str = "en") -> Dict[str, Any]:
+        # Without a key the client is not created and the extractive tier is used
+        api_key = os.getenv('OPENAI_API_KEY')
+        self.openai_client = AsyncOpenAI(api_key=api_key) if api_key else None
+        self.model = os.getenv('SUMMARY_MODEL', 'gpt-4o-mini')
+        self.mode = os.getenv('SUMMARY_MODE', 'combined').lower()
+        self.local_llm = LocalStubLLM() if os.getenv('LLM_BACKEND', '').lower() == 'stub' else None
+        self.llm_configured = self.local_llm is not None or self.openai_client is not None
+
+        self.tier = os.getenv('SUMMARY_TIER', 'llm').lower()
+        self.extractive = ExtractiveSummarizer(max_sentences=int(os.getenv('SUMMARY_EXTRACTIVE_MAX_SENTENCES', 600)))
+        self.lexicon = get_lexicon()
+        self.extractive_fallback = os.getenv('SUMMARY_EXTRACTIVE_FALLBACK', 'true').lower() == 'true'
+        self.llm_timeout = float(os.getenv('SUMMARY_LLM_TIMEOUT', 30))
+
+        self.chunk_chars = int(os.getenv('SUMMARY_CHUNK_CHARS', 2000))
+        self.llm_semaphore = asyncio.Semaphore(int(os.getenv('SUMMARY_MAP_CONCURRENCY', 4)))
+
+        # Per-call rolling summaries (bounded; oldest calls dropped first)
+        self.incremental = os.getenv('SUMMARY_INCREMENTAL', 'false').lower() == 'true'
+        self.max_rolling_calls = int(os.getenv('SUMMARY_ROLLING_MAX_CALLS', 5000))
+        # How long an ended call's rolling summary waits to be collected
+        self.rolling_grace = float(os.getenv('SUMMARY_ROLLING_GRACE', 600))
+        self.rolling: "OrderedDict[str, RollingSummary]" = OrderedDict()
+
+        # Latency and token use per mode ("combined" / "separate" / "extractive")
+        self.usage = LLMUsageTracker()
+        self.validation_failures = 0
+        self.fallbacks = 0
+        self.map_reduce_runs = 0
+        self.chunks_summarized = 0
+        self.reduce_rounds = 0
+        self.incremental_summaries = 0
+        self.rolling_evictions = 0
+        self.rolling_expired = 0
+        self.extractive_summaries = 0
+        self.extractive_fallbacks = 0
+
+    async def summarize(
+        self,
+        transcript: str,
+        language: str = "en",
+        call_id: Optional[str] = None,
+        raise_errors: bool = False,
+        tier: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Summarize conversation transcript
+
+        With a call_id that has a rolling summary, the incrementally built
+        summary is used instead of re-reading the transcript. With
+        raise_errors, failures raise instead of returning a placeholder
+        (used by the job queue to retry).
         """
         try:
-            summary = await self._generate_summary(transcript, language)
-            key_points = await self._extract_key_points(transcript, language)
-            action_items = await self._extract_action_items(transcript, language)
-            overall_sentiment = self._determine_sentiment(transcript)
-            
+            structured = await self.summarize_structured(transcript, language, call_id, raise_errors, tier)
+            overall_sentiment = self._determine_sentiment(transcript, language)
+
             return {
-                "summary": summary,
-                "key_points": key_points,
-                "action_items": action_items,
+                "summary": structured["summary"],
+                "key_points": structured["key_points"],
+                "action_items": structured["action_items"],
                 "overall_sentiment": overall_sentiment,
                 "word_count": len(transcript.split()),
-                "language": language
+                "language": language,
+                "tier": structured["tier"]
             }
         except Exception as e:
             logger.error(f"Summarization error: {e}")
+            if raise_errors:
+                raise
             return {
                 "summary": "Unable to generate summary",
                 "key_points": [],
                 "action_items": [],
                 "overall_sentiment": "neutral",
                 "word_count": 0,
-                "language": language
+                "language": language,
+                "tier": (tier or self.tier).lower()
             }
-    
-    async def _generate_summary(self, transcript: str, language: str) -> str:
+
+    async def summarize_structured(
+        self,
+        transcript: str,
+        language: str = "en",
+        call_id: Optional[str] = None,
+        raise_errors: bool = False,
+        tier: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Summary, key points, action items and the tier that produced them
+
+        Callers that already know the call's sentiment (post-call analysis)
+        use this directly instead of summarize().
+        """
+        tier = (tier or self.tier).lower()
+        if tier != 'extractive' and not self.llm_configured and self.extractive.available:
+            tier = 'extractive'
+        elif tier == 'extractive' and not self.extractive.available:
+            # numpy is not in requirements-minimal.txt
+            if not self.llm_configured:
+                raise RuntimeError("Extractive summary tier needs numpy and no LLM is configured")
+            logger.warning("Extractive summary tier needs numpy; using the LLM tier")
+            tier = 'llm'
+
+        structured = None
+        if tier == 'extractive':
+            self._discard_rolling(call_id)
+        else:
+            try:
+                structured = await asyncio.wait_for(self._summarize_llm(transcript, language, call_id), self.llm_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"LLM summary exceeded {self.llm_timeout}s")
+                structured = None
+
+            if structured is None or structured["summary"] == SUMMARY_UNAVAILABLE:
+                if self.extractive_fallback and self.extractive.available:
+                    self.extractive_fallbacks += 1
+                    tier = 'extractive'
+                elif raise_errors:
+                    raise RuntimeError("Summary request failed")
+                elif structured is None:
+                    structured = {"summary": SUMMARY_UNAVAILABLE, "key_points": [], "action_items": []}
+
+        if tier == 'extractive':
+            structured = await self._summarize_extractive(transcript)
+        return {**structured, "tier": tier}
+
+    async def _summarize_llm(self, transcript: str, language: str, call_id: Optional[str]) -> Dict[str, Any]:
+        state = self.rolling.pop(call_id, None) if call_id else None
+        if state is not None:
+            self.incremental_summaries += 1
+            return await self._finish_rolling(state)
+
+        chunks = chunk_transcript(transcript, self.chunk_chars)
+        if len(chunks) == 1:
+            return await self._summarize_text(chunks[0], language)
+        return await self._map_reduce(chunks, language)
+
+    async def _summarize_extractive(self, transcript: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        # TextRank is CPU-bound; keep it off the event loop
+        loop = asyncio.get_running_loop()
+        structured = await loop.run_in_executor(None, self.extractive.summarize, transcript)
+        self.usage.record('extractive', time.perf_counter() - started)
+        self.extractive_summaries += 1
+        return structured
+
+    def _discard_rolling(self, call_id: Optional[str]) -> bool:
+        state = self.rolling.pop(call_id, None) if call_id else None
+        if state is None:
+            return False
+        self._cancel_rolling(state)
+        return True
+
+    @staticmethod
+    def _cancel_rolling(state: RollingSummary):
+        for task in state.chunk_tasks + ([state.final_task] if state.final_task else []):
+            task.cancel()
+
+    async def _summarize_text(self, text: str, language: str, merge: bool = False) -> Dict[str, Any]:
+        """
+        Summarize one chunk (or one batch of chunk summaries when merging)
+        """
+        async with self.llm_semaphore:
+            structured = None
+            if self.mode == 'combined':
+                structured = await self._summarize_combined(text, language, merge)
+                if structured is None:
+                    self.fallbacks += 1
+            if structured is None:
+                if merge:
+                    text = f"Summaries of consecutive parts of one call:\n\n{text}"
+                structured = await self._summarize_separate(text, language)
+            return structured
+
+    async def _map_reduce(self, chunks: List[str], language: str) -> Dict[str, Any]:
+        """
+        Summarize chunks concurrently, then merge their summaries
+        """
+        self.map_reduce_runs += 1
+        partials = await asyncio.gather(*(self._summarize_text(chunk, language) for chunk in chunks))
+        self.chunks_summarized += len(chunks)
+        return await self._reduce(list(partials), language)
+
+    async def _reduce(self, partials: List[Dict[str, Any]], language: str) -> Dict[str, Any]:
+        """
+        Merge chunk summaries, in rounds if they do not fit one request
+        """
+        while len(partials) > 1:
+            self.reduce_rounds += 1
+            groups, current, size = [], [], 0
+            for index, partial in enumerate(partials, 1):
+                rendered = render_partial(index, partial)
+                # Every group merges at least two summaries so rounds always shrink
+                if len(current) >= 2 and size + len(rendered) > self.chunk_chars:
+                    groups.append(current)
+                    current, size = [], 0
+                current.append(rendered)
+                size += len(rendered) + 2
+            groups.append(current)
+
+            partials = list(await asyncio.gather(*(
+                self._summarize_text('\n\n'.join(group), language, merge=True) for group in groups
+            )))
+        return partials[0]
+
+    def observe_turn(self, call_id: str, language: str, caller_text: str, agent_text: str = ""):
+        """
+        Add a turn to the call's rolling summary (SUMMARY_INCREMENTAL=true)
+        """
+        if not self.incremental:
+            return
+
+        state = self.rolling.get(call_id)
+        if state is None:
+            state = self.rolling[call_id] = RollingSummary(language)
+            while len(self.rolling) > self.max_rolling_calls:
+                _, dropped = self.rolling.popitem(last=False)
+                self._cancel_rolling(dropped)
+                self.rolling_evictions += 1
+        self.rolling.move_to_end(call_id)
+
+        for line in (f"Caller: {caller_text}", f"Agent: {agent_text}" if agent_text else ""):
+            if not line:
+                continue
+            if state.pending and state.pending_chars + len(line) + 1 > self.chunk_chars:
+                self._flush_rolling(state)
+            state.pending.append(line)
+            state.pending_chars += len(line) + 1
+
+    def _flush_rolling(self, state: RollingSummary):
+        chunk = '\n'.join(state.pending)
+        state.pending, state.pending_chars = [], 0
+        state.chunk_tasks.append(asyncio.create_task(self._summarize_text(chunk, state.language)))
+        self.chunks_summarized += 1
+
+    def finish_call(self, call_id: str):
+        """
+        Start the final merge as soon as the call ends
+
+        The result is kept for SUMMARY_ROLLING_GRACE seconds for a summary
+        request to pick up, then dropped whether or not one came.
+        """
+        state = self.rolling.get(call_id)
+        if state is None:
+            return
+        if state.final_task is None:
+            state.final_task = asyncio.create_task(self._complete_rolling(state))
+        asyncio.get_running_loop().call_later(self.rolling_grace, self._expire_rolling, call_id, state)
+
+    def _expire_rolling(self, call_id: str, state: RollingSummary):
+        # Only the state this timer was set for; the call may have been summarized already
+        if self.rolling.get(call_id) is state and self._discard_rolling(call_id):
+            self.rolling_expired += 1
+
+    async def _complete_rolling(self, state: RollingSummary) -> Dict[str, Any]:
+        if state.pending:
+            self._flush_rolling(state)
+        partials = list(await asyncio.gather(*state.chunk_tasks))
+        if not partials:
+            return {"summary": "", "key_points": [], "action_items": []}
+        return await self._reduce(partials, state.language)
+
+    async def _finish_rolling(self, state: RollingSummary) -> Dict[str, Any]:
+        if state.final_task is None:
+            state.final_task = asyncio.create_task(self._complete_rolling(state))
+        return await state.final_task
+
+    async def _summarize_combined(self, transcript: str, language: str, merge: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        One structured request; None if it fails or does not match the schema
+        """
+        intro = (
+            "The input is summaries of consecutive parts of one phone call, in order. "
+            "Merge them into one summary of the whole call, keeping every commitment and action item. "
+            if merge else ""
+        )
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    intro +
+                    "You summarize phone calls. Reply with JSON only, with keys: "
+                    f"\"summary\" (2-3 sentences in {language}), "
+                    "\"key_points\" (3-5 short strings) and "
+                    "\"action_items\" (list of {\"responsible\": person, \"action\": action}; empty if none)."
+                ),
+            },
+            {"role": "user", "content": transcript},
+        ]
+        started = time.perf_counter()
+        try:
+            if self.local_llm is not None:
+                content = await self.local_llm.complete(messages, json_mode=True)
+                usage = {}
+            else:
+                response = await self.openai_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=500,
+                    response_format={
+                        "type": "json_schema",
+                        "json_schema": {"name": "call_summary", "strict": True, "schema": SUMMARY_SCHEMA},
+                    }
+                )
+                content = response.choices[0].message.content
+                usage = usage_from_openai(response)
+        except Exception as e:
+            logger.error(f"Combined summary error: {e}")
+            self.usage.record_error('combined')
+            return None
+        self.usage.record('combined', time.perf_counter() - started, usage)
+
+        try:
+            parsed = StructuredSummary.model_validate_json(content)
+        except ValidationError as e:
+            logger.warning(f"Combined summary failed schema validation: {e.error_count()} errors")
+            self.validation_failures += 1
+            return None
+
+        return {
+            "summary": parsed.summary.strip(),
+            "key_points": [p.strip() for p in parsed.key_points if p.strip()][:5],
+            "action_items": [item.model_dump() for item in parsed.action_items][:5],
+        }
+
+    async def _summarize_separate(self, transcript: str, language: str) -> Dict[str, Any]:
+        """
+        The three original requests, issued concurrently
+        """
+        usage: Dict[str, int] = {}
+        started = time.perf_counter()
+        summary, key_points, action_items = await asyncio.gather(
+            self._generate_summary(transcript, language, usage),
+            self._extract_key_points(transcript, language, usage),
+            self._extract_action_items(transcript, language, usage)
+        )
+        self.usage.record('separate', time.perf_counter() - started, usage)
+        return {"summary": summary, "key_points": key_points, "action_items": action_items}
+
+    async def _complete(self, prompt: str, max_tokens: int, usage: Dict[str, int]) -> str:
+        if self.local_llm is not None:
+            return await self.local_llm.complete([{"role": "user", "content": prompt}])
+
+        response = await self.openai_client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=max_tokens
+        )
+        for field, count in usage_from_openai(response).items():
+            usage[field] = usage.get(field, 0) + count
+        return response.choices[0].message.content.strip()
+
+    async def _generate_summary(self, transcript: str, language: str, usage: Dict[str, int]) -> str:
         try:
-            prompt = f"Summarize this call in {language} (2-3 sentences):\n\n{transcript[:2000]}"
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=150
-            )
-            return response.choices[0].message.content.strip()
+            prompt = f"Summarize this call in {language} (2-3 sentences):\n\n{transcript}"
+            return await self._complete(prompt, 150, usage)
         except Exception as e:
             logger.error(f"Summary error: {e}")
-            return "Summary unavailable"
-    
-    async def _extract_key_points(self, transcript: str, language: str) -> List[str]:
+            return SUMMARY_UNAVAILABLE
+
+    async def _extract_key_points(self, transcript: str, language: str, usage: Dict[str, int]) -> List[str]:
         try:
-            prompt = f"Extract 3-5 key points from this call:\n\n{transcript[:2000]}"
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=200
-            )
-            content = response.choices[0].message.content.strip()
+            prompt = f"Extract 3-5 key points from this call:\n\n{transcript}"
+            content = await self._complete(prompt, 200, usage)
             points = [line.strip('- •*').strip() for line in content.split('\n') if line.strip()]
             return points[:5]
         except Exception as e:
             logger.error(f"Key points error: {e}")
             return []
-    
-    async def _extract_action_items(self, transcript: str, language: str) -> List[Dict[str, str]]:
+
+    async def _extract_action_items(self, transcript: str, language: str, usage: Dict[str, int]) -> List[Dict[str, str]]:
         try:
-            prompt = f"Extract action items (format: Person: Action):\n\n{transcript[:2000]}"
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=200
-            )
-            content = response.choices[0].message.content.strip()
+            prompt = f"Extract action items (format: Person: Action):\n\n{transcript}"
+            content = await self._complete(prompt, 200, usage)
             action_items = []
             for line in content.split('\n'):
                 if ':' in line:
@@ -92,15 +512,38 @@ class SummarizationService:
         except Exception as e:
             logger.error(f"Action items error: {e}")
             return []
-    
-    def _determine_sentiment(self, transcript: str) -> str:
-        positive = ['thank', 'great', 'excellent', 'happy', 'satisfied']
-        negative = ['problem', 'issue', 'frustrated', 'angry', 'disappointed']
-        transcript_lower = transcript.lower()
-        pos_count = sum(1 for w in positive if w in transcript_lower)
-        neg_count = sum(1 for w in negative if w in transcript_lower)
+
+    def _determine_sentiment(self, transcript: str, language: str = "en") -> str:
+        counts = self.lexicon.counts(transcript, language)
+        pos_count = counts["positive"]
+        neg_count = counts["negative"]
         if pos_count > neg_count:
             return "positive"
         elif neg_count > pos_count:
             return "negative"
         return "neutral"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Latency and token use per mode, plus combined-mode fallbacks
+        """
+        return {
+            "mode": self.mode,
+            "model": self.model,
+            "modes": self.usage.get_stats(),
+            "validation_failures": self.validation_failures,
+            "fallbacks": self.fallbacks,
+            "chunk_chars": self.chunk_chars,
+            "map_reduce_runs": self.map_reduce_runs,
+            "chunks_summarized": self.chunks_summarized,
+            "reduce_rounds": self.reduce_rounds,
+            "incremental": self.incremental,
+            "incremental_summaries": self.incremental_summaries,
+            "rolling_calls": len(self.rolling),
+            "rolling_evictions": self.rolling_evictions,
+            "rolling_expired": self.rolling_expired,
+            "tier": self.tier,
+            "llm_configured": self.llm_configured,
+            "extractive_summaries": self.extractive_summaries,
+            "extractive_fallbacks": self.extractive_fallbacks,
+        }
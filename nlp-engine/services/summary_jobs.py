@@ -0,0 +1,359 @@
+import os
+import json
+import math
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from services.translation_cache import LRUTTLCache
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+def summary_cache_key(transcript: str, language: str, tier: Optional[str] = None) -> str:
+    """
+    Cache key for a transcript (whitespace-normalized), language and tier
+    """
+    normalized = ' '.join(transcript.split())
+    return f"{language}:{tier or 'default'}:{hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()}"
+
+
+class SummaryJob:
+    """
+    One queued post-call summary
+    """
+
+    def __init__(
+        self,
+        transcript: str,
+        language: str,
+        priority: int,
+        call_id: Optional[str] = None,
+        callback_url: Optional[str] = None,
+        tier: Optional[str] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.transcript = transcript
+        self.language = language
+        self.priority = priority
+        self.call_id = call_id
+        self.callback_urls = [callback_url] if callback_url else []
+        self.tier = tier
+        self.cache_key = summary_cache_key(transcript, language, tier)
+
+        self.status = "queued"
+        self.attempts = 0
+        self.cached = False
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "call_id": self.call_id,
+            "attempts": self.attempts,
+            "cached": self.cached,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class SummaryJobQueue:
+    """
+    Bounded worker pool for post-call summaries
+
+    Jobs are processed in priority order (high, normal, low; FIFO within a
+    priority) by SUMMARY_JOB_WORKERS workers, retried with backoff on
+    failure, and reported by polling or an optional callback POST. Results
+    are cached by transcript hash, and a submission identical to a queued
+    or running job joins that job, so duplicates cost nothing. With an
+    admission controller, each run holds a batch slot so queued summaries
+    never crowd out live turns.
+
+    Callback URLs must point at a host in SUMMARY_CALLBACK_ALLOWED_HOSTS
+    (callbacks are refused when it is empty), so a caller cannot make the
+    engine POST to internal services. Retries only happen when summarize()
+    raises: with SUMMARY_EXTRACTIVE_FALLBACK=true and the extractive tier
+    available, LLM failures are absorbed by the fallback and a job is only
+    retried if the extractive tier itself fails.
+    """
+
+    def __init__(
+        self,
+        summarizer: Any,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        retries: Optional[int] = None,
+        retain: Optional[int] = None,
+        admission: Any = None
+    ):
+        self.summarizer = summarizer
+        self.admission = admission
+        self.workers = workers or int(os.getenv('SUMMARY_JOB_WORKERS', 4))
+        self.max_queue = max_queue or int(os.getenv('SUMMARY_JOB_QUEUE_MAX', 10000))
+        self.retries = retries if retries is not None else int(os.getenv('SUMMARY_JOB_RETRIES', 2))
+        self.retain = retain or int(os.getenv('SUMMARY_JOB_RETAIN', 10000))
+        self.retry_backoff = float(os.getenv('SUMMARY_JOB_RETRY_BACKOFF', 2.0))
+        self.callback_hosts = {
+            h.strip().lower() for h in os.getenv('SUMMARY_CALLBACK_ALLOWED_HOSTS', '').split(',') if h.strip()
+        }
+
+        self.results = LRUTTLCache(
+            max_bytes=int(os.getenv('SUMMARY_CACHE_MAX_BYTES', 16 * 1024 * 1024)),
+            ttl_seconds=float(os.getenv('SUMMARY_CACHE_TTL', 86400))
+        )
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = 0
+        self._workers: List[asyncio.Task] = []
+        self._callbacks = None
+        # job id -> job, oldest first; at most `retain` finished jobs are kept
+        self.jobs: "OrderedDict[str, SummaryJob]" = OrderedDict()
+        self._active: Dict[str, SummaryJob] = {}
+
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+        self.cache_hits = 0
+        self.joined = 0
+        self.callbacks_sent = 0
+        self.callback_failures = 0
+        self.wait_times: Deque[float] = deque(maxlen=1000)
+        self.run_times: Deque[float] = deque(maxlen=1000)
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Summary job queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._callbacks is not None:
+            await self._callbacks.aclose()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(
+        self,
+        transcript: str,
+        language: str = "en",
+        priority: Any = "normal",
+        call_id: Optional[str] = None,
+        callback_url: Optional[str] = None,
+        tier: Optional[str] = None
+    ) -> SummaryJob:
+        """
+        Queue a transcript; raises OverflowError when the queue is full and
+        ValueError for an unknown priority or a callback URL not allowed
+        """
+        self.start()
+        priority = PRIORITIES.get(priority, priority) if isinstance(priority, str) else int(priority)
+        if not isinstance(priority, int):
+            raise ValueError(f"Unknown priority: {priority}")
+        if callback_url:
+            self._check_callback(callback_url)
+
+        job = SummaryJob(transcript, language, priority, call_id, callback_url, tier)
+
+        cached = self.results.get(job.cache_key)
+        if cached is not None:
+            self.cache_hits += 1
+            job.cached = True
+            self._finish(job, "done", result=json.loads(cached))
+            self._remember(job)
+            if job.callback_urls:
+                asyncio.create_task(self._send_callbacks(job))
+            return job
+
+        existing = self._active.get(job.cache_key)
+        if existing is not None:
+            self.joined += 1
+            if callback_url:
+                existing.callback_urls.append(callback_url)
+            return existing
+
+        if self.depth >= self.max_queue:
+            self.rejected += 1
+            raise OverflowError("Summary job queue is full")
+
+        self.submitted += 1
+        self._active[job.cache_key] = job
+        self._remember(job)
+        self._enqueue(job)
+        return job
+
+    def _check_callback(self, url: str):
+        try:
+            parts = urlsplit(url)
+            host = (parts.hostname or '').lower()
+            port = parts.port
+        except ValueError:
+            raise ValueError(f"Invalid callback URL: {url}")
+        if parts.scheme not in ('http', 'https') or not host:
+            raise ValueError(f"Invalid callback URL: {url}")
+        if host not in self.callback_hosts and f"{host}:{port}" not in self.callback_hosts:
+            raise ValueError(f"Callback host '{host}' is not in SUMMARY_CALLBACK_ALLOWED_HOSTS")
+
+    def get(self, job_id: str) -> Optional[SummaryJob]:
+        return self.jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[SummaryJob]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def _enqueue(self, job: SummaryJob):
+        self._seq += 1
+        self._queue.put_nowait((job.priority, self._seq, job))
+
+    def _remember(self, job: SummaryJob):
+        self.jobs[job.id] = job
+        excess = len(self.jobs) - self.retain
+        if excess <= 0:
+            return
+        # Drop the oldest finished jobs, skipping past queued/running ones
+        # (bounded by max_queue) that must stay pollable
+        stale = []
+        for job_id, old in self.jobs.items():
+            if len(stale) >= excess:
+                break
+            if old.status not in ("queued", "running"):
+                stale.append(job_id)
+        for job_id in stale:
+            del self.jobs[job_id]
+
+    async def _worker(self, index: int):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error(f"Summary worker {index} error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: SummaryJob):
+        job.status = "running"
+        job.attempts += 1
+        if job.started_at is None:
+            job.started_at = time.time()
+            self.wait_times.append(job.started_at - job.submitted_at)
+
+        self.running += 1
+        started = time.perf_counter()
+        slot = self.admission.slot("batch", timeout=math.inf, shed=False) if self.admission else nullcontext()
+        try:
+            async with slot:
+                result = await self.summarizer.summarize(
+                    job.transcript,
+                    job.language,
+                    call_id=job.call_id,
+                    raise_errors=True,
+                    tier=job.tier
+                )
+        except Exception as e:
+            if job.attempts <= self.retries:
+                self.retried += 1
+                job.status = "queued"
+                logger.warning(f"Summary job {job.id} failed (attempt {job.attempts}), retrying: {e}")
+                asyncio.get_running_loop().call_later(
+                    self.retry_backoff * 2 ** (job.attempts - 1), self._enqueue, job
+                )
+                return
+            self.failed += 1
+            self._finish(job, "failed", error=str(e))
+        else:
+            self.results.set(job.cache_key, json.dumps(result))
+            self.completed += 1
+            self.run_times.append(time.perf_counter() - started)
+            self._finish(job, "done", result=result)
+        finally:
+            self.running -= 1
+
+        if job.callback_urls:
+            await self._send_callbacks(job)
+
+    def _finish(self, job: SummaryJob, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        # Transcripts can be large; only the result is kept once done
+        job.transcript = ""
+        if self._active.get(job.cache_key) is job:
+            del self._active[job.cache_key]
+        job.done.set()
+
+    async def _send_callbacks(self, job: SummaryJob):
+        if self._callbacks is None:
+            from services.http_transport import HTTPTransport
+            self._callbacks = HTTPTransport("summary-callbacks", env_prefix="SUMMARY_CALLBACK_HTTP")
+        payload = job.to_dict()
+        for url in job.callback_urls:
+            try:
+                response = await self._callbacks.post(url, json=payload)
+                response.raise_for_status()
+                self.callbacks_sent += 1
+            except Exception as e:
+                self.callback_failures += 1
+                logger.warning(f"Summary job {job.id} callback to {url} failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        def latency(samples: Deque[float]) -> Dict[str, Optional[float]]:
+            if not samples:
+                return {"avg_ms": None, "p95_ms": None}
+            ordered = sorted(samples)
+            return {
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+            }
+
+        return {
+            "workers": self.workers,
+            "queue_depth": self.depth,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "cache_hits": self.cache_hits,
+            "joined_in_flight": self.joined,
+            "callbacks_sent": self.callbacks_sent,
+            "callback_failures": self.callback_failures,
+            "queue_wait": latency(self.wait_times),
+            "run_time": latency(self.run_times),
+            "result_cache": self.results.get_stats(),
+        }
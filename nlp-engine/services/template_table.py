@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
+
+from services.translator import SUPPORTED_LANGUAGES, normalize_language_code
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'response_templates.json')
+
+
+class TemplateTable:
+    """
+    Immutable intent -> language -> response lookup
+
+    Seeded from the hand-written templates in ConversationManager and
+    extended to every supported language by a build step that machine
+    translates the English source once and persists the result, so template
+    intents are answered without any network call at request time.
+    """
+
+    def __init__(self, seed_templates: Dict[str, Dict[str, str]], path: Optional[str] = None):
+        self.path = path or os.getenv('TEMPLATE_TABLE_PATH', DEFAULT_TABLE_PATH)
+        self.seed = self._normalize_templates(seed_templates)
+        self.table: Mapping[str, Mapping[str, str]] = self._freeze(self.seed)
+        self.built_at: Optional[float] = None
+        self.build_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, intent: str, language: str) -> Optional[str]:
+        """
+        Look up a template response, or None if the intent/language is not covered
+        """
+        by_language = self.table.get(intent)
+        if by_language is None:
+            return None
+
+        response = by_language.get(normalize_language_code(language))
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    def has_intent(self, intent: str) -> bool:
+        return intent in self.table
+
+    def load(self) -> bool:
+        """
+        Load a previously built table from disk; seed templates always win
+        """
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load template table {self.path}: {e}")
+            return False
+
+        merged = self._normalize_templates(data.get('templates', {}))
+        for intent, by_language in self.seed.items():
+            merged.setdefault(intent, {}).update(by_language)
+
+        self.table = self._freeze(merged)
+        self.built_at = data.get('built_at')
+        logger.info(f"Loaded template table from {self.path}: {self.coverage()['summary']}")
+        return True
+
+    async def build(
+        self,
+        translator: Any,
+        languages: Optional[List[str]] = None,
+        source_language: str = 'en',
+        save: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Translate the source templates into every language and swap in the result
+
+        One batch translation is issued per target language; entries that
+        come back unchanged (the translator's error fallback) are left out.
+        """
+        languages = languages or list(SUPPORTED_LANGUAGES)
+        intents = [i for i, by_language in self.seed.items() if source_language in by_language]
+        source_texts = [self.seed[i][source_language] for i in intents]
+
+        built: Dict[str, Dict[str, str]] = {intent: dict(by_language) for intent, by_language in self.seed.items()}
+
+        async def build_language(language: str):
+            missing = [i for i in intents if language not in built[i]]
+            if not missing or language == source_language:
+                return
+            texts = [self.seed[i][source_language] for i in missing]
+            translations = await translator.batch_translate(texts, source_language, language)
+            for intent, source, translated in zip(missing, texts, translations):
+                if translated and translated != source:
+                    built[intent][language] = translated
+
+        started = time.perf_counter()
+        await asyncio.gather(*[build_language(normalize_language_code(lang)) for lang in languages])
+
+        self.table = self._freeze(built)
+        self.built_at = time.time()
+        coverage = self.coverage(languages)
+        logger.info(
+            f"Built template table for {len(source_texts)} intents in "
+            f"{time.perf_counter() - started:.1f}s: {coverage['summary']}"
+        )
+
+        if save:
+            self.save()
+        return coverage
+
+    def start_build(self, translator: Any) -> asyncio.Task:
+        """
+        Run build() in the background, keeping the task and logging failures
+        """
+        if self.build_task is None or self.build_task.done():
+            self.build_task = asyncio.create_task(self.build(translator))
+            self.build_task.add_done_callback(self._on_build_done)
+        return self.build_task
+
+    @staticmethod
+    def _on_build_done(task: asyncio.Task):
+        if task.cancelled():
+            logger.warning("Template table build cancelled")
+        elif task.exception() is not None:
+            logger.error(f"Template table build failed: {task.exception()}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'built_at': self.built_at,
+                'templates': {intent: dict(by_language) for intent, by_language in self.table.items()},
+            }, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def coverage(self, languages: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Report which supported languages each intent covers
+        """
+        languages = [normalize_language_code(l) for l in (languages or SUPPORTED_LANGUAGES)]
+        per_intent = {}
+        covered_cells = 0
+        for intent, by_language in self.table.items():
+            missing = [l for l in languages if l not in by_language]
+            covered_cells += len(languages) - len(missing)
+            per_intent[intent] = {
+                'covered': len(languages) - len(missing),
+                'missing': missing,
+            }
+
+        total_cells = len(languages) * len(self.table)
+        ratio = covered_cells / total_cells if total_cells else 0.0
+        return {
+            'languages': len(languages),
+            'intents': per_intent,
+            'coverage_ratio': round(ratio, 4),
+            'summary': f"{covered_cells}/{total_cells} intent-language pairs ({ratio:.0%})",
+            'built_at': self.built_at,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'path': self.path,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'building': self.build_task is not None and not self.build_task.done(),
+            'coverage': self.coverage(),
+        }
+
+    @staticmethod
+    def _normalize_templates(templates: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        return {
+            intent: {normalize_language_code(lang): text for lang, text in by_language.items()}
+            for intent, by_language in templates.items()
+        }
+
+    @staticmethod
+    def _freeze(templates: Dict[str, Dict[str, str]]) -> Mapping[str, Mapping[str, str]]:
+        return MappingProxyType({
+            intent: MappingProxyType(dict(by_language))
+            for intent, by_language in templates.items()
+        })
+
+
+async def _build_offline():
+    """
+    Offline build: python -m services.template_table
+    """
+    from services.conversation_manager import ConversationManager
+    from services.translator import TranslationService
+
+    manager = ConversationManager()
+    coverage = await manager.template_table.build(TranslationService())
+    print(json.dumps(coverage, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    asyncio.run(_build_offline())
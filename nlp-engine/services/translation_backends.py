@@ -0,0 +1,155 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from services.http_transport import HTTPTransport
+
+logger = logging.getLogger(__name__)
+
+# Separator used to pack several texts into one upstream request
+BATCH_SEPARATOR = "\n"
+
+
+class TranslationBackend:
+    """
+    Base class for translation providers used by TranslationService
+    """
+
+    name = "base"
+
+    def __init__(self, max_batch_size: int = 50, max_batch_chars: int = 4500):
+        self.max_batch_size = max_batch_size
+        self.max_batch_chars = max_batch_chars
+
+    async def translate(self, text: str, source: str, target: str) -> str:
+        raise NotImplementedError
+
+    async def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        """
+        Translate several texts; results are returned in input order
+        """
+        return [await self.translate(text, source, target) for text in texts]
+
+
+class GoogleTranslationBackend(TranslationBackend):
+    """
+    Google Translate over a persistent pooled HTTP connection
+
+    Talks to the translate_a/single "gtx" endpoint used by Google's web
+    clients (deep-translator, by contrast, scrapes translate.google.com/m)
+    through one shared HTTPTransport, so misses reuse keep-alive
+    connections instead of paying TCP/TLS setup each time. The endpoint is
+    undocumented and not part of the Cloud Translation API: it has no SLA,
+    its own unpublished rate limits (bursts get 429s or captchas), and
+    automated use may fall outside Google's terms of service.
+    TRANSLATION_UPSTREAM_URL points it at a local stand-in server.
+
+    Batches are packed into a single request (texts joined by newlines) and
+    split back apart; if the provider merges or splits lines the batch falls
+    back to one request per text.
+    """
+
+    name = "google"
+
+    def __init__(self, transport: HTTPTransport = None, **kwargs):
+        super().__init__(**kwargs)
+        # Google rejects payloads above 5000 characters
+        self.max_batch_chars = min(self.max_batch_chars, 4500)
+        self.transport = transport or HTTPTransport(
+            "google_translate",
+            base_url=os.getenv('TRANSLATION_UPSTREAM_URL', 'https://translate.googleapis.com'),
+            env_prefix="TRANSLATION_HTTP",
+        )
+
+    async def translate(self, text: str, source: str, target: str) -> str:
+        response = await self.transport.post(
+            "/translate_a/single",
+            params={"client": "gtx", "sl": source, "tl": target, "dt": "t"},
+            data={"q": text},
+        )
+        segments = response.json()[0] or []
+        return "".join(segment[0] for segment in segments if segment and segment[0])
+
+    async def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        # Texts that contain the separator can't be packed; send those on their own
+        packable = [i for i, text in enumerate(texts) if BATCH_SEPARATOR not in text]
+        if len(packable) < 2:
+            return await super().translate_batch(texts, source, target)
+
+        results: List[str] = [None] * len(texts)
+        packed_texts = [texts[i] for i in packable]
+        packed = await self.translate(BATCH_SEPARATOR.join(packed_texts), source, target)
+        parts = (packed or "").split(BATCH_SEPARATOR)
+        if len(parts) == len(packed_texts):
+            for i, part in zip(packable, parts):
+                results[i] = part.strip()
+        else:
+            logger.warning(
+                f"Packed batch of {len(packed_texts)} came back as {len(parts)} lines; "
+                "retrying one request per text"
+            )
+
+        for i, text in enumerate(texts):
+            if results[i] is None:
+                results[i] = await self.translate(text, source, target)
+        return results
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"transport": self.transport.get_stats()}
+
+
+class StubTranslationBackend(TranslationBackend):
+    """
+    Deterministic offline translator for local runs and tests
+
+    Returns "[target] text" after an optional simulated latency.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_ms: float = None, **kwargs):
+        super().__init__(**kwargs)
+        if latency_ms is None:
+            latency_ms = float(os.getenv('TRANSLATION_STUB_LATENCY_MS', 0))
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+    async def translate(self, text: str, source: str, target: str) -> str:
+        return (await self.translate_batch([text], source, target))[0]
+
+    async def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        self.requests += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return [f"[{target}] {text}" for text in texts]
+
+
+def create_translation_backend(name: str = None) -> TranslationBackend:
+    """
+    Build the backend selected by TRANSLATION_BACKEND (default: google)
+
+    google: remote only; local: MarianMT only; hybrid: local for the pairs
+    in TRANSLATION_LOCAL_PAIRS with remote fallback; stub: offline fake.
+    """
+    name = (name or os.getenv('TRANSLATION_BACKEND', 'google')).lower()
+    limits = {
+        "max_batch_size": int(os.getenv('TRANSLATION_BATCH_MAX_ITEMS', 50)),
+        "max_batch_chars": int(os.getenv('TRANSLATION_BATCH_MAX_CHARS', 4500)),
+    }
+
+    if name == 'stub':
+        return StubTranslationBackend(**limits)
+    if name in ('local', 'hybrid'):
+        # Imported lazily: pulls in transformers/torch when installed
+        from services.local_translation import MarianTranslationBackend, TranslationRouter
+        local = MarianTranslationBackend(**limits)
+        if name == 'local':
+            return local
+        return TranslationRouter(local=local, remote=GoogleTranslationBackend(**limits))
+    if name != 'google':
+        logger.warning(f"Unknown translation backend '{name}', using google")
+    return GoogleTranslationBackend(**limits)
@@ -0,0 +1,319 @@
+import os
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional (see requirements-minimal.txt)
+    aioredis = None
+
+# Rough per-entry bookkeeping overhead (OrderedDict node, tuple, floats)
+ENTRY_OVERHEAD_BYTES = 96
+
+
+class TierStats:
+    """
+    Hit/miss counters for a single cache tier
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "tier": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "errors": self.errors,
+        }
+
+
+class LRUTTLCache:
+    """
+    In-process LRU cache with per-entry TTL and a byte-size budget
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl_seconds: float = 86400,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.current_bytes = 0
+        self.stats = TierStats("memory")
+        # key -> (value, expires_at, size)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, record=False) is not None
+
+    def get(self, key: str, record: bool = True) -> Optional[str]:
+        """
+        Return cached value and mark it most recently used
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            if record:
+                self.stats.misses += 1
+            return None
+
+        value, expires_at, _ = entry
+        if expires_at <= self.clock():
+            self._remove(key)
+            self.stats.expirations += 1
+            if record:
+                self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if record:
+            self.stats.hits += 1
+        return value
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        """
+        Store value, evicting least recently used entries to fit the budget
+        """
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            # Larger than the whole budget; caching it would flush everything
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (value, self.clock() + ttl, size)
+        self.current_bytes += size
+        self.stats.writes += 1
+
+        while self.current_bytes > self.max_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats.evictions += 1
+
+    def delete(self, key: str):
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def purge_expired(self) -> int:
+        """
+        Drop all expired entries, returns number removed
+        """
+        now = self.clock()
+        expired = [k for k, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.stats.expirations += len(expired)
+        return len(expired)
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
+
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        return len(key.encode('utf-8')) + len(value.encode('utf-8')) + ENTRY_OVERHEAD_BYTES
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.to_dict()
+        stats.update({
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+        })
+        return stats
+
+
+class RedisCacheTier:
+    """
+    Shared second-tier cache backed by Redis
+
+    Accepts any client exposing the redis.asyncio get/set/mget API, so a
+    local redis-server or an in-process fake (e.g. fakeredis) can be used.
+    Redis failures are non-fatal and count as misses.
+    """
+
+    def __init__(self, client: Any, ttl_seconds: float = 86400, prefix: str = "nlp:tr:"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.stats = TierStats("redis")
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> Optional["RedisCacheTier"]:
+        if aioredis is None:
+            logger.warning("redis package not installed - shared translation cache disabled")
+            return None
+        try:
+            client = aioredis.from_url(url, decode_responses=True, socket_timeout=0.5)
+            return cls(client, **kwargs)
+        except Exception as e:
+            logger.warning(f"Redis cache tier unavailable: {e}")
+            return None
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis cache get error (non-fatal): {e}")
+            self.stats.errors += 1
+            self.stats.misses += 1
+            return None
+
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        try:
+            values = await self.client.mget([self.prefix + k for k in keys])
+        except Exception as e:
+            logger.warning(f"Redis cache mget error (non-fatal): {e}")
+            self.stats.errors += 1
+            self.stats.misses += len(keys)
+            return [None] * len(keys)
+
+        results = []
+        for value in values:
+            if value is None:
+                self.stats.misses += 1
+                results.append(None)
+            else:
+                self.stats.hits += 1
+                results.append(value.decode('utf-8') if isinstance(value, bytes) else value)
+        return results
+
+    async def set(self, key: str, value: str):
+        try:
+            await self.client.set(self.prefix + key, value, px=max(1, int(self.ttl_seconds * 1000)))
+            self.stats.writes += 1
+        except Exception as e:
+            logger.warning(f"Redis cache set error (non-fatal): {e}")
+            self.stats.errors += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.stats.to_dict()
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+
+class TranslationCache:
+    """
+    Two-tier translation cache: in-process LRU/TTL first, optional Redis second
+
+    Keys are derived from the normalized language pair and a digest of the
+    text with leading/trailing whitespace stripped (inner whitespace is
+    kept), so long texts don't bloat the key space.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        redis_url: Optional[str] = None,
+        redis_client: Any = None
+    ):
+        if max_bytes is None:
+            max_bytes = int(os.getenv('TRANSLATION_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv('TRANSLATION_CACHE_TTL', 86400))
+
+        self.memory = LRUTTLCache(max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+
+        self.redis: Optional[RedisCacheTier] = None
+        if redis_client is not None:
+            self.redis = RedisCacheTier(redis_client, ttl_seconds=ttl_seconds)
+        else:
+            redis_url = redis_url or os.getenv('TRANSLATION_CACHE_REDIS_URL') or os.getenv('REDIS_URL')
+            if redis_url:
+                self.redis = RedisCacheTier.from_url(redis_url, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def make_key(from_language: str, to_language: str, text: str) -> str:
+        """
+        Build a compact cache key from the language pair and text digest
+        """
+        # Only outer whitespace is insignificant; line breaks inside the
+        # text change the translation's layout
+        normalized = text.strip()
+        digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+        return f"{from_language}:{to_language}:{digest}"
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        if self.redis is not None:
+            value = await self.redis.get(key)
+            if value is not None:
+                # Promote shared hit into the local tier
+                self.memory.set(key, value)
+                return value
+        return None
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        """
+        Bulk lookup; local misses are resolved with a single Redis round trip
+        """
+        results = [self.memory.get(key) for key in keys]
+        if self.redis is None:
+            return results
+
+        missing = [i for i, value in enumerate(results) if value is None]
+        if missing:
+            shared = await self.redis.get_many([keys[i] for i in missing])
+            for i, value in zip(missing, shared):
+                if value is not None:
+                    self.memory.set(keys[i], value)
+                    results[i] = value
+        return results
+
+    async def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.redis is not None:
+            await self.redis.set(key, value)
+
+    def clear(self):
+        """
+        Clear the local tier (the shared tier is left to its TTL)
+        """
+        self.memory.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.get_stats(),
+            "redis": self.redis.get_stats() if self.redis is not None else None,
+        }
@@ -1,27 +1,88 @@
+import os
 import logging
-from typing import Dict, Optional
-from deep_translator import GoogleTranslator
+from typing import Dict, List, Optional
 import asyncio
 
+from services.translation_backends import create_translation_backend
+from services.translation_cache import TranslationCache
+from utils.single_flight import SingleFlight
+
 logger = logging.getLogger(__name__)
 
+# Supported languages (ISO 639-1 codes, Google variants for Chinese)
+SUPPORTED_LANGUAGES = [
+    'en', 'es', 'fr', 'de', 'it', 'pt', 'ru', 'zh-CN', 'zh-TW', 'ja', 'ko',
+    'ar', 'hi', 'bn', 'pa', 'te', 'mr', 'ta', 'ur', 'gu', 'kn', 'ml',
+    'th', 'vi', 'id', 'ms', 'tl', 'nl', 'pl', 'uk', 'cs', 'sk', 'ro',
+    'hu', 'el', 'bg', 'sr', 'hr', 'sl', 'lt', 'lv', 'et', 'fi', 'sv',
+    'no', 'da', 'is', 'tr', 'he', 'fa', 'sw', 'af', 'zu'
+]
+
+# Map common variations
+LANGUAGE_ALIASES = {
+    'zh': 'zh-CN',
+    'chinese': 'zh-CN',
+    'mandarin': 'zh-CN',
+    'cantonese': 'zh-TW',
+    'filipino': 'tl',
+    'tagalog': 'tl',
+    'norwegian': 'no',
+    'farsi': 'fa',
+    'persian': 'fa',
+    'iw': 'he',
+    'nb': 'no',
+}
+
+_CANONICAL_CODES = {code.lower(): code for code in SUPPORTED_LANGUAGES}
+
+
+def normalize_language_code(code: str) -> str:
+    """
+    Normalize language code to supported format
+
+    Aliases are mapped, casing is restored ('zh-cn' -> 'zh-CN') and regional
+    variants fall back to their base language ('es-MX' -> 'es').
+    """
+    code_lower = code.strip().lower().replace('_', '-')
+    if code_lower in LANGUAGE_ALIASES:
+        return LANGUAGE_ALIASES[code_lower]
+    if code_lower in _CANONICAL_CODES:
+        return _CANONICAL_CODES[code_lower]
+
+    base = code_lower.split('-', 1)[0]
+    if base in LANGUAGE_ALIASES:
+        return LANGUAGE_ALIASES[base]
+    if base in _CANONICAL_CODES:
+        return _CANONICAL_CODES[base]
+    return code_lower
+
 class TranslationService:
     """
     Translation service supporting 100+ languages
-    Uses Google Translate API via deep-translator
+    Uses Google Translate over a pooled HTTP client (or local/stub backends)
     """
     
     def __init__(self):
-        self.cache = {}  # Simple in-memory cache
-        
-        # Supported languages (ISO 639-1 codes)
-        self.supported_languages = [
-            'en', 'es', 'fr', 'de', 'it', 'pt', 'ru', 'zh-CN', 'zh-TW', 'ja', 'ko',
-            'ar', 'hi', 'bn', 'pa', 'te', 'mr', 'ta', 'ur', 'gu', 'kn', 'ml',
-            'th', 'vi', 'id', 'ms', 'tl', 'nl', 'pl', 'uk', 'cs', 'sk', 'ro',
-            'hu', 'el', 'bg', 'sr', 'hr', 'sl', 'lt', 'lv', 'et', 'fi', 'sv',
-            'no', 'da', 'is', 'tr', 'he', 'fa', 'sw', 'af', 'zu'
-        ]
+        self.backend = create_translation_backend()
+        
+        # Upstream batch requests allowed in flight at once
+        self.batch_semaphore = asyncio.Semaphore(int(os.getenv('TRANSLATION_BATCH_CONCURRENCY', 4)))
+        self.batch_stats = {
+            "requests": 0,
+            "texts": 0,
+            "unique_texts": 0,
+            "cache_hits": 0,
+            "upstream_batches": 0,
+            "upstream_failures": 0
+        }
+        
+        # LRU/TTL cache with optional shared Redis tier
+        self.cache = TranslationCache()
+        
+        # Concurrent identical cache misses share one upstream call
+        self.inflight = SingleFlight("translation")
+        
+        self.supported_languages = list(SUPPORTED_LANGUAGES)
     
     async def translate(
         self,
@@ -32,11 +93,6 @@ class TranslationService:
         """
         Translate text from one language to another
         """
-        # Check cache first
-        cache_key = f"{from_language}:{to_language}:{text}"
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-        
         # No translation needed if same language
         if from_language == to_language:
             return text
@@ -55,31 +111,41 @@ class TranslationService:
                 logger.warning(f"Unsupported target language: {to_language}")
                 return text
             
-            # Perform translation
-            translator = GoogleTranslator(source=from_lang, target=to_lang)
+            # Check cache first
+            cache_key = self.cache.make_key(from_lang, to_lang, text)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            translated = await loop.run_in_executor(
-                None,
-                lambda: translator.translate(text)
+            # Perform translation (coalesced with identical in-flight requests)
+            translated = await self.inflight.do(
+                cache_key,
+                lambda: self._translate_upstream(text, from_lang, to_lang, cache_key)
             )
             
-            # Cache result
-            self.cache[cache_key] = translated
-            
-            # Limit cache size
-            if len(self.cache) > 1000:
-                # Remove oldest entries
-                keys_to_remove = list(self.cache.keys())[:100]
-                for key in keys_to_remove:
-                    del self.cache[key]
-            
             return translated
         except Exception as e:
             logger.error(f"Translation error ({from_language} -> {to_language}): {e}")
             return text  # Return original text on error
     
+    async def _translate_upstream(
+        self,
+        text: str,
+        from_lang: str,
+        to_lang: str,
+        cache_key: str
+    ) -> str:
+        """
+        Call the upstream translator and cache the result
+        """
+        translated = await self.backend.translate(text, from_lang, to_lang)
+        
+        # Cache result
+        if translated:
+            await self.cache.set(cache_key, translated)
+        
+        return translated
+    
     async def batch_translate(
         self,
         texts: list,
@@ -88,32 +154,102 @@ class TranslationService:
     ) -> list:
         """
         Translate multiple texts
+        
+        Duplicate texts are translated once, the cache is checked in bulk and
+        misses are sent upstream in size-limited batches under a concurrency
+        limit. Results are returned in input order.
         """
-        tasks = [
-            self.translate(text, from_language, to_language)
-            for text in texts
-        ]
-        return await asyncio.gather(*tasks)
+        self.batch_stats["requests"] += 1
+        self.batch_stats["texts"] += len(texts)
+        
+        if not texts or from_language == to_language:
+            return list(texts)
+        
+        from_lang = self._normalize_language_code(from_language)
+        to_lang = self._normalize_language_code(to_language)
+        
+        if from_lang not in self.supported_languages or to_lang not in self.supported_languages:
+            logger.warning(f"Unsupported language pair for batch: {from_language} -> {to_language}")
+            return list(texts)
+        
+        # De-duplicate on the cache key, remembering each input's slot
+        keys = [self.cache.make_key(from_lang, to_lang, text) for text in texts]
+        unique: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            unique.setdefault(key, text)
+        self.batch_stats["unique_texts"] += len(unique)
+        
+        unique_keys = list(unique.keys())
+        cached = await self.cache.get_many(unique_keys)
+        results = {key: value for key, value in zip(unique_keys, cached) if value is not None}
+        self.batch_stats["cache_hits"] += len(results)
+        
+        misses = [key for key in unique_keys if key not in results]
+        if misses:
+            chunks = self._chunk_for_upstream([unique[key] for key in misses], misses)
+            translated_chunks = await asyncio.gather(*[
+                self._translate_chunk(chunk_texts, chunk_keys, from_lang, to_lang)
+                for chunk_texts, chunk_keys in chunks
+            ])
+            for (_, chunk_keys), translations in zip(chunks, translated_chunks):
+                results.update(zip(chunk_keys, translations))
+        
+        return [results[key] for key in keys]
+    
+    def _chunk_for_upstream(self, texts: List[str], keys: List[str]) -> List[tuple]:
+        """
+        Pack texts into batches bounded by item count and character budget
+        """
+        chunks = []
+        chunk_texts, chunk_keys, chunk_chars = [], [], 0
+        
+        for text, key in zip(texts, keys):
+            too_many = len(chunk_texts) >= self.backend.max_batch_size
+            too_long = chunk_chars + len(text) + 1 > self.backend.max_batch_chars
+            if chunk_texts and (too_many or too_long):
+                chunks.append((chunk_texts, chunk_keys))
+                chunk_texts, chunk_keys, chunk_chars = [], [], 0
+            chunk_texts.append(text)
+            chunk_keys.append(key)
+            chunk_chars += len(text) + 1
+        
+        if chunk_texts:
+            chunks.append((chunk_texts, chunk_keys))
+        return chunks
+    
+    async def _translate_chunk(
+        self,
+        texts: List[str],
+        keys: List[str],
+        from_lang: str,
+        to_lang: str
+    ) -> List[str]:
+        """
+        Send one upstream batch and cache its results
+        """
+        async with self.batch_semaphore:
+            self.batch_stats["upstream_batches"] += 1
+            try:
+                translations = await self.backend.translate_batch(texts, from_lang, to_lang)
+            except Exception as e:
+                logger.error(f"Batch translation error ({from_lang} -> {to_lang}): {e}")
+                self.batch_stats["upstream_failures"] += 1
+                return list(texts)  # Return original texts on error
+        
+        results = []
+        for key, text, translated in zip(keys, texts, translations):
+            if translated:
+                await self.cache.set(key, translated)
+                results.append(translated)
+            else:
+                results.append(text)
+        return results
     
     def _normalize_language_code(self, code: str) -> str:
         """
         Normalize language code to supported format
         """
-        # Map common variations
-        code_map = {
-            'zh': 'zh-CN',
-            'chinese': 'zh-CN',
-            'mandarin': 'zh-CN',
-            'cantonese': 'zh-TW',
-            'filipino': 'tl',
-            'tagalog': 'tl',
-            'norwegian': 'no',
-            'farsi': 'fa',
-            'persian': 'fa',
-        }
-        
-        code_lower = code.lower()
-        return code_map.get(code_lower, code_lower)
+        return normalize_language_code(code)
     
     def is_supported(self, language_code: str) -> bool:
         """
@@ -122,6 +258,25 @@ class TranslationService:
         normalized = self._normalize_language_code(language_code)
         return normalized in self.supported_languages
     
+    def get_stats(self) -> Dict:
+        """
+        Get per-tier cache hit ratios, coalescing and batching counters
+        """
+        return {
+            "backend": self.backend.name,
+            "upstream": self.backend.get_stats() if hasattr(self.backend, 'get_stats') else None,
+            "cache": self.cache.get_stats(),
+            "coalescing": self.inflight.get_stats(),
+            "batch": dict(self.batch_stats)
+        }
+    
+    async def aclose(self):
+        """
+        Close pooled upstream connections
+        """
+        if hasattr(self.backend, 'aclose'):
+            await self.backend.aclose()
+    
     def get_supported_languages(self) -> list:
         """
         Get list of supported languages
@@ -0,0 +1,183 @@
+import json
+import time
+import asyncio
+import logging
+import functools
+import contextvars
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # orjson is optional (see requirements-minimal.txt)
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional (see requirements-minimal.txt)
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Response format negotiated for the request being handled
+_response_format: contextvars.ContextVar[str] = contextvars.ContextVar("response_format", default=JSON)
+
+
+def _default(obj: Any) -> Any:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "tolist"):  # numpy scalars and arrays
+        return obj.tolist()
+    return str(obj)
+
+
+def encode_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def decode_json(body: bytes) -> Any:
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, default=_default, use_bin_type=True)
+
+
+def decode_msgpack(body: bytes) -> Any:
+    return msgpack.unpackb(body, raw=False)
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    MessagePack when the caller accepts it and msgpack is installed, else JSON
+    """
+    if accept and msgpack is not None and any(media in accept for media in MSGPACK_TYPES):
+        return MSGPACK
+    return JSON
+
+
+class WireStats:
+    """
+    Payload sizes and encode/decode time per format and endpoint
+    """
+
+    def __init__(self):
+        self.formats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.endpoints: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def record(self, direction: str, media_type: str, path: str, size: int, seconds: float):
+        for stats in (self.formats[media_type], self.endpoints[path]):
+            stats[f"{direction}s"] += 1
+            stats[f"{direction}_bytes"] += size
+            stats[f"{direction}_seconds"] += seconds
+
+    @staticmethod
+    def _summarize(stats: Dict[str, float]) -> Dict[str, Any]:
+        summary = {}
+        for direction in ("request", "response"):
+            count = int(stats.get(f"{direction}s", 0))
+            if not count:
+                continue
+            summary[f"{direction}s"] = count
+            summary[f"avg_{direction}_bytes"] = round(stats[f"{direction}_bytes"] / count, 1)
+            summary[f"avg_{direction}_codec_us"] = round(stats[f"{direction}_seconds"] / count * 1e6, 1)
+        return summary
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "json_codec": "orjson" if orjson is not None else "json",
+            "msgpack_available": msgpack is not None,
+            "formats": {media: self._summarize(stats) for media, stats in self.formats.items()},
+            "endpoints": {path: self._summarize(stats) for path, stats in self.endpoints.items()},
+        }
+
+
+wire_stats = WireStats()
+
+
+class _WireRequest(Request):
+    """
+    Request whose body is parsed with the fast decoders
+
+    MessagePack bodies are presented to FastAPI as JSON, since it only
+    parses bodies it believes are JSON.
+    """
+
+    wire_format = JSON
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            started = time.perf_counter()
+            self._json = decode_msgpack(body) if self.wire_format == MSGPACK else decode_json(body)
+            wire_stats.record("request", self.wire_format, self.url.path, len(body), time.perf_counter() - started)
+        return self._json
+
+
+def _negotiated(endpoint: Callable, path: str, status_code: int) -> Callable:
+    @functools.wraps(endpoint)
+    async def encode_result(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        if isinstance(result, Response):
+            return result
+        media_type = _response_format.get()
+        started = time.perf_counter()
+        body = encode_msgpack(result) if media_type == MSGPACK else encode_json(result)
+        wire_stats.record("response", media_type, path, len(body), time.perf_counter() - started)
+        return Response(content=body, status_code=status_code, media_type=media_type)
+
+    return encode_result
+
+
+class WireRoute(APIRoute):
+    """
+    Route with content negotiation for internal callers
+
+    Request bodies may be JSON or MessagePack (Content-Type), and dict
+    responses are encoded straight to JSON (orjson when installed) or
+    MessagePack (Accept) without FastAPI's jsonable_encoder pass. Endpoints
+    that return a Response, and error responses, are left untouched.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        # Sync endpoints run in a threadpool where the negotiated format is
+        # not visible; they keep FastAPI's default encoding
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _negotiated(endpoint, path, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            scope = request.scope
+            wire_format = JSON
+            content_type = request.headers.get("content-type", "")
+            if msgpack is not None and content_type.startswith(MSGPACK_TYPES):
+                wire_format = MSGPACK
+                scope = dict(scope)
+                scope["headers"] = [
+                    (name, JSON.encode() if name == b"content-type" else value)
+                    for name, value in request.scope["headers"]
+                ]
+            request = _WireRequest(scope, request.receive)
+            request.wire_format = wire_format
+
+            token = _response_format.set(negotiate(request.headers.get("accept")))
+            try:
+                return await handler(request)
+            finally:
+                _response_format.reset(token)
+
+        return negotiated_handler
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one in-flight execution
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task. Exceptions propagate to every waiter
+    and nothing is remembered once the task finishes, so the next call
+    retries. A cancelled waiter only detaches itself; the shared task is
+    cancelled only when every waiter has gone away.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.cancelled = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() for key, or join the execution already in flight
+        """
+        self.calls += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t, k=key: self._finish(k, t))
+        else:
+            self.coalesced += 1
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0 and not task.done():
+                    # Every caller was cancelled; stop the upstream work too
+                    task.cancel()
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._waiters.pop(key, None)
+
+        if task.cancelled():
+            self.cancelled += 1
+        elif task.exception() is not None:
+            self.failures += 1
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "upstream_calls": self.executions,
+            "upstream_calls_saved": self.coalesced,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "in_flight": len(self._inflight),
+        }